@@ -0,0 +1,83 @@
+# benchmarks/bench_backends.py
+
+"""
+Backend throughput benchmark
+----------------------------
+Runs the same workload through each QueueBackend: enqueue N jobs in bulk,
+then drain them the way a worker does (claim a batch, report the outcomes
+in one `record` call). Commands are not executed, so the numbers are the
+storage engine's own cost per job.
+
+Backends:
+- sqlite:    the default SQLite database;
+- log:       the append-only log engine, written through to the OS cache;
+- log-fsync: the log engine with an fsync on every write.
+
+Usage:
+    python benchmarks/bench_backends.py --jobs 100000 --batch 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queuectl.backends import LogBackend, SQLiteBackend
+from queuectl.models import JobOutcome
+
+BACKENDS = {
+    "sqlite": lambda tmp: SQLiteBackend(os.path.join(tmp, "bench.db")),
+    "log": lambda tmp: LogBackend(os.path.join(tmp, "log")),
+    "log-fsync": lambda tmp: LogBackend(os.path.join(tmp, "log"), fsync=True),
+}
+
+
+def run_backend(name, jobs, batch):
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = BACKENDS[name](tmp)
+        start = time.perf_counter()
+        for _ in backend.enqueue_many({"id": f"j{i}", "command": "true"} for i in range(jobs)):
+            pass
+        enqueue = jobs / (time.perf_counter() - start)
+
+        done = 0
+        start = time.perf_counter()
+        while True:
+            claimed = backend.claim(batch, ["default"], owner="bench")
+            if not claimed:
+                break
+            backend.record("bench", [JobOutcome(job.id, "completed", 1) for job in claimed])
+            done += len(claimed)
+        drain = done / (time.perf_counter() - start)
+        assert done == jobs, (name, done)
+        backend.close()
+
+        if name.startswith("log"):
+            start = time.perf_counter()
+            LogBackend(os.path.join(tmp, "log")).close()
+            replay = time.perf_counter() - start
+        else:
+            replay = None
+    return enqueue, drain, replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=100, help="Jobs claimed and recorded per call")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    args = parser.parse_args()
+
+    print(f"{'BACKEND':>10} | {'enqueue jobs/s':>14} | {'claim+complete jobs/s':>21} | {'reopen s':>8}")
+    print("-" * 64)
+    for name in args.backends:
+        enqueue, drain, replay = run_backend(name, args.jobs, args.batch)
+        reopen = f"{replay:.2f}" if replay is not None else "-"
+        print(f"{name:>10} | {enqueue:>14.0f} | {drain:>21.0f} | {reopen:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/bench_claim.py
+
+"""
+Claim throughput benchmark
+--------------------------
+Measures how many jobs per second a pool of worker processes can claim
+from a table of a given size, comparing the legacy SELECT-then-UPDATE
+claim (no index) with the atomic UPDATE ... RETURNING claim backed by
+the idx_jobs_ready_claim partial index. --delayed adds that many older
+jobs scheduled an hour ahead, which the atomic claim must not have to read.
+
+Usage:
+    python benchmarks/bench_claim.py --sizes 10000 100000 --workers 1 2 4 8
+    python benchmarks/bench_claim.py --sizes 1000 --workers 1 --delayed 200000
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queuectl.db.repo import connect, claim_jobs
+from queuectl.utils import delay_until, utcnow_iso
+
+
+def legacy_claim(conn):
+    """The claim path as it was before the atomic claim (two statements)."""
+    now = utcnow_iso()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id, command, attempts, max_retries
+        FROM jobs
+        WHERE state IN ('pending', 'failed')
+        AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+        ORDER BY created_at ASC
+        LIMIT 1
+    """, (now,))
+    job = cur.fetchone()
+    if not job:
+        return None
+    cur.execute("""
+        UPDATE jobs SET state='processing', updated_at=?
+        WHERE id=? AND state IN ('pending', 'failed')
+    """, (utcnow_iso(), job[0]))
+    conn.commit()
+    return job if cur.rowcount == 1 else None
+
+
+def atomic_claim(conn):
+    rows = claim_jobs(conn, 1, ["default"])
+    return rows[0] if rows else None
+
+
+def populate(db_path, size, legacy, delayed=0):
+    conn = connect(db_path)
+    if legacy:
+        conn.execute("DROP INDEX IF EXISTS idx_jobs_ready_claim")
+    now, earlier, later = utcnow_iso(), delay_until(-3600), delay_until(3600)
+    conn.executemany(
+        "INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at) "
+        "VALUES (?, 'true', 'pending', 0, 3, ?, ?)",
+        ((f"job-{i:09d}", now, now) for i in range(size)),
+    )
+    conn.executemany(
+        "INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at, next_attempt_at) "
+        "VALUES (?, 'true', 'pending', 0, 3, ?, ?, ?)",
+        ((f"later-{i:09d}", earlier, earlier, later) for i in range(delayed)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def claimer(db_path, legacy, duration, result_q):
+    conn = sqlite3.connect(db_path, timeout=30)
+    claim = legacy_claim if legacy else atomic_claim
+    claimed = misses = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        try:
+            job = claim(conn)
+        except sqlite3.OperationalError:
+            job = None
+        if job:
+            claimed += 1
+        else:
+            misses += 1
+    result_q.put((claimed, misses))
+
+
+def run_case(size, workers, legacy, duration, delayed=0):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        populate(db_path, size, legacy, delayed)
+        q = mp.Queue()
+        procs = [mp.Process(target=claimer, args=(db_path, legacy, duration, q)) for _ in range(workers)]
+        for p in procs:
+            p.start()
+        results = [q.get() for _ in procs]
+        for p in procs:
+            p.join()
+    claimed = sum(r[0] for r in results)
+    misses = sum(r[1] for r in results)
+    return claimed / duration, misses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per case")
+    parser.add_argument("--delayed", type=int, default=0, help="Extra jobs not due for an hour")
+    args = parser.parse_args()
+
+    print(f"{'ROWS':>10} | {'WORKERS':>7} | {'LEGACY claims/s':>15} | {'misses':>7} | {'ATOMIC claims/s':>15} | {'misses':>7}")
+    print("-" * 80)
+    for size in args.sizes:
+        for workers in args.workers:
+            old_rate, old_miss = run_case(size, workers, True, args.duration, args.delayed)
+            new_rate, new_miss = run_case(size, workers, False, args.duration, args.delayed)
+            print(f"{size:>10} | {workers:>7} | {old_rate:>15.0f} | {old_miss:>7} | {new_rate:>15.0f} | {new_miss:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_concurrency.py
+
+"""
+Process-per-job vs in-process concurrency benchmark
+---------------------------------------------------
+Runs the same batch of I/O-bound jobs (`sleep 0.2` by default) through a
+real worker manager in two configurations with the same parallelism K:
+
+- processes: `worker start --count K` (K single-job worker processes)
+- threads:   `worker start --count 1 --concurrency K`
+
+Reports drain throughput and the peak combined RSS of the manager and its
+worker processes (job commands themselves excluded). Linux only (/proc).
+
+Usage:
+    python benchmarks/bench_concurrency.py --parallelism 8 32 --jobs 400
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from queuectl.db.repo import connect, insert_jobs
+from queuectl.utils import generate_id
+
+
+def rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def python_children(pid):
+    """Direct children of the manager, i.e. the worker interpreters."""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def run_case(parallelism, jobs, command, threaded):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        conn = connect(db_path)
+        for _ in insert_jobs(conn, ({"id": generate_id(), "command": command} for _ in range(jobs))):
+            pass
+
+        worker_args = ["--count", "1", "--concurrency", str(parallelism)] if threaded \
+            else ["--count", str(parallelism)]
+        env = dict(os.environ, QUEUECTL_DB=db_path, PYTHONPATH=ROOT)
+        start = time.perf_counter()
+        mgr = subprocess.Popen([sys.executable, "-m", "queuectl", "worker", "start", *worker_args],
+                               cwd=tmp, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        peak = 0
+        while True:
+            peak = max(peak, rss_kb(mgr.pid) + sum(rss_kb(p) for p in python_children(mgr.pid)))
+            left = conn.execute("SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'processing')").fetchone()[0]
+            if left == 0:
+                break
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+
+        mgr.terminate()
+        mgr.wait()
+        conn.close()
+    return jobs / elapsed, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--jobs", type=int, default=400)
+    parser.add_argument("--command", default="sleep 0.2")
+    args = parser.parse_args()
+
+    print(f"{'K':>4} | {'MODE':9} | {'jobs/s':>7} | {'peak RSS MB':>11}")
+    print("-" * 42)
+    for k in args.parallelism:
+        for threaded in (False, True):
+            with contextlib.redirect_stdout(io.StringIO()):
+                rate, rss = run_case(k, args.jobs, args.command, threaded)
+            label = "threads" if threaded else "processes"
+            print(f"{k:>4} | {label:9} | {rate:>7.1f} | {rss:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_contention.py
+
+"""
+Lock contention benchmark
+-------------------------
+Runs N writer processes (enqueue, claim, complete; one commit each) next to
+one reader polling the `queuectl status` query, and compares the original
+connection settings (rollback journal, synchronous=FULL, Python's default
+5 s timeout) with the tuned settings applied by queuectl.db.repo.connect
+(WAL, synchronous=NORMAL, busy_timeout, cache/mmap sizing).
+
+Reports write throughput, p50/p99/max write latency, reader polls and the
+number of `database is locked` errors.
+
+Usage:
+    python benchmarks/bench_contention.py --writers 1 4 8 --duration 5
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queuectl.db.migrations import init_db
+from queuectl.db.repo import connect
+from queuectl.utils import utcnow_iso
+
+
+def open_conn(db_path, tuned):
+    if tuned:
+        return connect(db_path)
+    # Original behaviour: default rollback journal and Python's 5 s timeout.
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=delete")
+    conn.execute("PRAGMA synchronous=full")
+    return conn
+
+
+def writer(db_path, tuned, duration, result_q):
+    conn = open_conn(db_path, tuned)
+    cur = conn.cursor()
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        job_id = str(uuid.uuid4())
+        now = utcnow_iso()
+        statements = [
+            ("INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at) "
+             "VALUES (?, 'true', 'pending', 0, 3, ?, ?)", (job_id, now, now)),
+            ("UPDATE jobs SET state='processing', updated_at=? WHERE id=?", (now, job_id)),
+            ("UPDATE jobs SET state='completed', attempts=1, updated_at=? WHERE id=?", (now, job_id)),
+        ]
+        for sql, params in statements:
+            start = time.perf_counter()
+            try:
+                cur.execute(sql, params)
+                conn.commit()
+                latencies.append(time.perf_counter() - start)
+            except sqlite3.OperationalError:
+                conn.rollback()
+                errors += 1
+    result_q.put(("writer", latencies, errors))
+
+
+def reader(db_path, tuned, duration, result_q):
+    conn = open_conn(db_path, tuned)
+    polls = errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        try:
+            conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+            polls += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    result_q.put(("reader", polls, errors))
+
+
+def run_case(writers, tuned, duration):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(db_path)
+        init_db(conn)
+        conn.close()
+
+        q = mp.Queue()
+        procs = [mp.Process(target=writer, args=(db_path, tuned, duration, q)) for _ in range(writers)]
+        procs.append(mp.Process(target=reader, args=(db_path, tuned, duration, q)))
+        for p in procs:
+            p.start()
+        results = [q.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    latencies, write_errors, polls, read_errors = [], 0, 0, 0
+    for kind, a, b in results:
+        if kind == "writer":
+            latencies.extend(a)
+            write_errors += b
+        else:
+            polls, read_errors = a, b
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {
+        "commits/s": len(latencies) / duration,
+        "p50 ms": pct(0.50),
+        "p99 ms": pct(0.99),
+        "max ms": latencies[-1] * 1000 if latencies else 0.0,
+        "reads": polls,
+        "locked": write_errors + read_errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per case")
+    args = parser.parse_args()
+
+    header = f"{'WRITERS':>7} | {'SETTINGS':8} | {'commits/s':>9} | {'p50 ms':>7} | {'p99 ms':>7} | {'max ms':>8} | {'reads':>6} | {'locked':>6}"
+    print(header)
+    print("-" * len(header))
+    for writers in args.writers:
+        for tuned in (False, True):
+            r = run_case(writers, tuned, args.duration)
+            label = "tuned" if tuned else "original"
+            print(f"{writers:>7} | {label:8} | {r['commits/s']:>9.0f} | {r['p50 ms']:>7.2f} | "
+                  f"{r['p99 ms']:>7.2f} | {r['max ms']:>8.1f} | {r['reads']:>6} | {r['locked']:>6}")
+
+
+if __name__ == "__main__":
+    main()
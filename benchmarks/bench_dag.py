@@ -0,0 +1,123 @@
+# benchmarks/bench_dag.py
+
+"""
+Dependency (DAG) benchmark
+--------------------------
+Enqueues 100k-node DAGs with `depends_on` and runs them to completion with
+the worker's database path (claim a batch, then write the outcomes in one
+transaction, where the release trigger unblocks children). Commands are
+not executed, so the numbers are the queue's own overhead per node.
+
+Shapes:
+- fanout:  one root, every other node depends on it;
+- fanin:   every node but the last is a root, the last depends on all;
+- layered: layers of WIDTH nodes, each depending on two nodes of the layer above.
+
+For comparison, `chain` times the old approach of each job enqueueing the
+next through the CLI (a Python start and a database connect per hop),
+sampled over a few hops and reported as hops/s.
+
+Usage:
+    python benchmarks/bench_dag.py --nodes 100000 --batch 100
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from queuectl.db.repo import connect, insert_jobs, claim_jobs
+from queuectl.utils import utcnow_iso
+
+WIDTH = 1000
+
+
+def fanout(n):
+    yield {"id": "n0", "command": "true"}
+    for i in range(1, n):
+        yield {"id": f"n{i}", "command": "true", "depends_on": ["n0"]}
+
+
+def fanin(n):
+    for i in range(n - 1):
+        yield {"id": f"n{i}", "command": "true"}
+    yield {"id": f"n{n - 1}", "command": "true", "depends_on": [f"n{i}" for i in range(n - 1)]}
+
+
+def layered(n):
+    for i in range(n):
+        if i < WIDTH:
+            yield {"id": f"n{i}", "command": "true"}
+        else:
+            above = i - WIDTH
+            yield {"id": f"n{i}", "command": "true",
+                   "depends_on": [f"n{above}", f"n{above - above % WIDTH + (above + 1) % WIDTH}"]}
+
+
+SHAPES = {"fanout": fanout, "fanin": fanin, "layered": layered}
+
+
+def run_shape(shape, nodes, batch):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        for _ in insert_jobs(conn, SHAPES[shape](nodes)):
+            pass
+        enqueue = nodes / (time.perf_counter() - start)
+
+        done = 0
+        start = time.perf_counter()
+        while True:
+            claimed = claim_jobs(conn, batch, ["default"], owner="bench")
+            if not claimed:
+                break
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            cur.executemany("""
+                UPDATE jobs SET state='completed', attempts=1, updated_at=?, lease_owner=NULL
+                WHERE id=? AND lease_owner=?
+            """, [(utcnow_iso(), job.id, "bench") for job in claimed])
+            conn.commit()
+            done += len(claimed)
+        run = done / (time.perf_counter() - start)
+        assert done == nodes, (shape, done)
+        conn.close()
+    return enqueue, run
+
+
+def chain_rate(hops):
+    """Each hop: a fresh interpreter enqueueing the next job via the CLI."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, QUEUECTL_DB=os.path.join(tmp, "chain.db"), PYTHONPATH=ROOT)
+        start = time.perf_counter()
+        for i in range(hops):
+            subprocess.run([sys.executable, "-m", "queuectl.cli", "enqueue",
+                            f'{{"id": "hop{i}", "command": "true"}}'],
+                           env=env, check=True, stdout=subprocess.DEVNULL)
+        return hops / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=100, help="Jobs claimed and flushed per transaction")
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=["fanout", "fanin", "layered"])
+    parser.add_argument("--chain-hops", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'SHAPE':>8} | {'NODES':>8} | {'enqueue nodes/s':>15} | {'run nodes/s':>11}")
+    print("-" * 52)
+    for shape in args.shapes:
+        enqueue, run = run_shape(shape, args.nodes, args.batch)
+        print(f"{shape:>8} | {args.nodes:>8} | {enqueue:>15.0f} | {run:>11.0f}")
+    if args.chain_hops:
+        print(f"{'chain':>8} | {args.chain_hops:>8} | {'-':>15} | {chain_rate(args.chain_hops):>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_enqueue.py
+
+"""
+Bulk enqueue benchmark
+----------------------
+Generates a JSONL file of jobs and loads it with
+`queuectl enqueue --file`, reporting jobs/s and the peak RSS of the loader
+for increasing file sizes (memory should stay flat). For comparison, times
+a sample of one-process-per-job `queuectl enqueue '<json>'` invocations.
+
+Usage:
+    python benchmarks/bench_enqueue.py --sizes 100000 1000000 --single 50
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_loader(tmp, path):
+    # mmap'd database pages count towards RSS; disable mmap so the reported
+    # peak reflects the loader's own memory rather than the file size.
+    env = dict(os.environ, QUEUECTL_DB=os.path.join(tmp, "bench.db"), PYTHONPATH=ROOT,
+               QUEUECTL_MMAP_SIZE="0")
+    cmd = [sys.executable, "-c",
+           "import resource, sys\n"
+           "from queuectl.cli import main\n"
+           "sys.argv = ['queuectl', 'enqueue', '--file', sys.argv[1]]\n"
+           "main()\n"
+           "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)\n",
+           path]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=tmp, env=env, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    max_rss_kb = int(proc.stderr.strip().splitlines()[-1])
+    return elapsed, max_rss_kb, proc.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--single", type=int, default=50, help="Per-job CLI invocations to sample")
+    args = parser.parse_args()
+
+    print(f"{'JOBS':>9} | {'seconds':>8} | {'jobs/s':>8} | {'max RSS MB':>10}")
+    print("-" * 46)
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "jobs.jsonl")
+            with open(path, "w") as f:
+                for i in range(size):
+                    f.write(json.dumps({"command": f"echo job {i}", "max_retries": 2}) + "\n")
+            elapsed, rss, _ = run_loader(tmp, path)
+            print(f"{size:>9} | {elapsed:>8.2f} | {size / elapsed:>8.0f} | {rss / 1024:>10.1f}")
+
+    if args.single:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, QUEUECTL_DB=os.path.join(tmp, "bench.db"), PYTHONPATH=ROOT)
+            start = time.perf_counter()
+            for i in range(args.single):
+                subprocess.run([sys.executable, "-m", "queuectl", "enqueue", json.dumps({"command": f"echo {i}"})],
+                               cwd=tmp, env=env, capture_output=True, check=True)
+            elapsed = time.perf_counter() - start
+        print(f"\nOne process per job: {args.single / elapsed:.0f} jobs/s "
+              f"({elapsed / args.single * 1000:.1f} ms per enqueue)")
+
+
+if __name__ == "__main__":
+    main()
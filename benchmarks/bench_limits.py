@@ -0,0 +1,103 @@
+# benchmarks/bench_limits.py
+
+"""
+Queue limits benchmark
+----------------------
+Runs N claimer processes (16 by default) against one database. Each claims
+one job at a time, "runs" it for --work milliseconds and marks it
+completed, the way a worker does. Three cases:
+
+- off:      no limits configured
+- loose:    limits configured but far above what the workers can reach,
+            so the difference from "off" is the pure bookkeeping cost
+- enforced: --rate jobs/s and --concurrency jobs in flight on the queue
+
+Reports claims/s, and for each case the highest number of jobs seen
+'processing' at once (sampled from job_counts), which must never exceed
+the concurrency cap.
+
+Usage:
+    python benchmarks/bench_limits.py --workers 16 --rate 200 --concurrency 4
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queuectl.db.repo import connect, claim_jobs, insert_jobs, load_queue_limits, set_config, throttle_wait
+from queuectl.utils import utcnow_iso
+
+
+def claimer(db_path, duration, work, result_q):
+    conn = connect(db_path)
+    limits = load_queue_limits(conn)
+    owner = f"bench:{os.getpid()}"
+    claimed = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        jobs = claim_jobs(conn, 1, ["default"], owner=owner, limits=limits)
+        if not jobs:
+            # Idle like a worker: until the next token, or briefly.
+            time.sleep(min(throttle_wait(conn, limits) or 0.005, 0.005))
+            continue
+        time.sleep(work)
+        conn.execute("UPDATE jobs SET state='completed', updated_at=?, lease_owner=NULL WHERE id=?",
+                     (utcnow_iso(), jobs[0].id))
+        conn.commit()
+        claimed += 1
+    result_q.put(claimed)
+
+
+def run_case(workers, duration, work, limits):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        conn = connect(db_path)
+        for _ in insert_jobs(conn, ({"id": f"job-{i:09d}", "command": "true"} for i in range(200_000))):
+            pass
+        for key, value in limits.items():
+            set_config(conn, f"limit.default.{key}", value)
+
+        q = mp.Queue()
+        procs = [mp.Process(target=claimer, args=(db_path, duration, work, q)) for _ in range(workers)]
+        for p in procs:
+            p.start()
+        peak = 0
+        while any(p.is_alive() for p in procs) and q.qsize() < workers:
+            row = conn.execute("SELECT count FROM job_counts WHERE queue='default' AND state='processing'").fetchone()
+            peak = max(peak, row[0] if row else 0)
+            time.sleep(0.005)
+        claimed = sum(q.get() for _ in procs)
+        for p in procs:
+            p.join()
+        conn.close()
+    return claimed / duration, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per case")
+    parser.add_argument("--work", type=float, default=2.0, help="Milliseconds each job 'runs'")
+    parser.add_argument("--rate", type=float, default=200, help="Enforced jobs/s")
+    parser.add_argument("--concurrency", type=int, default=4, help="Enforced jobs in flight")
+    args = parser.parse_args()
+
+    cases = [
+        ("off", {}),
+        ("loose", {"rate": 1_000_000, "burst": 1_000_000, "concurrency": 10_000}),
+        ("enforced", {"rate": args.rate, "concurrency": args.concurrency}),
+    ]
+    print(f"{'CASE':>8} | {'WORKERS':>7} | {'claims/s':>9} | {'peak in flight':>14}")
+    print("-" * 48)
+    for name, limits in cases:
+        rate, peak = run_case(args.workers, args.duration, args.work / 1000, limits)
+        print(f"{name:>8} | {args.workers:>7} | {rate:>9.0f} | {peak:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_list.py
+
+"""
+Job listing benchmark
+---------------------
+Compares the old `queuectl list` query (one fetchall() of the whole table)
+with the keyset-paginated iter_jobs stream on tables of growing size:
+time to the first row, time to read every row, and peak Python memory
+while doing it.
+
+Usage:
+    python benchmarks/bench_list.py --sizes 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queuectl.db.repo import connect, insert_jobs, iter_jobs
+
+
+def old_list(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT id, command, state, attempts, max_retries FROM jobs")
+    return iter(cur.fetchall())
+
+
+def measure(listing, conn):
+    start = time.perf_counter()
+    rows = listing(conn)
+    next(rows)
+    first = time.perf_counter() - start
+    for _ in rows:
+        pass
+    total = time.perf_counter() - start
+
+    # Memory in a separate pass: tracemalloc slows everything down.
+    tracemalloc.start()
+    for _ in listing(conn):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first * 1000, total, peak / 2**20
+
+
+def run_case(size):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, "bench.db"))
+        jobs = ({"id": f"job-{i:09d}", "command": f"echo job {i} " + "x" * 60} for i in range(size))
+        for _ in insert_jobs(conn, jobs):
+            pass
+        old = measure(old_list, conn)
+        new = measure(iter_jobs, conn)
+        conn.close()
+    return old, new
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'ROWS':>10} | {'':6} | {'first row ms':>12} | {'all rows s':>10} | {'peak MiB':>8}")
+    print("-" * 58)
+    for size in args.sizes:
+        old, new = run_case(size)
+        for label, (first, total, peak) in (("old", old), ("stream", new)):
+            print(f"{size:>10} | {label:6} | {first:>12.2f} | {total:>10.2f} | {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_pyexec.py
+
+"""
+Python callable jobs benchmark
+------------------------------
+Runs the same tiny Python job (json.dumps of a small list) three ways and
+reports jobs/s at each concurrency level:
+
+- shell python:  execute_command('python -c "..."'), the way a shell job
+                 running a Python script pays for /bin/sh plus a fresh
+                 interpreter every time
+- shell true:    execute_command("true"), the floor for any shell job
+- callable:      PythonPool.run("json:dumps", ...) in warm children
+
+Usage:
+    python benchmarks/bench_pyexec.py --jobs 200 --concurrency 1 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queuectl.executor import execute_command
+from queuectl.pyexec import PythonPool
+
+
+def rate(run_one, jobs, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: run_one(), range(jobs)))
+    elapsed = time.perf_counter() - start
+    assert all(code == 0 for code, _, _ in results), results[:3]
+    return jobs / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    python_cmd = f'"{sys.executable}" -c "import json; print(json.dumps([1, 2, 3]))"'
+    print(f"{'CONCURRENCY':>11} | {'shell python/s':>14} | {'shell true/s':>12} | {'callable/s':>10}")
+    print("-" * 58)
+    for concurrency in args.concurrency:
+        shell_python = rate(lambda: execute_command(python_cmd), args.jobs, concurrency)
+        shell_true = rate(lambda: execute_command("true"), args.jobs, concurrency)
+        pool = PythonPool(size=concurrency, preload=["json"])
+        try:
+            callable_rate = rate(lambda: pool.run("json:dumps", "[[1, 2, 3]]"), args.jobs * 10, concurrency)
+        finally:
+            pool.close()
+        print(f"{concurrency:>11} | {shell_python:>14.0f} | {shell_true:>12.0f} | {callable_rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_queues.py
+
+"""
+Named queue scheduling benchmark
+--------------------------------
+Fills a table with jobs spread over Q queues, with one "noisy" queue
+holding most of them, then claims jobs in weighted round-robin order the
+way a worker does. Reports claim latency (it should stay flat as Q grows,
+since every probe is an index seek) and how evenly the claims were spread
+across queues (the noisy queue must not starve the others).
+
+Usage:
+    python benchmarks/bench_queues.py --queues 1 10 100 1000 --rows 200000
+"""
+
+import argparse
+import collections
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queuectl.db.repo import connect, claim_jobs, insert_jobs, list_queues
+from queuectl.worker.scheduling import WeightedRoundRobin
+
+
+def run_case(queues, rows, claims, noisy_share):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, "bench.db"))
+        names = [f"q{i:04d}" for i in range(queues)]
+        noisy = int(rows * noisy_share) if queues > 1 else rows
+
+        def jobs():
+            for i in range(noisy):
+                yield {"id": f"n{i}", "command": "true", "queue": names[0]}
+            for i in range(rows - noisy):
+                yield {"id": f"o{i}", "command": "true", "queue": names[1 + i % (queues - 1)],
+                       "priority": i % 3}
+
+        for _ in insert_jobs(conn, jobs()):
+            pass
+
+        wrr = WeightedRoundRobin({name: 1 for name in list_queues(conn)})
+        latencies, served = [], collections.Counter()
+        for _ in range(claims):
+            start = time.perf_counter()
+            got = claim_jobs(conn, 1, wrr.order())
+            latencies.append(time.perf_counter() - start)
+            for job_id, *_ in got:
+                served["noisy" if job_id.startswith("n") else "other"] += 1
+        conn.close()
+
+    latencies.sort()
+    return (sum(latencies) / len(latencies) * 1e6,
+            latencies[int(len(latencies) * 0.99)] * 1e6,
+            served["noisy"], served["other"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queues", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--claims", type=int, default=5_000)
+    parser.add_argument("--noisy-share", type=float, default=0.9,
+                        help="Fraction of all jobs sitting in the first queue")
+    args = parser.parse_args()
+
+    print(f"{'QUEUES':>6} | {'mean us':>8} | {'p99 us':>8} | {'noisy claims':>12} | {'other claims':>12}")
+    print("-" * 60)
+    for q in args.queues:
+        mean, p99, noisy, other = run_case(q, args.rows, args.claims, args.noisy_share)
+        print(f"{q:>6} | {mean:>8.0f} | {p99:>8.0f} | {noisy:>12} | {other:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/bench_server.py
+
+"""
+Enqueue server benchmark
+------------------------
+Compares ways of getting jobs into a fresh database:
+
+- cli:        one `queuectl enqueue '<json>'` process per job, the way a
+              shell script or cron entry enqueues
+- client:     one Client.enqueue() call per job against `queuectl serve`,
+              from a single thread
+- concurrent: the same from --threads producer threads at once; the server
+              group-commits their requests, and `jobs/commit` shows how many
+              jobs each transaction carried
+- batched:    Client.enqueue_many() with --batch jobs per request
+
+The server runs as a subprocess on a Unix socket. The CLI case is slow
+enough that it enqueues only --cli-jobs jobs.
+
+Usage:
+    python benchmarks/bench_server.py --jobs 5000 --threads 8
+    python benchmarks/bench_server.py --group-wait-ms 1
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from queuectl.client import Client
+
+
+def job(case, i):
+    return {"id": f"{case}-{i:09d}", "command": "true"}
+
+
+def bench_cli(env, jobs):
+    begin = time.perf_counter()
+    for i in range(jobs):
+        subprocess.run([sys.executable, "-m", "queuectl", "enqueue", json.dumps(job("cli", i))],
+                       env=env, check=True, stdout=subprocess.DEVNULL)
+    return jobs / (time.perf_counter() - begin)
+
+
+def bench_client(url, jobs):
+    with Client(url) as client:
+        begin = time.perf_counter()
+        for i in range(jobs):
+            client.enqueue(job("client", i))
+        return jobs / (time.perf_counter() - begin)
+
+
+def bench_concurrent(url, jobs, threads):
+    per_thread = jobs // threads
+
+    def produce(t):
+        with Client(url) as client:
+            for i in range(per_thread):
+                client.enqueue(job(f"concurrent{t}", i))
+
+    workers = [threading.Thread(target=produce, args=(t,)) for t in range(threads)]
+    begin = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - begin)
+
+
+def bench_batched(url, jobs, batch):
+    with Client(url) as client:
+        begin = time.perf_counter()
+        for start in range(0, jobs, batch):
+            client.enqueue_many(job("batched", i) for i in range(start, min(start + batch, jobs)))
+        return jobs / (time.perf_counter() - begin)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=5000, help="Jobs per server case")
+    parser.add_argument("--cli-jobs", type=int, default=100, help="Jobs for the CLI case")
+    parser.add_argument("--threads", type=int, default=8, help="Producer threads in the concurrent case")
+    parser.add_argument("--batch", type=int, default=100, help="Jobs per request in the batched case")
+    parser.add_argument("--group-wait-ms", type=float, default=0, help="Passed to queuectl serve")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, QUEUECTL_DB=os.path.join(tmp, "bench.db"),
+                   PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        env.pop("QUEUECTL_BACKEND", None)
+        sock = os.path.join(tmp, "queuectl.sock")
+        url = f"unix:{sock}"
+        server = subprocess.Popen([sys.executable, "-m", "queuectl", "serve", "--socket", sock,
+                                   "--group-wait-ms", str(args.group_wait_ms)],
+                                  env=env, stdout=subprocess.DEVNULL)
+        try:
+            while not os.path.exists(sock):
+                if server.poll() is not None:
+                    sys.exit("queuectl serve exited")
+                time.sleep(0.05)
+
+            print(f"{'CASE':>10} | {'jobs':>6} | {'jobs/s':>8} | {'vs cli':>7} | {'jobs/commit':>11}")
+            print("-" * 55)
+            cli = bench_cli(env, args.cli_jobs)
+            print(f"{'cli':>10} | {args.cli_jobs:>6} | {cli:>8.0f} | {1:>6.1f}x | {1:>11.1f}")
+            cases = [("client", lambda: bench_client(url, args.jobs)),
+                     ("concurrent", lambda: bench_concurrent(url, args.jobs, args.threads)),
+                     ("batched", lambda: bench_batched(url, args.jobs, args.batch))]
+            with Client(url) as probe:
+                for name, run in cases:
+                    before = probe.health()
+                    rate = run()
+                    after = probe.health()
+                    enqueued = after["enqueued"] - before["enqueued"]
+                    per_commit = enqueued / max(1, after["commits"] - before["commits"])
+                    print(f"{name:>10} | {enqueued:>6} | {rate:>8.0f} | {rate / cli:>6.1f}x | {per_commit:>11.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
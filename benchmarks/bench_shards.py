@@ -0,0 +1,103 @@
+# benchmarks/bench_shards.py
+
+"""
+Sharded claim throughput benchmark
+----------------------------------
+Runs a fixed pool of worker processes against 1, 2, 4 and 8 shards and
+reports how many jobs per second they claim and complete together. Each
+worker opens the sharded backend with its own home shard (worker i gets
+shard i % N), then loops: claim a batch, record the outcomes. Commands
+are not executed, so the numbers are the cost of the two write
+transactions per batch.
+
+With one shard every worker queues on the same file lock. With N shards,
+N of them commit at once. The gain needs something for the shards to do
+in parallel: CPU cores, or commits that wait on the disk. `--synchronous
+full` (an fsync per commit, as durable setups run) shows the effect even
+on a machine with a single core.
+
+Usage:
+    python benchmarks/bench_shards.py --shards 1 2 4 8 --workers 8
+    python benchmarks/bench_shards.py --synchronous full
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queuectl.backends import ShardedBackend
+from queuectl.models import JobOutcome
+
+
+def populate(path, shards, jobs):
+    backend = ShardedBackend(shards, path)
+    for _ in backend.enqueue_many({"id": f"job-{i:09d}", "command": "true"} for i in range(jobs)):
+        pass
+    backend.close()
+
+
+def worker(path, shards, home, batch, start, duration, result_q):
+    backend = ShardedBackend(shards, path, home=home)
+    owner = f"bench-{home}"
+    done = stolen = 0
+    start.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        claimed = backend.claim(batch, ["default"], owner=owner)
+        if not claimed:
+            break
+        stolen += sum(1 for job in claimed if backend._where[job.id] != backend.home)
+        backend.record(owner, [JobOutcome(job.id, "completed", 1) for job in claimed])
+        done += len(claimed)
+    backend.close()
+    result_q.put((done, stolen))
+
+
+def run_case(shards, workers, jobs, batch, duration):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        populate(path, shards, jobs)
+        start, q = mp.Event(), mp.Queue()
+        procs = [mp.Process(target=worker, args=(path, shards, i, batch, start, duration, q))
+                 for i in range(workers)]
+        for p in procs:
+            p.start()
+        time.sleep(1)  # let every worker open its connections
+        begin = time.perf_counter()
+        start.set()
+        results = [q.get() for _ in procs]
+        elapsed = time.perf_counter() - begin
+        for p in procs:
+            p.join()
+    done = sum(r[0] for r in results)
+    return done / min(elapsed, duration), sum(r[1] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--jobs", type=int, default=200_000, help="Jobs enqueued before each case")
+    parser.add_argument("--batch", type=int, default=1, help="Jobs claimed per transaction")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per case")
+    parser.add_argument("--synchronous", choices=["off", "normal", "full"], default="normal",
+                        help="PRAGMA synchronous for every shard (full = fsync per commit)")
+    args = parser.parse_args()
+    os.environ["QUEUECTL_SYNCHRONOUS"] = args.synchronous
+
+    print(f"{'SHARDS':>6} | {'WORKERS':>7} | {'jobs/s':>8} | {'speedup':>7} | {'stolen':>7}")
+    print("-" * 48)
+    base = None
+    for shards in args.shards:
+        rate, stolen = run_case(shards, args.workers, args.jobs, args.batch, args.duration)
+        base = base or rate
+        print(f"{shards:>6} | {args.workers:>7} | {rate:>8.0f} | {rate / base:>6.2f}x | {stolen:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_startup.py
+
+"""
+CLI startup benchmark
+---------------------
+Times short commands from process start to exit, the way a shell script
+or a monitoring check runs them:
+
+- python:   `python -c pass`, the interpreter's own floor
+- import:   `import queuectl.cli`
+- status:   `queuectl status` (target: under --target-ms, 50 by default)
+- list:     `queuectl list --limit 10`
+- enqueue:  `queuectl enqueue '<job>'`
+- worker:   `import queuectl.worker.worker_proc`, paid by every worker the
+            manager spawns
+
+Each command runs --runs times against a temp database of --jobs jobs,
+after warm-up runs that write the bytecode caches (as an installed package
+has them). The minimum is the steadiest number on a busy machine; the
+median is shown next to it. `--imports` adds the modules that cost the
+most to import for `status` (python -X importtime).
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 50 --imports 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_command(cmd, env, runs, warmup=2):
+    quiet = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    for _ in range(warmup):
+        subprocess.run(cmd, env=env, check=True, **quiet)
+    samples = []
+    for _ in range(runs):
+        begin = time.perf_counter()
+        subprocess.run(cmd, env=env, check=True, **quiet)
+        samples.append((time.perf_counter() - begin) * 1000)
+    return min(samples), statistics.median(samples)
+
+
+def import_costs(env, top):
+    """(self µs, cumulative µs, module) for the costliest imports of `status`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "queuectl", "status"],
+                            env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, module = line[len("import time:"):].split("|")
+        rows.append((int(own), int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Timed runs per command")
+    parser.add_argument("--jobs", type=int, default=1000, help="Jobs in the database")
+    parser.add_argument("--target-ms", type=float, default=50.0, help="Budget for `queuectl status`")
+    parser.add_argument("--imports", type=int, default=0, metavar="N",
+                        help="Also list the N modules with the highest own import time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, QUEUECTL_DB=os.path.join(tmp, "bench.db"),
+                   PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        env.pop("QUEUECTL_BACKEND", None)
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        with open(os.path.join(tmp, "jobs.jsonl"), "w") as f:
+            for i in range(args.jobs):
+                f.write(json.dumps({"command": "true"}) + "\n")
+        subprocess.run([sys.executable, "-m", "queuectl", "enqueue", "--file", f.name],
+                       env=env, check=True, stdout=subprocess.DEVNULL)
+
+        py = sys.executable
+        cases = [
+            ("python", [py, "-c", "pass"]),
+            ("import", [py, "-c", "import queuectl.cli"]),
+            ("status", [py, "-m", "queuectl", "status"]),
+            ("list", [py, "-m", "queuectl", "list", "--limit", "10"]),
+            ("enqueue", [py, "-m", "queuectl", "enqueue", json.dumps({"command": "true"})]),
+            ("worker", [py, "-c", "import queuectl.worker.worker_proc"]),
+        ]
+        print(f"{'COMMAND':>8} | {'min ms':>7} | {'median ms':>9}")
+        print("-" * 31)
+        results = {}
+        for name, cmd in cases:
+            results[name] = time_command(cmd, env, args.runs)
+            print(f"{name:>8} | {results[name][0]:>7.1f} | {results[name][1]:>9.1f}")
+
+        best = results["status"][0]
+        verdict = "ok" if best < args.target_ms else "OVER"
+        print(f"\nstatus: {best:.1f} ms best vs {args.target_ms:g} ms target ({verdict}); "
+              f"the interpreter alone takes {results['python'][0]:.1f} ms")
+
+        if args.imports:
+            print(f"\n{'self us':>8} | {'cumul us':>8} | module")
+            for own, cumulative, module in import_costs(env, args.imports):
+                print(f"{own:>8} | {cumulative:>8} | {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_status.py
+
+"""
+Status query benchmark
+----------------------
+Times the query behind `queuectl status` against tables of growing size:
+the old `SELECT state, COUNT(*) FROM jobs GROUP BY state` full count versus
+reading the trigger-maintained job_counts table. Also reports what the
+triggers cost bulk enqueue.
+
+Usage:
+    python benchmarks/bench_status.py --sizes 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queuectl.db.repo import connect, insert_jobs, job_counts
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run_case(size, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, "bench.db"))
+        jobs = ({"id": f"job-{i:09d}", "command": "true", "queue": f"q{i % 4}"} for i in range(size))
+        start = time.perf_counter()
+        for _ in insert_jobs(conn, jobs):
+            pass
+        insert_rate = size / (time.perf_counter() - start)
+        # Most rows in a long-lived table are completed.
+        conn.execute("UPDATE jobs SET state='completed' WHERE rowid % 10 != 0")
+        conn.commit()
+
+        full = timed(lambda: conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall(), repeat)
+        counted = timed(lambda: job_counts(conn), repeat)
+        assert job_counts(conn) == dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        conn.close()
+    return insert_rate, full, counted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'ROWS':>10} | {'enqueue jobs/s':>14} | {'GROUP BY ms':>11} | {'job_counts ms':>13}")
+    print("-" * 58)
+    for size in args.sizes:
+        rate, full, counted = run_case(size, args.repeat)
+        print(f"{size:>10} | {rate:>14.0f} | {full:>11.2f} | {counted:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_wakeup.py
+
+"""
+Enqueue-to-start latency benchmark
+----------------------------------
+Starts a real worker manager against a temporary database, enqueues jobs one
+at a time (insert + wakeup notification, as `queuectl enqueue` does) and
+measures how long each one waits before its command starts running. The job
+command prints its own start time, so the latency is read back from the
+job's output.
+
+Also samples the CPU time used by the manager and its workers while the
+queue is idle, as a proxy for idle database polling.
+
+Runs once with the wakeup channel and once with QUEUECTL_WAKEUP=off (the
+original one-second poll). Linux only: relies on `date +%s.%N` and /proc.
+
+Usage:
+    python benchmarks/bench_wakeup.py --workers 2 --jobs 100
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from queuectl.db.repo import connect, insert_job
+from queuectl.wakeup import notify
+
+
+def cpu_seconds(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+        except OSError:
+            pass
+    return total / os.sysconf("SC_CLK_TCK")
+
+
+def child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def run_case(workers, jobs, gap, idle, use_wakeup):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, QUEUECTL_DB=os.path.join(tmp, "bench.db"),
+                   QUEUECTL_WAKEUP="on" if use_wakeup else "off", PYTHONPATH=ROOT)
+        os.environ.update(QUEUECTL_DB=env["QUEUECTL_DB"], QUEUECTL_WAKEUP=env["QUEUECTL_WAKEUP"])
+        conn = connect()
+
+        mgr = subprocess.Popen([sys.executable, "-m", "queuectl", "worker", "start", "--count", str(workers)],
+                               cwd=tmp, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        time.sleep(2)  # let workers start and go idle
+
+        pids = [mgr.pid] + child_pids(mgr.pid)
+        cpu_before = cpu_seconds(pids)
+        time.sleep(idle)
+        idle_cpu = cpu_seconds(pids) - cpu_before
+
+        enqueued = {}
+        for _ in range(jobs):
+            job_id = str(uuid.uuid4())
+            with contextlib.redirect_stdout(io.StringIO()):
+                insert_job(conn, {"id": job_id, "command": "date +%s.%N"})
+            enqueued[job_id] = time.time()
+            notify()
+            time.sleep(gap)
+
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            done = conn.execute("SELECT COUNT(*) FROM jobs WHERE state='completed'").fetchone()[0]
+            if done == jobs:
+                break
+            time.sleep(0.2)
+
+        latencies = []
+        for job_id, output in conn.execute("SELECT id, output FROM jobs WHERE state='completed'"):
+            latencies.append((float(output) - enqueued[job_id]) * 1000)
+        mgr.terminate()
+        mgr.wait()
+        conn.close()
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else float("nan")
+
+    return pct(0.50), pct(0.99), len(latencies), idle_cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--gap", type=float, default=0.05, help="Seconds between enqueues")
+    parser.add_argument("--idle", type=float, default=5.0, help="Seconds of idle CPU sampling")
+    args = parser.parse_args()
+
+    print(f"{'MODE':8} | {'p50 ms':>8} | {'p99 ms':>8} | {'jobs':>5} | {'idle CPU s':>10}")
+    print("-" * 52)
+    for use_wakeup in (False, True):
+        p50, p99, n, idle_cpu = run_case(args.workers, args.jobs, args.gap, args.idle, use_wakeup)
+        label = "wakeup" if use_wakeup else "poll"
+        print(f"{label:8} | {p50:>8.1f} | {p99:>8.1f} | {n:>5} | {idle_cpu:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# queuectl/archive.py
+
+"""
+Archive
+-------
+Moves terminal jobs (completed or dead) older than a retention window out of
+the live `jobs` table into a separate SQLite file, `<db>-archive.db` by
+default, with their output and last error zlib-compressed. The live table
+stays small, so claims, listings and VACUUM only ever deal with work that is
+still relevant, while archived jobs remain queryable through
+`queuectl archive list/show`.
+
+Jobs move in bounded batches. Each batch is one short write transaction
+(copy into the archive, then delete from `jobs`), with a pause between
+batches so workers waiting for the write lock always get a turn.
+"""
+
+import datetime
+import threading
+import time
+import zlib
+
+from queuectl.db.repo import get_setting
+
+TERMINAL_STATES = ("completed", "dead")
+
+# Defaults, overridable through the config table or the environment.
+DEFAULT_RETENTION_DAYS = 7.0
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAUSE = 0.05          # seconds between batches
+
+_COLUMNS = ("id, command, state, attempts, max_retries, created_at, updated_at, "
+            "last_error, output, priority, queue")
+
+
+def archive_path(conn) -> str:
+    # By default the archive sits next to the file `conn` has open.
+    main = next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+    return get_setting(conn, "archive.path", "QUEUECTL_ARCHIVE_PATH", main + "-archive.db")
+
+
+def _pack(text):
+    return zlib.compress(text.encode("utf-8"), 6) if text else None
+
+
+def _unpack(blob):
+    return zlib.decompress(blob).decode("utf-8", errors="replace") if blob else None
+
+
+def attach(conn, path: str = None):
+    """Attach the archive database to `conn` as `archive`, creating its schema."""
+    cur = conn.cursor()
+    cur.execute("PRAGMA database_list")
+    if any(row[1] == "archive" for row in cur.fetchall()):
+        return
+    conn.commit()
+    cur.execute("ATTACH DATABASE ? AS archive", (path or archive_path(conn),))
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS archive.jobs (
+        id TEXT PRIMARY KEY,
+        command TEXT NOT NULL,
+        state TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        max_retries INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        last_error BLOB,
+        output BLOB,
+        priority INTEGER NOT NULL DEFAULT 0,
+        queue TEXT NOT NULL DEFAULT 'default',
+        archived_at TEXT NOT NULL
+    );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS archive.idx_archive_updated ON jobs (updated_at)")
+    conn.commit()
+
+
+def cutoff(retention_days: float) -> str:
+    when = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=retention_days)
+    return when.isoformat()
+
+
+def archive_batch(conn, before: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Move up to `batch_size` terminal jobs last updated before `before` into
+    the attached archive. Returns how many were moved.
+
+    The copy uses INSERT OR REPLACE, so if the process dies between the two
+    databases committing, the next batch simply copies the same rows again.
+    """
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute(f"""
+            SELECT {_COLUMNS} FROM jobs
+            WHERE state IN ('completed', 'dead') AND updated_at < ?
+            ORDER BY updated_at
+            LIMIT ?
+        """, (before, batch_size))
+        rows = cur.fetchall()
+        if not rows:
+            conn.rollback()
+            return 0
+        now = datetime.datetime.now(datetime.UTC).isoformat()
+        cur.executemany(f"""
+            INSERT OR REPLACE INTO archive.jobs ({_COLUMNS}, archived_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [row[:7] + (_pack(row[7]), _pack(row[8])) + row[9:] + (now,) for row in rows])
+        cur.executemany("DELETE FROM jobs WHERE id=? AND state IN ('completed', 'dead')",
+                        [(row[0],) for row in rows])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+
+def archive_jobs(conn, retention_days: float, batch_size: int = DEFAULT_BATCH_SIZE,
+                 pause: float = DEFAULT_PAUSE, stop_event: threading.Event = None, path: str = None):
+    """
+    Archive every eligible job, one batch at a time, into `path` (by
+    default archive_path(conn)). Yields the size of each batch.
+    """
+    attach(conn, path)
+    before = cutoff(retention_days)
+    while stop_event is None or not stop_event.is_set():
+        moved = archive_batch(conn, before, batch_size)
+        if not moved:
+            return
+        yield moved
+        if moved < batch_size:
+            return
+        if stop_event is not None:
+            stop_event.wait(pause)
+        else:
+            time.sleep(pause)
+
+
+def archive_settings(conn):
+    """(retention_days, batch_size) from the environment or config table."""
+    retention = float(get_setting(conn, "archive.retention_days", "QUEUECTL_ARCHIVE_RETENTION_DAYS",
+                                  DEFAULT_RETENTION_DAYS))
+    batch_size = int(get_setting(conn, "archive.batch_size", "QUEUECTL_ARCHIVE_BATCH_SIZE",
+                                 DEFAULT_BATCH_SIZE))
+    return retention, batch_size
+
+
+def list_archived(conn, state: str = None, limit: int = 100):
+    attach(conn)
+    cur = conn.cursor()
+    sql = "SELECT id, command, state, attempts, updated_at FROM archive.jobs"
+    params = []
+    if state:
+        sql += " WHERE state=?"
+        params.append(state)
+    sql += " ORDER BY updated_at DESC LIMIT ?"
+    params.append(limit)
+    cur.execute(sql, params)
+    return cur.fetchall()
+
+
+def get_archived(conn, job_id: str):
+    """An archived job as a dict with its output decompressed, or None."""
+    attach(conn)
+    cur = conn.cursor()
+    cur.execute(f"SELECT {_COLUMNS}, archived_at FROM archive.jobs WHERE id=?", (job_id,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    job = dict(zip([c.strip() for c in _COLUMNS.split(",")] + ["archived_at"], row))
+    job["last_error"] = _unpack(job["last_error"])
+    job["output"] = _unpack(job["output"])
+    return job
+
+
+class Archiver(threading.Thread):
+    """
+    Background archiving for the worker manager, on its own handle to
+    `backend` (every shard of a sharded one, into shard 0's archive file).
+    """
+
+    def __init__(self, interval: float, backend):
+        super().__init__(name="archiver", daemon=True)
+        self.interval = interval
+        self.backend = backend
+        self.stop_event = threading.Event()
+
+    def run(self):
+        backend = self.backend.for_thread()
+        try:
+            conns = backend.connections()
+            while not self.stop_event.is_set():
+                try:
+                    retention, batch_size = archive_settings(conns[0])
+                    path = archive_path(conns[0])
+                    moved = sum(sum(archive_jobs(conn, retention, batch_size, stop_event=self.stop_event,
+                                                 path=path))
+                                for conn in conns)
+                    if moved:
+                        print(f"Manager: archived {moved} job(s)")
+                except Exception as e:
+                    print(f"Manager: archiver failed: {e}")
+                self.stop_event.wait(self.interval)
+        finally:
+            backend.close()
+
+    def stop(self):
+        self.stop_event.set()
+        self.join(timeout=10)
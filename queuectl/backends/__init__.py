@@ -0,0 +1,93 @@
+# queuectl/backends/__init__.py
+
+"""
+Storage backends. `open_backend()` picks one from QUEUECTL_BACKEND:
+
+- `sqlite` (default) or `sqlite:<path>`: the shared SQLite database;
+- `sharded:<n>` or `sharded:<n>:<path>`: jobs spread over n SQLite files
+  (backends/sharded.py);
+- `log:<directory>`: the in-memory, log-structured engine (backends/log.py),
+  fsync'ed on every write when QUEUECTL_LOG_FSYNC=1.
+"""
+
+import importlib
+import os
+
+from queuectl.backends.base import BackendError, QueueBackend
+from queuectl.db.repo import resolve_db_path
+
+# "module:class" per backend, imported on first use so that a command only
+# imports the engine it runs on.
+BACKENDS = {
+    "sqlite": "queuectl.backends.sqlite:SQLiteBackend",
+    "sharded": "queuectl.backends.sharded:ShardedBackend",
+    "log": "queuectl.backends.log:LogBackend",
+}
+
+DEFAULT_LOG_DIR = "queuectl-log"
+
+
+def backend_class(kind: str):
+    module, _, name = BACKENDS[kind].partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def __getattr__(name):
+    # `from queuectl.backends import LogBackend` and friends keep working.
+    for kind, target in BACKENDS.items():
+        if target.endswith(":" + name):
+            return backend_class(kind)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _parse(spec: str = None):
+    spec = spec or os.environ.get("QUEUECTL_BACKEND") or "sqlite"
+    kind, _, arg = spec.partition(":")
+    if kind not in BACKENDS:
+        raise BackendError(f"Unknown backend '{kind}' (choose from {', '.join(sorted(BACKENDS))})")
+    return kind, arg or None
+
+
+def backend_spec(spec: str = None):
+    """(backend class, argument) for a spec like "log:/var/queue"."""
+    kind, arg = _parse(spec)
+    return backend_class(kind), arg
+
+
+def store_path(spec: str = None) -> str:
+    """
+    Where the configured backend keeps its data: the database file (shard 0's
+    under sharded:N) or the log directory. Identifies the store to the
+    wakeup channel.
+    """
+    kind, arg = _parse(spec)
+    if kind == "log":
+        return arg or DEFAULT_LOG_DIR
+    if kind == "sharded":
+        arg = (arg or "").partition(":")[2]
+    return resolve_db_path(arg or None)
+
+
+def open_backend(spec: str = None, readonly: bool = False, home: int = 0,
+                 intake: bool = False) -> QueueBackend:
+    """
+    Open the configured backend. `readonly` lets tools inspect a store
+    another process owns; `home` is the shard a worker claims from first.
+    `intake` is for producers: a log store is then opened read-only, and
+    its enqueues go through the inbox to whichever worker owns the store.
+    """
+    kind, arg = _parse(spec)
+    cls = backend_class(kind)
+    if kind == "log":
+        return cls(arg or DEFAULT_LOG_DIR, readonly=readonly or intake,
+                   fsync=os.environ.get("QUEUECTL_LOG_FSYNC") == "1")
+    if kind == "sharded":
+        count, _, path = (arg or "").partition(":")
+        if not count.isdigit() or int(count) < 1:
+            raise BackendError("Use sharded:<number of shards>[:<path>], e.g. sharded:4")
+        return cls(int(count), path or None, home=home)
+    return cls(arg)
+
+
+__all__ = ["BACKENDS", "BackendError", "LogBackend", "QueueBackend", "SQLiteBackend",
+           "ShardedBackend", "backend_class", "backend_spec", "open_backend", "store_path"]
@@ -0,0 +1,157 @@
+# queuectl/backends/base.py
+
+"""
+Queue backend interface
+-----------------------
+Everything the CLI, the workers and the manager do to jobs goes through a
+`QueueBackend`: enqueue, claim, report outcomes, renew and reap leases,
+list and count. Features that only exist on top of SQLite (rate limits,
+schedules, the result cache, the archive, bulk DLQ operations, the config
+table) have no-op defaults here and are implemented by SQLiteBackend alone.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from queuectl.models import ClaimedJob, JobOutcome
+
+
+class BackendError(Exception):
+    """A backend cannot be opened or cannot do what was asked."""
+
+
+class QueueBackend(ABC):
+    # Name used in QUEUECTL_BACKEND specs.
+    name = "base"
+    # Whether several processes may use the same store at once. A backend
+    #: that is not shared is owned by a single worker process.
+    shared = True
+
+    @abstractmethod
+    def enqueue(self, job: dict) -> bool:
+        """Add a prepared job. Returns False if its id already exists."""
+
+    def enqueue_many(self, jobs: Iterable[dict], chunk_size: int = 10000) -> Iterator[Tuple[int, int]]:
+        """Add jobs from any iterable, yielding (inserted, skipped) per committed chunk."""
+        inserted = skipped = 0
+        for i, job in enumerate(jobs, 1):
+            if self.enqueue(job):
+                inserted += 1
+            else:
+                skipped += 1
+            if i % chunk_size == 0:
+                yield inserted, skipped
+                inserted = skipped = 0
+        if inserted or skipped:
+            yield inserted, skipped
+
+    def enqueue_groups(self, groups: List[List[dict]]) -> List[Tuple[int, int]]:
+        """
+        Add several batches of jobs, in as few commits as the backend can
+        manage. Returns (inserted, skipped) per batch.
+        """
+        results = []
+        for jobs in groups:
+            counts = list(self.enqueue_many(jobs))
+            results.append((sum(i for i, _ in counts), sum(s for _, s in counts)))
+        return results
+
+    @abstractmethod
+    def claim(self, limit: int, queues, owner: str, lease_seconds: float = 30,
+              limits: dict = None) -> List[ClaimedJob]:
+        """Lease up to `limit` ready jobs to `owner`, trying `queues` in order."""
+
+    @abstractmethod
+    def record(self, owner: str, outcomes: List[JobOutcome]) -> Tuple[List[str], bool]:
+        """
+        Apply outcomes of jobs leased to `owner`, all at once. Returns the ids
+        whose lease had been lost (those outcomes are dropped), and whether
+        any blocked job was released and may now be claimed.
+        """
+
+    def complete(self, owner: str, job_id: str, attempts: int, output: str = None) -> bool:
+        """Record one success. `attempts` includes this attempt."""
+        lost, _ = self.record(owner, [JobOutcome(job_id, "completed", attempts, output)])
+        return not lost
+
+    def fail(self, owner: str, job_id: str, attempts: int, error: str = None,
+             output: str = None, retry_at: str = None) -> bool:
+        """Record one failure: retried at `retry_at`, or dead without one."""
+        outcome = JobOutcome(job_id, "failed" if retry_at else "dead", attempts, output, error, retry_at)
+        lost, _ = self.record(owner, [outcome])
+        return not lost
+
+    @abstractmethod
+    def release(self, owner: str, job_ids: List[str]) -> int:
+        """Hand claimed but unstarted jobs back to the queue."""
+
+    @abstractmethod
+    def renew_leases(self, owner: str, lease_seconds: float, job_ids: List[str] = None) -> int:
+        """Extend every lease held by `owner`, or only those of `job_ids`."""
+
+    @abstractmethod
+    def reap_expired(self) -> Tuple[int, int]:
+        """Requeue (or kill) jobs whose lease expired. Returns (requeued, dead)."""
+
+    @abstractmethod
+    def next_retry(self, queues=None) -> Optional[float]:
+        """Seconds until the earliest delayed job becomes due, or None."""
+
+    @abstractmethod
+    def queues(self) -> List[str]:
+        """Every queue that has received a job."""
+
+    def queue_limits(self) -> dict:
+        """Per-queue limits, {queue: QueueLimit}. None by default."""
+        return {}
+
+    def throttle_wait(self, limits: dict) -> Optional[float]:
+        """Seconds until a rate-limited queue can start a job again, or None."""
+        return None
+
+    def get_setting(self, key: str, env_var: str, default=None):
+        """A setting from the environment, falling back to `default`."""
+        return os.environ.get(env_var, default)
+
+    @abstractmethod
+    def list(self, state: str = None, queue: str = None, since: str = None,
+             after: str = None, limit: int = None) -> Iterator[tuple]:
+        """Jobs as LIST_COLUMNS tuples, in (created_at, id) order."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        """One job as a dict of LIST_COLUMNS (plus output), or None."""
+
+    @abstractmethod
+    def retry(self, job_id: str) -> bool:
+        """Move one dead job back to pending."""
+
+    @abstractmethod
+    def stats(self, by_queue: bool = False) -> dict:
+        """Job counts, {state: n} or {(queue, state): n}."""
+
+    @abstractmethod
+    def ready_stats(self, queues=None) -> Tuple[int, float]:
+        """(ready jobs, seconds the oldest ready job has waited), in `queues` or all of them."""
+
+    def cache_get(self, key: str) -> Optional[str]:
+        """A cached job output (see queuectl/cache.py), or None. No cache by default."""
+        return None
+
+    def cache_put(self, key: str, output: str, ttl: float, max_entries: int):
+        """Cache a job output for `ttl` seconds, keeping at most `max_entries`."""
+
+    def cache_touch(self, keys: List[str]):
+        """Record hits on cached outputs, which keeps them from LRU eviction."""
+
+    def fire_schedules(self, limit: int = 500) -> int:
+        """Enqueue due cron schedules. Returns how many fired."""
+        return 0
+
+    def for_thread(self) -> "QueueBackend":
+        """A handle safe to use from another thread (this one, if thread-safe)."""
+        return self
+
+    def close(self):
+        pass
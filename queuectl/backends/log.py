@@ -0,0 +1,571 @@
+# queuectl/backends/log.py
+
+"""
+Log-structured backend
+----------------------
+An in-memory queue made durable by an append-only log, for ephemeral,
+high-rate queues where SQLite's single write lock is the bottleneck.
+
+- State lives in memory: the jobs, one ready heap per queue (priority,
+  then age), a heap of delayed jobs by due time, and the leases.
+- Every change that must survive a restart (enqueue, outcome, reap, DLQ
+  retry) is appended to the current segment as JSON lines before it is
+  applied, with one write per call, so a batch of outcomes costs a single
+  write. Claims, lease renewals and releases are not logged: after a
+  restart, jobs that were running are simply ready again, and the
+  interrupted attempt is not counted.
+- Segments roll over at `segment_bytes`. Once there are more than
+  `max_segments`, the live jobs are written to a fresh snapshot segment and
+  the older segments are deleted. Opening a store replays its segments.
+- Completed jobs are dropped from memory and only counted, apart from the
+  most recent `keep_completed`. Dead jobs are kept for the DLQ. An
+  idempotency key is remembered as long as its job is.
+- A store belongs to one process, enforced by a lock file. Other processes
+  may open it read-only, e.g. for `queuectl status` or `list`. A read-only
+  handle can still enqueue: it writes the jobs to a file in `inbox/`
+  (renamed into place whole), and the owner logs and applies inbox files
+  when it opens the store and before each claim, then deletes them.
+  Duplicates are dropped there, so a read-only handle only detects the
+  ones already in its snapshot.
+
+Not supported here: depends_on, per-queue limits, cron schedules and the
+result cache, which need the SQLite backend.
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, UTC
+from typing import List
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from queuectl.backends.base import BackendError, QueueBackend
+from queuectl.db.repo import LIST_COLUMNS
+from queuectl.models import ClaimedJob, JobOutcome
+from queuectl.utils import utcnow_iso
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_SEGMENTS = 4
+DEFAULT_KEEP_COMPLETED = 10000
+
+_FIELDS = ("id", "command", "state", "attempts", "max_retries", "created_at", "updated_at",
+           "next_attempt_at", "last_error", "output", "priority", "queue", "backoff",
+           "callable", "args", "timeout", "idempotency_key", "cache_ttl", "inputs")
+
+
+def _segment_name(number: int) -> str:
+    return f"{number:08d}.log"
+
+
+def _encode(records) -> bytes:
+    return b"".join(json.dumps(r, separators=(",", ":")).encode("utf-8") + b"\n" for r in records)
+
+
+class LogBackend(QueueBackend):
+    name = "log"
+    shared = False
+
+    def __init__(self, directory: str, readonly: bool = False, fsync: bool = False,
+                 segment_bytes: int = DEFAULT_SEGMENT_BYTES, max_segments: int = DEFAULT_MAX_SEGMENTS,
+                 keep_completed: int = DEFAULT_KEEP_COMPLETED):
+        self.directory = directory
+        self.readonly = readonly
+        self.fsync = fsync
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(1, max_segments)
+        self.keep_completed = keep_completed
+        self.lock = threading.RLock()
+        self._reset()
+
+        self._lock_file = None
+        self._segment = None
+        self._segment_no = 0
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+            self._acquire_lock()
+            self._replay()
+        else:
+            self._replay_readonly()
+        if not readonly:
+            if len(self._segments()) > 1:
+                self._compact()
+            else:
+                self._open_segment(self._segment_no or 1)
+            self._drain_inbox()
+
+    def _reset(self):
+        self.jobs = {}                  # id -> job dict (plus "_v", its heap version)
+        self.recent = OrderedDict()     # most recently completed jobs
+        self.counts = Counter()         # (queue, state) -> jobs
+        self.queue_names = {"default"}
+        self.ready = {}                 # queue -> heap of (-priority, created_at, version, id)
+        self.delayed = []               # heap of (next_attempt_at, version, id)
+        self.leases = {}                # id -> (owner, expiry on the monotonic clock)
+        self.keys = {}                  # idempotency_key -> job id
+
+    # Locking and files
+
+    def _acquire_lock(self):
+        self._lock_file = open(os.path.join(self.directory, "LOCK"), "a+")
+        try:
+            if fcntl:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            self._lock_file.close()
+            raise BackendError(f"log store {self.directory} is in use by another process") from None
+
+    def _segments(self) -> List[int]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(n[:-4]) for n in names if n.endswith(".log") and n[:-4].isdigit())
+
+    def _path(self, number: int) -> str:
+        return os.path.join(self.directory, _segment_name(number))
+
+    def _open_segment(self, number: int):
+        if self._segment:
+            self._segment.close()
+        self._segment_no = number
+        self._segment = open(self._path(number), "ab")
+        self._segment_size = self._segment.tell()
+
+    def _commit(self, records):
+        """Append records to the log, then apply them. Rolls the segment over when full."""
+        if not records:
+            return
+        if self.readonly:
+            raise BackendError(f"log store {self.directory} is open read-only")
+        data = _encode(records)
+        self._segment.write(data)
+        self._segment.flush()
+        if self.fsync:
+            os.fsync(self._segment.fileno())
+        for record in records:
+            self._apply(record)
+        # Only after applying: a compaction snapshots the in-memory state.
+        self._segment_size += len(data)
+        if self._segment_size >= self.segment_bytes:
+            if len(self._segments()) >= self.max_segments:
+                self._compact()
+            else:
+                self._open_segment(self._segment_no + 1)
+
+    def _replay(self):
+        segments = self._segments()
+        # Start from the newest snapshot; anything before it is superseded.
+        start = 0
+        for i, number in enumerate(segments):
+            with open(self._path(number), "rb") as f:
+                if f.readline().startswith(b'{"op":"snapshot"'):
+                    start = i
+        for i, number in enumerate(segments[start:]):
+            last = start + i == len(segments) - 1
+            self._replay_segment(number, truncate=last and not self.readonly)
+            self._segment_no = number
+
+    def _replay_readonly(self):
+        # The owner may compact (delete segments) while we read; start over.
+        for _ in range(3):
+            try:
+                self._replay()
+                break
+            except FileNotFoundError:
+                self._reset()
+        else:
+            raise BackendError(f"log store {self.directory} changed while it was being read")
+        # Jobs handed in that the owner has not logged yet.
+        for _, jobs in self._inbox_files():
+            for record in self._fresh(jobs):
+                self._apply(record)
+
+    # Inbox: enqueues from processes that do not own the store
+
+    def _inbox_files(self):
+        """(path, stored jobs) of each complete inbox file, oldest first."""
+        inbox = os.path.join(self.directory, "inbox")
+        try:
+            names = sorted(n for n in os.listdir(inbox) if n.endswith(".jsonl"))
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(inbox, name)
+            try:
+                with open(path, "rb") as f:
+                    jobs = [json.loads(line)["job"] for line in f]
+            except FileNotFoundError:
+                continue    # drained by the owner meanwhile
+            except (ValueError, KeyError):
+                if not self.readonly:
+                    os.replace(path, path[:-len(".jsonl")] + ".bad")
+                continue
+            yield path, jobs
+
+    def _send_to_inbox(self, records):
+        """Hand put records to the store's owner in one new inbox file."""
+        inbox = os.path.join(self.directory, "inbox")
+        os.makedirs(inbox, exist_ok=True)
+        name = os.path.join(inbox, f"{time.time_ns():020d}-{os.getpid()}-{os.urandom(4).hex()}")
+        with open(name + ".tmp", "wb") as f:
+            f.write(_encode(records))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(name + ".tmp", name + ".jsonl")
+
+    def _drain_inbox(self):
+        """Log and apply the jobs in the inbox. A file is deleted only once logged."""
+        for path, jobs in self._inbox_files():
+            with self.lock:
+                self._commit(self._fresh(jobs))
+            os.remove(path)
+    def _replay_segment(self, number: int, truncate: bool):
+        path = self._path(number)
+        good = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if line.endswith(b"\n"):
+                        raise BackendError(f"corrupt record in {path} at byte {good}") from None
+                    # A write cut short by a crash; everything after it is lost anyway.
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                self._apply(record)
+                good += len(line)
+        if truncate and os.path.getsize(path) != good:
+            with open(path, "r+b") as f:
+                f.truncate(good)
+
+    def _compact(self):
+        """Write the live jobs to a new snapshot segment and drop the older segments."""
+        old = self._segments()
+        number = (old[-1] if old else 0) + 1
+        completed = [[q, st, n] for (q, st), n in self.counts.items() if st == "completed" and n]
+        records = [{"op": "snapshot", "counts": completed}]
+        for job in self.jobs.values():
+            stored = {k: job.get(k) for k in _FIELDS}
+            if stored["state"] == "processing":
+                stored["state"] = "pending"
+            records.append({"op": "put", "job": stored})
+        tmp = self._path(number) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_encode(records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(number))
+        if self._segment:
+            self._segment.close()
+            self._segment = None
+        for n in old:
+            os.remove(self._path(n))
+        self._open_segment(number)
+
+    # Applying records (shared by replay and live calls)
+
+    def _set_state(self, job: dict, state: str):
+        self.counts[(job["queue"], job["state"])] -= 1
+        job["state"] = state
+        self.counts[(job["queue"], state)] += 1
+
+    def _schedule(self, job: dict):
+        """Push a pending/failed job onto the ready heap, or the delayed heap if not due."""
+        job["_v"] = job.get("_v", 0) + 1
+        if job["next_attempt_at"]:
+            heapq.heappush(self.delayed, (job["next_attempt_at"], job["_v"], job["id"]))
+        else:
+            heapq.heappush(self.ready.setdefault(job["queue"], []),
+                           (-job["priority"], job["created_at"], job["_v"], job["id"]))
+
+    def _apply(self, record: dict):
+        op = record["op"]
+        if op == "put":
+            job = dict(record["job"])
+            self.jobs[job["id"]] = job
+            if job.get("idempotency_key"):
+                self.keys[job["idempotency_key"]] = job["id"]
+            self.counts[(job["queue"], job["state"])] += 1
+            self.queue_names.add(job["queue"])
+            if job["state"] in ("pending", "failed"):
+                self._schedule(job)
+        elif op == "done":
+            job = self.jobs.get(record["id"])
+            if job is None:
+                return
+            self.leases.pop(job["id"], None)
+            job.update(attempts=record["attempts"], updated_at=record["at"], output=record.get("output"))
+            if record["state"] != "completed":
+                job.update(last_error=record.get("error"), next_attempt_at=record.get("next"))
+            self._set_state(job, record["state"])
+            if record["state"] == "completed":
+                del self.jobs[job["id"]]
+                if self.keep_completed:
+                    self.recent[job["id"]] = job
+                    if len(self.recent) > self.keep_completed:
+                        self._forget(self.recent.popitem(last=False)[1])
+                else:
+                    self._forget(job)
+            elif record["state"] == "failed":
+                self._schedule(job)
+        elif op == "retry":
+            job = self.jobs.get(record["id"])
+            if job is None or job["state"] != "dead":
+                return
+            job.update(attempts=0, last_error=None, next_attempt_at=None, updated_at=record["at"])
+            self._set_state(job, "pending")
+            self._schedule(job)
+        elif op == "snapshot":
+            for queue, state, n in record["counts"]:
+                self.counts[(queue, state)] = n
+                self.queue_names.add(queue)
+
+    def _forget(self, job: dict):
+        if job.get("idempotency_key"):
+            self.keys.pop(job["idempotency_key"], None)
+
+    def _valid(self, job_id: str, version: int) -> bool:
+        job = self.jobs.get(job_id)
+        return job is not None and job["_v"] == version and job["state"] in ("pending", "failed")
+
+    def _promote(self, now: str):
+        """Move delayed jobs that are due onto their queue's ready heap."""
+        while self.delayed and self.delayed[0][0] <= now:
+            _, version, job_id = heapq.heappop(self.delayed)
+            if self._valid(job_id, version):
+                job = self.jobs[job_id]
+                heapq.heappush(self.ready.setdefault(job["queue"], []),
+                               (-job["priority"], job["created_at"], version, job_id))
+
+    # QueueBackend
+
+    def _new_job(self, job: dict, now: str) -> dict:
+        if job.get("depends_on"):
+            raise ValueError("depends_on needs the sqlite backend.")
+        return {
+            "id": job["id"], "command": job["command"], "state": "pending",
+            "attempts": job.get("attempts", 0), "max_retries": job.get("max_retries", 3),
+            "created_at": now, "updated_at": now, "next_attempt_at": job.get("next_attempt_at"),
+            "last_error": None, "output": None, "priority": job.get("priority", 0),
+            "queue": job.get("queue", "default"), "backoff": job.get("backoff"),
+            "callable": job.get("callable"), "args": json.dumps(job["args"]) if "args" in job else None,
+            "timeout": job.get("timeout"), "idempotency_key": job.get("idempotency_key"),
+            "cache_ttl": job.get("cache_ttl"), "inputs": json.dumps(job["inputs"]) if job.get("inputs") else None,
+        }
+
+    def enqueue(self, job: dict) -> bool:
+        return sum(inserted for inserted, _ in self.enqueue_many([job])) == 1
+
+    def _fresh(self, jobs) -> list:
+        """Put records for the stored jobs whose id and idempotency key are new."""
+        records, seen = [], set()
+        for job in jobs:
+            key = job.get("idempotency_key")
+            if job["id"] in self.jobs or job["id"] in self.recent or job["id"] in seen:
+                continue
+            if key and (key in self.keys or ("key", key) in seen):
+                continue
+            seen.add(job["id"])
+            seen.add(("key", key))
+            records.append({"op": "put", "job": job})
+        return records
+
+    def enqueue_many(self, jobs, chunk_size: int = 10000):
+        chunk = []
+
+        def flush():
+            now = utcnow_iso()
+            with self.lock:
+                records = self._fresh([self._new_job(job, now) for job in chunk])
+                if self.readonly and records:
+                    # Not applied here: the snapshot stays as opened, so a
+                    # long-lived producer does not accumulate every job.
+                    self._send_to_inbox(records)
+                else:
+                    self._commit(records)
+            return len(records), len(chunk) - len(records)
+
+        for job in jobs:
+            chunk.append(job)
+            if len(chunk) >= chunk_size:
+                yield flush()
+                chunk = []
+        if chunk:
+            yield flush()
+
+    def claim(self, limit: int, queues, owner: str, lease_seconds: float = 30, limits: dict = None):
+        now = utcnow_iso()
+        expires = time.monotonic() + lease_seconds
+        claimed = []
+        self._drain_inbox()
+        with self.lock:
+            self._promote(now)
+            for queue in queues:
+                heap = self.ready.get(queue)
+                while heap and len(claimed) < limit:
+                    _, _, version, job_id = heapq.heappop(heap)
+                    if not self._valid(job_id, version):
+                        continue
+                    job = self.jobs[job_id]
+                    self._set_state(job, "processing")
+                    job["updated_at"] = now
+                    self.leases[job_id] = (owner, expires)
+                    claimed.append(ClaimedJob(
+                        job_id, job["command"], job["attempts"], job["max_retries"],
+                        job["next_attempt_at"] or job["created_at"], job["backoff"],
+                        job["callable"], job["args"], job["timeout"],
+                        job.get("cache_ttl"), job.get("inputs")))
+                if len(claimed) >= limit:
+                    break
+        return claimed
+
+    def record(self, owner: str, outcomes: List[JobOutcome]):
+        now = utcnow_iso()
+        lost, records = [], []
+        with self.lock:
+            for o in outcomes:
+                lease = self.leases.get(o.id)
+                if lease is None or lease[0] != owner:
+                    lost.append(o.id)
+                    continue
+                records.append({"op": "done", "id": o.id, "state": o.state, "attempts": o.attempts,
+                                "at": now, "output": o.output, "error": o.error, "next": o.next_attempt_at})
+            self._commit(records)
+        return lost, False
+
+    def release(self, owner: str, job_ids: List[str]) -> int:
+        released = 0
+        with self.lock:
+            for job_id in job_ids:
+                lease = self.leases.get(job_id)
+                if lease is None or lease[0] != owner:
+                    continue
+                del self.leases[job_id]
+                job = self.jobs[job_id]
+                self._set_state(job, "pending")
+                self._schedule(job)
+                released += 1
+        return released
+
+    def renew_leases(self, owner: str, lease_seconds: float, job_ids=None) -> int:
+        expires = time.monotonic() + lease_seconds
+        only = None if job_ids is None else set(job_ids)
+        renewed = 0
+        with self.lock:
+            for job_id, (holder, _) in self.leases.items():
+                if holder == owner and (only is None or job_id in only):
+                    self.leases[job_id] = (holder, expires)
+                    renewed += 1
+        return renewed
+
+    def reap_expired(self):
+        now, clock = utcnow_iso(), time.monotonic()
+        with self.lock:
+            records = []
+            for job_id, (_, expires) in self.leases.items():
+                if expires >= clock:
+                    continue
+                job = self.jobs[job_id]
+                attempts = job["attempts"] + 1
+                records.append({"op": "done", "id": job_id, "attempts": attempts, "at": now,
+                                "state": "dead" if attempts > job["max_retries"] else "failed",
+                                "error": "Lease expired: worker stopped responding", "next": None})
+            self._commit(records)
+        dead = sum(1 for r in records if r["state"] == "dead")
+        return len(records) - dead, dead
+
+    def next_retry(self, queues=None):
+        with self.lock:
+            while self.delayed and not self._valid(self.delayed[0][2], self.delayed[0][1]):
+                heapq.heappop(self.delayed)
+            if queues is None:
+                due = self.delayed[0][0] if self.delayed else None
+            else:
+                wanted = set(queues)
+                due = min((d for d, v, i in self.delayed
+                           if self._valid(i, v) and self.jobs[i]["queue"] in wanted), default=None)
+        if due is None:
+            return None
+        return max(0.0, (datetime.fromisoformat(due) - datetime.now(UTC)).total_seconds())
+
+    def queues(self):
+        with self.lock:
+            return sorted(self.queue_names)
+
+    def list(self, state: str = None, queue: str = None, since: str = None,
+             after: str = None, limit: int = None):
+        with self.lock:
+            rows = [tuple(job[c] for c in LIST_COLUMNS)
+                    for job in list(self.jobs.values()) + list(self.recent.values())
+                    if (state is None or job["state"] == state)
+                    and (queue is None or job["queue"] == queue)
+                    and (since is None or job["created_at"] >= since)]
+            key = None
+            if after:
+                job = self.jobs.get(after) or self.recent.get(after)
+                if job is None:
+                    raise ValueError(f"Unknown job id for --after: {after}")
+                key = (job["created_at"], job["id"])
+        rows.sort(key=lambda r: (r[7], r[0]))
+        if key:
+            rows = [r for r in rows if (r[7], r[0]) > key]
+        return iter(rows[:limit] if limit is not None else rows)
+
+    def get(self, job_id: str):
+        with self.lock:
+            job = self.jobs.get(job_id) or self.recent.get(job_id)
+            return {c: job[c] for c in LIST_COLUMNS + ("output",)} if job else None
+
+    def retry(self, job_id: str) -> bool:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["state"] != "dead":
+                return False
+            record = {"op": "retry", "id": job_id, "at": utcnow_iso()}
+            self._commit([record])
+        return True
+
+    def stats(self, by_queue: bool = False):
+        with self.lock:
+            if by_queue:
+                return {key: n for key, n in self.counts.items() if n}
+            totals = Counter()
+            for (_, state), n in self.counts.items():
+                totals[state] += n
+            return {state: n for state, n in totals.items() if n}
+
+    def ready_stats(self, queues=None):
+        now = utcnow_iso()
+        with self.lock:
+            waiting = [job["next_attempt_at"] or job["created_at"] for job in self.jobs.values()
+                       if job["state"] in ("pending", "failed")
+                       and (not job["next_attempt_at"] or job["next_attempt_at"] <= now)
+                       and (queues is None or job["queue"] in queues)]
+        if not waiting:
+            return 0, 0.0
+        return len(waiting), max(0.0, (datetime.now(UTC) - datetime.fromisoformat(min(waiting))).total_seconds())
+
+    def for_thread(self):
+        # A read-only handle is a snapshot; a new one reads the log afresh.
+        return LogBackend(self.directory, readonly=True) if self.readonly else self
+
+    def close(self):
+        with self.lock:
+            if self._segment:
+                self._segment.close()
+                self._segment = None
+            if self._lock_file:
+                self._lock_file.close()
+                self._lock_file = None
@@ -0,0 +1,318 @@
+# queuectl/backends/sharded.py
+
+"""
+Sharded SQLite backend
+----------------------
+Spreads jobs over N SQLite files so that N writers can commit at once:
+SQLite takes one write lock per file, which otherwise caps the claim and
+complete rate of the whole cluster however many workers there are.
+
+- Shard 0 is the regular database (QUEUECTL_DB); shard i > 0 sits next to
+  it as `<name>.shard<i>.db`. Config, limits, schedules and the result
+  cache live in shard 0.
+- A job goes to shard crc32(id) % N, or crc32(idempotency_key) % N when it
+  has one, or crc32(dag) % N when it names a "dag", so that a whole DAG
+  can share one file. A job with depends_on follows its parents instead,
+  since dependencies are resolved inside one file; a job whose parents sit
+  on different shards is refused with an error naming them.
+- Since those rules can put a job off its id's shard, every enqueue first
+  looks its ids and idempotency keys up on all shards. A job whose id or
+  key exists goes to the shard holding it, where it is skipped.
+- Each worker has a home shard. It claims there first and steals from the
+  other shards, in rotation, when home runs dry. Shards with nothing
+  waiting are skipped with a read of their job_counts, without taking
+  their write lock.
+- Outcomes go back to the shard each job was claimed from. Counts, listings
+  and lookups by id consult every shard, so changing N later only moves
+  where new jobs land.
+
+Rate limits and concurrency caps hold across all shards: their buckets
+live in shard 0, and a claim that touches a limited queue runs under shard
+0's write lock, counting the jobs running on every shard
+(repo.claim_jobs_sharded). Claims of unlimited queues never take it.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import zlib
+from collections import Counter, defaultdict
+from typing import List
+
+from queuectl.backends.base import QueueBackend
+from queuectl.backends.sqlite import SQLiteBackend
+from queuectl.db import repo
+from queuectl.models import JobOutcome
+
+
+def shard_paths(path: str, shards: int) -> List[str]:
+    """Database file of every shard: the database itself, then <name>.shard<i>.db."""
+    root, ext = os.path.splitext(path)
+    return [path] + [f"{root}.shard{i}{ext or '.db'}" for i in range(1, shards)]
+
+
+class ShardedBackend(QueueBackend):
+    name = "sharded"
+
+    def __init__(self, shards: int, path: str = None, home: int = 0):
+        if shards < 1:
+            raise ValueError("need at least one shard")
+        self.path = repo.resolve_db_path(path)
+        self.shards = [SQLiteBackend(p) for p in shard_paths(self.path, shards)]
+        self.home = home % shards
+        self._steal = 0
+        # Shard each claimed job came from, until its outcome is recorded.
+        self._where = {}
+
+    def _shard_of(self, job_id: str) -> int:
+        return zlib.crc32(job_id.encode("utf-8")) % len(self.shards)
+
+    def _probe_order(self, job_id: str) -> List[int]:
+        first = self._shard_of(job_id)
+        return [first] + [i for i in range(len(self.shards)) if i != first]
+
+    def _locate(self, job_id: str):
+        """Index of the shard holding `job_id`, or None."""
+        for index in self._probe_order(job_id):
+            cur = self.shards[index].conn.cursor()
+            cur.execute("SELECT 1 FROM jobs WHERE id=?", (job_id,))
+            if cur.fetchone():
+                return index
+        return None
+
+    def _existing(self, jobs):
+        """({id: shard index}, {idempotency key: shard index}) already held by some shard."""
+        ids = json.dumps([job["id"] for job in jobs])
+        keys = json.dumps([job["idempotency_key"] for job in jobs if job.get("idempotency_key")])
+        found_ids, found_keys = {}, {}
+        for index in range(len(self.shards)):
+            cur = self.shards[index].conn.cursor()
+            cur.execute("SELECT id FROM jobs WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+            for (job_id,) in cur.fetchall():
+                found_ids.setdefault(job_id, index)
+            if keys != "[]":
+                cur.execute("""
+                    SELECT idempotency_key FROM jobs
+                    WHERE idempotency_key IN (SELECT value FROM json_each(?))
+                """, (keys,))
+                for (key,) in cur.fetchall():
+                    found_keys.setdefault(key, index)
+        return found_ids, found_keys
+
+    def _place(self, job: dict, placed: dict) -> int:
+        deps = job.get("depends_on")
+        if deps:
+            parents = {}
+            for parent in deps:
+                index = placed.get(parent)
+                parents[parent] = self._locate(parent) if index is None else index
+            shards = {index for index in parents.values() if index is not None}
+            if len(shards) > 1:
+                where = ", ".join(f"{p} (shard {i})" for p, i in parents.items() if i is not None)
+                raise ValueError(f"job {job['id']}: its parents are on different shards: {where}. "
+                                 f"Give every job of the DAG the same \"dag\" value.")
+            if shards:
+                return shards.pop()
+            # No parent exists anywhere: the job is stored dead, as on SQLite.
+        if job.get("dag"):
+            return self._shard_of(job["dag"])
+        if job.get("idempotency_key"):
+            # Keys are unique per file: the same key must meet the same shard.
+            # That may be off the id's shard; _existing keeps the id unique.
+            return self._shard_of(job["idempotency_key"])
+        return self._shard_of(job["id"])
+
+    def _assign(self, jobs) -> List[int]:
+        """
+        The shard of each job. Jobs whose id or key some shard (or an earlier
+        job in `jobs`) already holds go to that shard, to be skipped there.
+        Raises ValueError, before anything is written, for a job whose
+        parents are on different shards.
+        """
+        placed, keys = self._existing(jobs)
+        shards = []
+        for job in jobs:
+            key = job.get("idempotency_key")
+            index = placed.get(job["id"])
+            if index is None and key:
+                index = keys.get(key)
+            if index is None:
+                index = self._place(job, placed)
+            placed.setdefault(job["id"], index)
+            if key:
+                keys.setdefault(key, index)
+            shards.append(index)
+        return shards
+
+    def _by_shard(self, job_ids):
+        """Claimed job ids grouped by shard, plus the ids no shard holds."""
+        groups, missing = defaultdict(list), []
+        for job_id in job_ids:
+            index = self._where.pop(job_id, None)
+            if index is None:
+                index = self._locate(job_id)
+            if index is None:
+                missing.append(job_id)
+            else:
+                groups[index].append(job_id)
+        return groups, missing
+
+    def enqueue(self, job: dict) -> bool:
+        return sum(inserted for inserted, _ in self.enqueue_many([job])) == 1
+
+    def enqueue_many(self, jobs, chunk_size: int = 10000):
+        jobs = iter(jobs)
+        while True:
+            chunk = list(itertools.islice(jobs, chunk_size))
+            if not chunk:
+                return
+            groups = defaultdict(list)
+            for job, index in zip(chunk, self._assign(chunk)):
+                groups[index].append(job)
+            inserted = skipped = 0
+            for index, group in groups.items():
+                for n_inserted, n_skipped in repo.insert_jobs(self.shards[index].conn, group, chunk_size):
+                    inserted += n_inserted
+                    skipped += n_skipped
+            yield inserted, skipped
+
+    def enqueue_groups(self, groups):
+        # One transaction per shard touched, holding its part of every batch.
+        flat = [(g, job) for g, jobs in enumerate(groups) for job in jobs]
+        per_shard = defaultdict(lambda: [[] for _ in groups])
+        for (g, job), index in zip(flat, self._assign([job for _, job in flat])):
+            per_shard[index][g].append(job)
+        results = [(0, 0)] * len(groups)
+        for index, shard_groups in per_shard.items():
+            counts = repo.insert_job_groups(self.shards[index].conn, shard_groups)
+            results = [(i + ci, s + cs) for (i, s), (ci, cs) in zip(results, counts)]
+        return results
+
+    def _claim_order(self) -> List[int]:
+        others = [i for i in range(len(self.shards)) if i != self.home]
+        if others:
+            # Rotate where stealing starts, so idle workers spread out.
+            self._steal = (self._steal + 1) % len(others)
+            others = others[self._steal:] + others[:self._steal]
+        return [self.home] + others
+
+    def claim(self, limit: int, queues, owner: str, lease_seconds: float = 30, limits: dict = None):
+        queues = list(queues)
+        if limits and len(self.shards) > 1 and any(queue in limits for queue in queues):
+            rows = repo.claim_jobs_sharded(self.connections(), self._claim_order(), limit, queues,
+                                           owner, lease_seconds, limits)
+            for index, job in rows:
+                self._where[job.id] = index
+            return [job for _, job in rows]
+        claimed = []
+        for index in self._claim_order():
+            shard = self.shards[index]
+            if not repo.has_waiting_jobs(shard.conn, queues):
+                continue
+            jobs = shard.claim(limit - len(claimed), queues, owner, lease_seconds, limits)
+            for job in jobs:
+                self._where[job.id] = index
+            claimed.extend(jobs)
+            if len(claimed) >= limit:
+                break
+        return claimed
+
+    def record(self, owner: str, outcomes: List[JobOutcome]):
+        by_id = {outcome.id: outcome for outcome in outcomes}
+        groups, lost = self._by_shard(by_id)
+        released = False
+        for index, job_ids in groups.items():
+            shard_lost, shard_released = self.shards[index].record(owner, [by_id[i] for i in job_ids])
+            lost.extend(shard_lost)
+            released = released or shard_released
+        return lost, released
+
+    def release(self, owner: str, job_ids: List[str]) -> int:
+        groups, _ = self._by_shard(job_ids)
+        return sum(self.shards[index].release(owner, ids) for index, ids in groups.items())
+
+    def renew_leases(self, owner: str, lease_seconds: float, job_ids=None) -> int:
+        return sum(shard.renew_leases(owner, lease_seconds, job_ids) for shard in self.shards)
+
+    def reap_expired(self):
+        requeued = dead = 0
+        for shard in self.shards:
+            r, d = shard.reap_expired()
+            requeued += r
+            dead += d
+        return requeued, dead
+
+    def next_retry(self, queues=None):
+        waits = [w for w in (shard.next_retry(queues) for shard in self.shards) if w is not None]
+        return min(waits, default=None)
+
+    def queues(self):
+        return sorted({name for shard in self.shards for name in shard.queues()})
+
+    def queue_limits(self):
+        return self.shards[0].queue_limits()
+
+    def throttle_wait(self, limits: dict):
+        conns = self.connections()
+        return repo.throttle_wait(conns[0], limits, conns[1:])
+
+    def get_setting(self, key: str, env_var: str, default=None):
+        return self.shards[0].get_setting(key, env_var, default)
+
+    def list(self, state: str = None, queue: str = None, since: str = None,
+             after: str = None, limit: int = None):
+        key = None
+        if after:
+            job = self.get(after)
+            if job is None:
+                raise ValueError(f"Unknown job id for --after: {after}")
+            key = (job["created_at"], job["id"])
+        rows = heapq.merge(*(repo.iter_jobs(shard.conn, state=state, queue=queue, since=since,
+                                            limit=limit, after_key=key) for shard in self.shards),
+                           key=lambda row: (row[7], row[0]))
+        return itertools.islice(rows, limit)
+
+    def get(self, job_id: str):
+        index = self._locate(job_id)
+        return None if index is None else self.shards[index].get(job_id)
+
+    def retry(self, job_id: str) -> bool:
+        index = self._locate(job_id)
+        return index is not None and self.shards[index].retry(job_id)
+
+    def stats(self, by_queue: bool = False):
+        totals = Counter()
+        for shard in self.shards:
+            totals.update(shard.stats(by_queue=by_queue))
+        return {key: n for key, n in totals.items() if n}
+
+    def ready_stats(self, queues=None):
+        ready, oldest = 0, 0.0
+        for shard in self.shards:
+            n, age = shard.ready_stats(queues)
+            ready += n
+            oldest = max(oldest, age)
+        return ready, oldest
+
+    def cache_get(self, key: str):
+        return self.shards[0].cache_get(key)
+
+    def cache_put(self, key: str, output: str, ttl: float, max_entries: int):
+        self.shards[0].cache_put(key, output, ttl, max_entries)
+
+    def cache_touch(self, keys: List[str]):
+        self.shards[0].cache_touch(keys)
+
+    def fire_schedules(self, limit: int = 500) -> int:
+        return self.shards[0].fire_schedules(limit)
+
+    def connections(self):
+        return [shard.conn for shard in self.shards]
+
+    def for_thread(self):
+        return ShardedBackend(len(self.shards), self.path, self.home)
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
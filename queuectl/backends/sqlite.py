@@ -0,0 +1,198 @@
+# queuectl/backends/sqlite.py
+
+"""
+SQLite backend
+--------------
+The default backend: one SQLite file shared by every process, with the
+schema, indexes and triggers from db/migrations.py. Mostly a thin layer
+over db/repo.py; the `conn` attribute stays available for the features
+only this backend has (schedules, limits, the archive, bulk DLQ tools).
+The result cache lives in the result_cache table.
+"""
+
+from datetime import datetime, UTC
+from typing import List
+
+from queuectl.backends.base import QueueBackend
+from queuectl.db import repo
+from queuectl.models import JobOutcome
+from queuectl.utils import utcnow_iso
+
+# Outcome statements, by outcome state. Each ends with "WHERE id=? AND
+# lease_owner=?", so an outcome is dropped if the job's lease was lost.
+_OUTCOME_SQL = {
+    "completed": """
+        UPDATE jobs
+        SET state='completed', attempts=?, updated_at=?, output=?,
+            lease_owner=NULL, lease_expires_at=NULL
+        WHERE id=? AND lease_owner=?
+    """,
+    "failed": """
+        UPDATE jobs
+        SET state='failed', attempts=?, updated_at=?, output=?, last_error=?, next_attempt_at=?,
+            lease_owner=NULL, lease_expires_at=NULL
+        WHERE id=? AND lease_owner=?
+    """,
+    "dead": """
+        UPDATE jobs
+        SET state='dead', attempts=?, updated_at=?, output=?, last_error=?,
+            lease_owner=NULL, lease_expires_at=NULL
+        WHERE id=? AND lease_owner=?
+    """,
+}
+
+
+def _outcome_params(outcome: JobOutcome, now: str, owner: str) -> tuple:
+    params = (outcome.attempts, now, outcome.output)
+    if outcome.state == "failed":
+        params += (outcome.error, outcome.next_attempt_at)
+    elif outcome.state == "dead":
+        params += (outcome.error,)
+    return params + (outcome.id, owner)
+
+
+class SQLiteBackend(QueueBackend):
+    name = "sqlite"
+
+    def __init__(self, path: str = None):
+        self.path = repo.resolve_db_path(path)
+        self.conn = repo.connect(self.path)
+
+    def enqueue(self, job: dict) -> bool:
+        return sum(inserted for inserted, _ in repo.insert_jobs(self.conn, [job])) == 1
+
+    def enqueue_many(self, jobs, chunk_size: int = 10000):
+        return repo.insert_jobs(self.conn, jobs, chunk_size)
+
+    def enqueue_groups(self, groups):
+        return repo.insert_job_groups(self.conn, groups)
+
+    def claim(self, limit: int, queues, owner: str, lease_seconds: float = 30, limits: dict = None):
+        return repo.claim_jobs(self.conn, limit, queues, owner=owner,
+                               lease_seconds=lease_seconds, limits=limits)
+
+    def record(self, owner: str, outcomes: List[JobOutcome]):
+        """
+        Write every outcome in one transaction. Children of completed jobs
+        are released by trigger inside it (see migrations.py).
+        """
+        now = utcnow_iso()
+        lost = []
+        cur = self.conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            for outcome in outcomes:
+                cur.execute(_OUTCOME_SQL[outcome.state], _outcome_params(outcome, now, owner))
+                if cur.rowcount == 0:
+                    lost.append(outcome.id)
+            # Only check whether any completed job had children, so the
+            # caller knows to wake idle workers.
+            done = [o.id for o in outcomes if o.state == "completed"]
+            released = False
+            for i in range(0, len(done), 500):
+                part = done[i:i + 500]
+                cur.execute(f"SELECT 1 FROM job_deps WHERE parent_id IN ({', '.join('?' * len(part))}) LIMIT 1",
+                            part)
+                if cur.fetchone():
+                    released = True
+                    break
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return lost, released
+
+    def release(self, owner: str, job_ids: List[str]) -> int:
+        cur = self.conn.cursor()
+        cur.executemany("""
+            UPDATE jobs
+            SET state='pending', updated_at=?, lease_owner=NULL, lease_expires_at=NULL
+            WHERE id=? AND state='processing' AND lease_owner=?
+        """, [(utcnow_iso(), job_id, owner) for job_id in job_ids])
+        self.conn.commit()
+        return cur.rowcount
+
+    def renew_leases(self, owner: str, lease_seconds: float, job_ids=None) -> int:
+        return repo.renew_leases(self.conn, owner, lease_seconds, job_ids)
+
+    def reap_expired(self):
+        return repo.reap_expired_leases(self.conn)
+
+    def next_retry(self, queues=None):
+        cur = self.conn.cursor()
+        sql = """
+            SELECT MIN(next_attempt_at)
+            FROM jobs
+            WHERE state IN ('pending', 'failed') AND next_attempt_at IS NOT NULL
+        """
+        params = ()
+        if queues is not None:
+            sql += f" AND queue IN ({', '.join('?' * len(queues))})"
+            params = tuple(queues)
+        cur.execute(sql, params)
+        row = cur.fetchone()
+        if not row or not row[0]:
+            return None
+        due = datetime.fromisoformat(row[0])
+        return max(0.0, (due - datetime.now(UTC)).total_seconds())
+
+    def queues(self):
+        return repo.list_queues(self.conn)
+
+    def queue_limits(self):
+        return repo.load_queue_limits(self.conn)
+
+    def throttle_wait(self, limits: dict):
+        return repo.throttle_wait(self.conn, limits)
+
+    def get_setting(self, key: str, env_var: str, default=None):
+        return repo.get_setting(self.conn, key, env_var, default)
+
+    def list(self, state: str = None, queue: str = None, since: str = None,
+             after: str = None, limit: int = None):
+        return repo.iter_jobs(self.conn, state=state, queue=queue, since=since, after=after, limit=limit)
+
+    def get(self, job_id: str):
+        cur = self.conn.cursor()
+        cur.execute(f"SELECT {', '.join(repo.LIST_COLUMNS)}, output FROM jobs WHERE id=?", (job_id,))
+        row = cur.fetchone()
+        return dict(zip(repo.LIST_COLUMNS + ("output",), row)) if row else None
+
+    def retry(self, job_id: str) -> bool:
+        cur = self.conn.cursor()
+        cur.execute("""
+            UPDATE jobs
+            SET state='pending', attempts=0, next_attempt_at=NULL, last_error=NULL, updated_at=?
+            WHERE id=? AND state='dead'
+        """, (utcnow_iso(), job_id))
+        self.conn.commit()
+        return cur.rowcount > 0
+
+    def stats(self, by_queue: bool = False):
+        return repo.job_counts(self.conn, by_queue=by_queue)
+
+    def ready_stats(self, queues=None):
+        return repo.ready_stats(self.conn, queues)
+
+    def cache_get(self, key: str):
+        return repo.cache_get(self.conn, key)
+
+    def cache_put(self, key: str, output: str, ttl: float, max_entries: int):
+        repo.cache_put(self.conn, key, output, ttl, max_entries)
+
+    def cache_touch(self, keys: List[str]):
+        repo.cache_touch(self.conn, keys)
+
+    def fire_schedules(self, limit: int = 500) -> int:
+        return repo.fire_due_schedules(self.conn, limit)
+
+    def connections(self):
+        """The SQLite connections behind this backend, for maintenance commands."""
+        return [self.conn]
+
+    def for_thread(self):
+        # sqlite3 connections belong to the thread that opened them.
+        return SQLiteBackend(self.path)
+
+    def close(self):
+        self.conn.close()
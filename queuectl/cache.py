@@ -0,0 +1,47 @@
+# queuectl/cache.py
+
+"""
+Result Cache Keys
+-----------------
+A job enqueued with `"cache": true` (or a TTL in seconds) declares itself
+deterministic: the same command with the same inputs prints the same
+output. Before running it, a worker looks up `cache_key(job)` in the
+backend's result cache; on a hit the job completes with the cached output
+and the command is not executed.
+
+The key is a SHA-256 over the command (or callable and its arguments) and
+the contents of every file listed in the job's `inputs`, hashed when the
+job is about to run, so editing an input invalidates earlier results.
+"""
+
+import hashlib
+import json
+
+# Default seconds a cached result stays valid, and entries kept before the
+# least recently used are evicted.
+DEFAULT_CACHE_TTL = 24 * 3600
+DEFAULT_CACHE_MAX_ENTRIES = 10000
+
+_CHUNK = 1024 * 1024
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(_CHUNK), b""):
+                digest.update(block)
+    except OSError as e:
+        # Part of the key: the result of a run without the file is its own entry.
+        return f"unreadable:{e.__class__.__name__}"
+    return digest.hexdigest()
+
+
+def cache_key(job) -> str:
+    """Hash of what determines a claimed job's output."""
+    digest = hashlib.sha256()
+    target = [job.callable, job.args] if job.callable else [job.command]
+    digest.update(json.dumps(target).encode("utf-8"))
+    for path in sorted(json.loads(job.inputs)) if job.inputs else ():
+        digest.update(b"\0" + path.encode("utf-8") + b"\0" + _file_digest(path).encode("ascii"))
+    return digest.hexdigest()
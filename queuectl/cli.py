@@ -11,38 +11,136 @@ Supports:
 - List jobs by state
 - View or retry DLQ jobs
 - Show system status
+- Archive old finished jobs
+- Manage recurring (cron) jobs
 """
 
 import argparse
+import itertools
 import json
 import os
 import signal
 import sys
+import time
+
+from queuectl.backends import BackendError, open_backend
+from queuectl.db.repo import (get_config, set_config, get_setting, rebuild_job_counts, LIST_COLUMNS,
+                               count_dead_jobs, retry_dead_jobs, purge_dead_jobs, parse_limit_key,
+                               save_schedule, list_schedules, delete_schedule, set_schedule_enabled)
+from queuectl.jobs import prepare_job
+from queuectl.utils import parse_backoff
+
+# Modules only some subcommands need (the worker manager, executors, the
+# server, the wakeup socket) are imported inside those commands, so short
+# commands like `status` and `list` load only what they use.
+# benchmarks/bench_startup.py tracks the cost.
+
+
+def iter_job_lines(stream, errors):
+    """
+    Parse a JSONL stream one line at a time, yielding valid jobs.
+    Invalid lines are reported to stderr and counted in errors[0].
+    """
+    for lineno, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield prepare_job(json.loads(line))
+        except json.JSONDecodeError:
+            errors[0] += 1
+            print(f"line {lineno}: invalid JSON", file=sys.stderr)
+        except ValueError as e:
+            errors[0] += 1
+            print(f"line {lineno}: {e}", file=sys.stderr)
+
+
+def cmd_enqueue_bulk(args):
+    """Stream jobs from a JSONL file or stdin into the queue."""
+    from queuectl.wakeup import notify
+
+    backend = open_backend(intake=True)
+    errors = [0]
+    inserted = skipped = 0
+
+    stream = sys.stdin if args.stdin else open(args.file, "r", encoding="utf-8")
+    try:
+        for n_inserted, n_skipped in backend.enqueue_many(iter_job_lines(stream, errors), args.chunk_size):
+            inserted += n_inserted
+            skipped += n_skipped
+            notify()
+    except ValueError as e:
+        # Raised before its chunk is written; earlier chunks are kept.
+        print(f"Error: {e}")
+        print(f"Stopped after {inserted} jobs were enqueued.")
+        return
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        backend.close()
 
-from queuectl.db.repo import connect, insert_job
-from queuectl.utils import generate_id
-from queuectl.worker.manager import WorkerManager
+    print(f"Enqueued {inserted} jobs ({skipped} duplicate ids or idempotency keys skipped, "
+          f"{errors[0]} invalid lines).")
 
 
 def cmd_enqueue(args):
     """Handle 'enqueue' command."""
-    conn = connect()
-    try:
-        job_data = json.loads(args.job_json)
-        if "id" not in job_data:
-            job_data["id"] = generate_id()
-        if "command" not in job_data:
-            print("Error: job must contain a 'command' field.")
+    from queuectl.wakeup import notify
+
+    if args.file or args.stdin:
+        if args.job_json:
+            print("Error: pass either a job JSON string or --file/--stdin, not both.")
             return
-        insert_job(conn, job_data)
+        cmd_enqueue_bulk(args)
+        return
+    if not args.job_json:
+        print("Error: provide a job JSON string, --file or --stdin.")
+        return
+
+    backend = open_backend(intake=True)
+    try:
+        job_data = prepare_job(json.loads(args.job_json))
+        if backend.enqueue(job_data):
+            notify()
+            print(f"Job {job_data['id']} inserted.")
+        elif "idempotency_key" in job_data:
+            print(f"Skipped: a job with id {job_data['id']} or idempotency key "
+                  f"{job_data['idempotency_key']} already exists.")
+        else:
+            print(f"Error: a job with id {job_data['id']} already exists.")
     except json.JSONDecodeError:
         print("Invalid JSON format for job data.")
+    except ValueError as e:
+        print(f"Error: {e}")
+    finally:
+        backend.close()
 
 
 def cmd_worker_start(args):
     """Start worker processes."""
+    from queuectl.worker.manager import WorkerManager
+    from queuectl.worker.scheduling import parse_queue_weights
+
     count = args.count or 1
-    mgr = WorkerManager(worker_count=count)
+    if args.min is not None or args.max is not None:
+        low = args.min if args.min is not None else 1
+        high = args.max if args.max is not None else max(low, count)
+        if low < 0 or high < max(1, low):
+            print("Invalid bounds: need 0 <= --min <= --max and --max >= 1.")
+            return
+        count = min(max(args.count if args.count is not None else low, low), high)
+    else:
+        low = high = count
+    if args.queues:
+        try:
+            parse_queue_weights(args.queues)
+        except ValueError as e:
+            print(f"Invalid --queues: {e}")
+            return
+    mgr = WorkerManager(worker_count=count, batch_size=args.batch_size,
+                        concurrency=args.concurrency, queues=args.queues,
+                        metrics_port=args.metrics_port, archive_interval=args.archive_interval,
+                        min_workers=low, max_workers=high)
     mgr.start()
 
 
@@ -66,136 +164,622 @@ def cmd_worker_stop(args):
         print(f"Error stopping manager: {e}")
 
 
-def cmd_list(args):
-    """List jobs by state."""
-    conn = connect()
-    state_filter = args.state
-    cur = conn.cursor()
+def print_jobs(rows, fmt: str, columns):
+    """
+    Print jobs as they stream in: a table, JSON lines, or one JSON array
+    (written element by element, so it is never built in memory).
+    """
+    last = None
+    if fmt == "table":
+        header = f"{'ID':36} | {'STATE':10} | {'ATTEMPTS':8} | {'QUEUE':12} | "
+        header += "LAST ERROR" if "last_error" in columns else "COMMAND"
+        print(header)
+        print("-" * 80)
+    elif fmt == "json":
+        sys.stdout.write("[")
+
+    write = sys.stdout.write
+    for i, row in enumerate(rows):
+        last = row[0]
+        if fmt == "table":
+            job = dict(zip(LIST_COLUMNS, row))
+            tail = job["last_error"] if "last_error" in columns else job["command"]
+            write(f"{job['id']:36} | {job['state']:10} | {job['attempts']:8} | {job['queue']:12} | {tail}\n")
+        else:
+            text = json.dumps(dict(zip(LIST_COLUMNS, row)))
+            if fmt == "jsonl":
+                write(text + "\n")
+            else:
+                write(("," if i else "") + "\n  " + text)
+
+    if fmt == "json":
+        write("\n]\n" if last is not None else "]\n")
+    return last
+
+
+def list_jobs_command(args, state, columns, empty_message):
+    # Read-only, so listing works while a worker owns a log-backend store.
+    backend = open_backend(readonly=True)
+    try:
+        # One row past the limit tells whether there is a next page.
+        rows = backend.list(state=state, queue=args.queue, since=args.since,
+                            after=args.after, limit=args.limit + 1 if args.limit else args.limit)
+        first = next(rows, None)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
 
-    if state_filter:
-        cur.execute("SELECT id, command, state, attempts, max_retries FROM jobs WHERE state=?", (state_filter,))
-    else:
-        cur.execute("SELECT id, command, state, attempts, max_retries FROM jobs")
+    if first is None and args.format == "table":
+        print(empty_message)
+        return
 
-    rows = cur.fetchall()
-    if not rows:
-        print("No jobs found.")
+    page = itertools.chain([first], rows) if first else ()
+    if args.limit:
+        page = itertools.islice(page, args.limit)
+    try:
+        last = print_jobs(page, args.format, columns)
+    except BrokenPipeError:
+        # Output piped into `head` or similar; stop quietly.
+        sys.stderr.close()
         return
+    if args.limit and next(rows, None) is not None and args.format == "table":
+        print(f"(next page: --after {last})", file=sys.stderr)
 
-    print(f"{'ID':36} | {'STATE':10} | {'ATTEMPTS':8} | COMMAND")
-    print("-" * 80)
-    for job_id, command, state, attempts, max_retries in rows:
-        print(f"{job_id:36} | {state:10} | {attempts:8} | {command}")
+
+def cmd_list(args):
+    """List jobs by state."""
+    list_jobs_command(args, args.state, ("command",), "No jobs found.")
 
 
 def cmd_dlq_list(args):
     """List all dead jobs."""
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("SELECT id, command, last_error FROM jobs WHERE state='dead'")
-    rows = cur.fetchall()
+    list_jobs_command(args, "dead", ("last_error",), "No jobs in DLQ.")
 
-    if not rows:
-        print("No jobs in DLQ.")
-        return
 
-    print(f"{'ID':36} | COMMAND | LAST ERROR")
-    print("-" * 80)
-    for job_id, command, error in rows:
-        print(f"{job_id:36} | {command} | {error}")
+def dlq_filters(args):
+    """The DLQ filter arguments, or None if the command names no jobs at all."""
+    if not (args.all or args.error_like or args.since or args.queue):
+        return None
+    return {"error_like": args.error_like, "since": args.since, "queue": args.queue}
+
+
+def sqlite_backend(what: str):
+    """
+    The configured backend, for commands that run SQL on its files; under
+    sharded:N, `backend.connections()` is every shard.
+    """
+    backend = open_backend()
+    if not hasattr(backend, "connections"):
+        backend.close()
+        raise BackendError(f"{what} needs the sqlite or sharded backend, not {backend.name}.")
+    return backend
+
+
+def settings_db(what: str):
+    """The database of the configured backend that holds config and schedules (shard 0)."""
+    return sqlite_backend(what).connections()[0]
 
 
 def cmd_dlq_retry(args):
-    """Retry a job from DLQ."""
-    conn = connect()
-    job_id = args.job_id
-    cur = conn.cursor()
+    """Retry a job from DLQ, or every DLQ job matching a filter."""
+    from queuectl.wakeup import notify
 
-    cur.execute("""
-        UPDATE jobs
-        SET state='pending', 
-        attempts=0, 
-        next_attempt_at=NULL, 
-        last_error=NULL, 
-        updated_at=datetime('now')
-        WHERE id=? AND state='dead'
-    """, (job_id,))
-    conn.commit()
-
-    if cur.rowcount > 0:
-        print(f"Job {job_id} moved back to pending queue.")
-    else:
-        print(f"No DLQ job found with id {job_id}.")
+    filters = dlq_filters(args)
+
+    if filters is None:
+        if not args.job_id:
+            print("Give a job id, or select jobs with --all, --error-like, --since or --queue.")
+            return
+        job_id = args.job_id
+        backend = open_backend()
+        try:
+            retried = backend.retry(job_id)
+        finally:
+            backend.close()
+
+        if retried:
+            notify()
+            print(f"Job {job_id} moved back to pending queue.")
+        else:
+            print(f"No DLQ job found with id {job_id}.")
+        return
+
+    if args.job_id:
+        print("Give either a job id or filters, not both.")
+        return
+
+    # Filtered retries are bulk SQL over the jobs table of every shard.
+    conns = sqlite_backend("Filtered DLQ retry").connections()
+    if args.dry_run:
+        print(f"Would retry {sum(count_dead_jobs(conn, **filters) for conn in conns)} DLQ jobs.")
+        return
+
+    retried = 0
+    for conn in conns:
+        for chunk in retry_dead_jobs(conn, spread=args.spread, chunk_size=args.chunk_size, **filters):
+            retried += chunk
+            notify()
+    spread = f", spread over {args.spread:g}s" if args.spread and retried else ""
+    print(f"Moved {retried} DLQ jobs back to pending{spread}.")
+
+
+def cmd_dlq_purge(args):
+    """Delete DLQ jobs matching a filter."""
+    filters = dlq_filters(args)
+    if filters is None:
+        print("Select jobs with --all, --error-like, --since or --queue.")
+        return
+    conns = sqlite_backend("DLQ purge").connections()
+    if args.dry_run:
+        print(f"Would purge {sum(count_dead_jobs(conn, **filters) for conn in conns)} DLQ jobs.")
+        return
+
+    purged = sum(sum(purge_dead_jobs(conn, chunk_size=args.chunk_size, **filters)) for conn in conns)
+    print(f"Purged {purged} DLQ jobs.")
+
+
+def print_status(backend, by_queue: bool):
+    counts = backend.stats(by_queue=by_queue)
+    if not counts:
+        print("No jobs found.")
+        return
+
+    print("Queue Status:")
+    if not by_queue:
+        for state, count in sorted(counts.items()):
+            print(f"  {state:10}: {count}")
+        return
+    for (queue, state), count in sorted(counts.items()):
+        print(f"  {queue:16} {state:10}: {count}")
 
 
 def cmd_status(args):
     """Display summary of job states."""
-    conn = connect()
+    if args.rebuild:
+        backend = sqlite_backend("status --rebuild")
+        drift = {}
+        for conn in backend.connections():
+            for key, (stored, actual) in rebuild_job_counts(conn).items():
+                before = drift.get(key, (0, 0))
+                drift[key] = (before[0] + stored, before[1] + actual)
+        if not drift:
+            print("Counters are consistent.")
+        for (queue, state), (stored, actual) in sorted(drift.items()):
+            print(f"Fixed {queue}/{state}: counter said {stored}, table has {actual}")
+        return
+
+    backend = open_backend(readonly=True)
+    if args.watch is None:
+        print_status(backend, args.by_queue)
+        return
+
+    try:
+        while True:
+            # Clear screen and redraw; each refresh only reads job_counts.
+            print("\033[H\033[J", end="")
+            print(time.strftime("%H:%M:%S"))
+            print_status(backend, args.by_queue)
+            time.sleep(args.watch)
+            if not backend.shared:
+                # A read-only log store is a snapshot; read it again.
+                backend = open_backend(readonly=True)
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_logs(args):
+    """Print a job's spilled output log, optionally following it."""
+    from queuectl.executor import log_path, read_log
+
+    backend = open_backend(readonly=True)
+    log_dir = backend.get_setting("logs.dir", "QUEUECTL_LOG_DIR")
+    if not log_dir:
+        print("Log spilling is disabled; set logs.dir (or QUEUECTL_LOG_DIR) before starting workers.")
+        return
+
+    path = log_path(log_dir, args.job_id)
+    if not os.path.exists(path):
+        print(f"No log found for job {args.job_id}.")
+        return
+
+    def still_running():
+        # The job may live on any shard; a log store is re-read each time.
+        reader = backend if backend.shared else open_backend(readonly=True)
+        job = reader.get(args.job_id)
+        return bool(job) and job["state"] == "processing"
+
+    out = sys.stdout.buffer
+    try:
+        for chunk in read_log(path, follow=args.follow, still_running=still_running):
+            out.write(chunk)
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_config_get(args):
+    """Show one config value, or all of them."""
+    conn = settings_db("Config")
+    if args.key:
+        value = get_config(conn, args.key)
+        if value is None:
+            print(f"No config value set for {args.key}.")
+        else:
+            print(value)
+        return
+
     cur = conn.cursor()
-    cur.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+    cur.execute("SELECT key, value FROM config ORDER BY key")
     rows = cur.fetchall()
     if not rows:
-        print("No jobs found.")
+        print("No config values set.")
         return
+    for key, value in rows:
+        print(f"{key} = {value}")
 
-    print("Queue Status:")
-    for state, count in rows:
-        print(f"  {state:10}: {count}")
+
+def cmd_config_set(args):
+    """Store a config value."""
+    conn = settings_db("Config")
+    try:
+        if args.key.startswith("limit."):
+            parse_limit_key(args.key, args.value)
+        elif args.key == "backoff.policy":
+            parse_backoff(args.value)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    set_config(conn, args.key, args.value)
+    print(f"{args.key} = {args.value}")
 
 
-def build_parser():
-    parser = argparse.ArgumentParser(prog="queuectl", description="Background Job Queue System CLI")
+def cmd_archive_run(args):
+    """Move old completed/dead jobs into the archive database."""
+    from queuectl import archive
+
+    conns = sqlite_backend("The archive").connections()
+    # Settings and the archive file come from shard 0; every shard archives into it.
+    retention, batch_size = archive.archive_settings(conns[0])
+    path = archive.archive_path(conns[0])
+    if args.older_than is not None:
+        retention = args.older_than
+    if args.batch_size:
+        batch_size = args.batch_size
+
+    moved = 0
+    for conn in conns:
+        for batch in archive.archive_jobs(conn, retention, batch_size, path=path):
+            moved += batch
+    print(f"Archived {moved} jobs older than {retention:g} days to {path}.")
+
+    if args.vacuum and moved:
+        for conn in conns:
+            conn.execute("VACUUM")
+        print("Database compacted.")
+
+
+def cmd_archive_list(args):
+    """List archived jobs, newest first."""
+    from queuectl import archive
+
+    conn = settings_db("The archive")
+    rows = archive.list_archived(conn, args.state, args.limit)
+    if not rows:
+        print("No archived jobs found.")
+        return
+
+    print(f"{'ID':36} | {'STATE':10} | {'ATTEMPTS':8} | {'UPDATED':32} | COMMAND")
+    print("-" * 100)
+    for job_id, command, state, attempts, updated_at in rows:
+        print(f"{job_id:36} | {state:10} | {attempts:8} | {updated_at:32} | {command}")
+
+
+def cmd_archive_show(args):
+    """Show an archived job, including its output."""
+    from queuectl import archive
+
+    conn = settings_db("The archive")
+    job = archive.get_archived(conn, args.job_id)
+    if job is None:
+        print(f"Job {args.job_id} is not in the archive.")
+        return
+    print(json.dumps(job, indent=2))
+
+
+def cmd_schedule_add(args):
+    """Create or replace a recurring job."""
+    from queuectl.cron import CronExpr
+
+    conn = settings_db("Scheduling")
+    try:
+        CronExpr(args.cron)
+        template = json.loads(args.job_json)
+        if isinstance(template, dict) and ({"id", "run_at", "delay", "depends_on", "idempotency_key"}
+                                           & template.keys()):
+            raise ValueError("a schedule's job may not set 'id', 'run_at', 'delay', 'depends_on' "
+                             "or 'idempotency_key'.")
+        # Store the normalised job (a callable's command, cache_ttl...); each
+        # fire only adds an id.
+        job = prepare_job(dict(template))
+        del job["id"]
+        first = save_schedule(conn, args.name, args.cron, job)
+    except json.JSONDecodeError:
+        print("Invalid JSON format for job data.")
+        return
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    print(f"Schedule '{args.name}' saved; first run at {first}.")
+
+
+def cmd_schedule_list(args):
+    """List schedules and their next fire times."""
+    conn = settings_db("Scheduling")
+    rows = list_schedules(conn)
+    if not rows:
+        print("No schedules.")
+        return
+
+    print(f"{'NAME':20} | {'CRON':18} | {'NEXT RUN':25} | {'LAST RUN':25} | JOB")
+    print("-" * 110)
+    for name, cron, enabled, next_fire, last_fire, job in rows:
+        next_fire = next_fire if enabled else "paused"
+        print(f"{name:20} | {cron:18} | {next_fire:25} | {last_fire or '-':25} | {job}")
+
+
+def cmd_schedule_remove(args):
+    """Delete a schedule. Jobs it already enqueued are kept."""
+    conn = settings_db("Scheduling")
+    if delete_schedule(conn, args.name):
+        print(f"Schedule '{args.name}' removed.")
+    else:
+        print(f"No schedule named '{args.name}'.")
+
+
+def cmd_schedule_pause(args):
+    """Pause or resume a schedule."""
+    conn = settings_db("Scheduling")
+    enabled = args.subcommand == "resume"
+    if set_schedule_enabled(conn, args.name, enabled):
+        print(f"Schedule '{args.name}' {'resumed' if enabled else 'paused'}.")
+    else:
+        print(f"No schedule named '{args.name}'.")
+
+
+def cmd_serve(args):
+    """Run the enqueue server until interrupted."""
+    from queuectl.server import serve
+
+    if args.group_wait_ms < 0:
+        print("Error: --group-wait-ms must be >= 0.")
+        return
+    try:
+        serve(args.host, args.port, args.socket, args.group_wait_ms / 1000)
+    except OSError as e:
+        print(f"Error: cannot listen: {e}")
+
+
+def add_listing_arguments(parser):
+    parser.add_argument("--queue", help="Only jobs in this queue")
+    parser.add_argument("--since", metavar="TIMESTAMP", help="Only jobs created at or after this ISO timestamp")
+    parser.add_argument("--after", metavar="JOB_ID", help="Resume listing after this job (keyset cursor)")
+    parser.add_argument("--limit", type=int, help="Stop after this many jobs")
+    parser.add_argument("--format", choices=("table", "json", "jsonl"), default="table", help="Output format")
+
+
+def add_dlq_filter_arguments(parser):
+    parser.add_argument("--all", action="store_true", help="Every DLQ job")
+    parser.add_argument("--error-like", metavar="PATTERN",
+                        help="Jobs whose last error matches this SQL LIKE pattern, e.g. '%%timed out%%'")
+    parser.add_argument("--since", metavar="TIMESTAMP", help="Jobs that died at or after this ISO timestamp")
+    parser.add_argument("--queue", help="Jobs in this queue")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the matching jobs")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Jobs changed per transaction")
+
+
+class HelpFormatter(argparse.HelpFormatter):
+    """
+    argparse's formatter, sized without `import shutil`: argparse builds one
+    for every add_argument, and that import alone costs ~4 ms per command.
+    """
+
+    def __init__(self, prog, indent_increment=2, max_help_position=24, width=None):
+        if width is None:
+            try:
+                width = int(os.environ["COLUMNS"])
+            except (KeyError, ValueError):
+                try:
+                    width = os.get_terminal_size(sys.__stdout__.fileno()).columns
+                except (AttributeError, ValueError, OSError):
+                    width = 80
+            width -= 2
+        super().__init__(prog, indent_increment, max_help_position, width)
+
+
+class ArgumentParser(argparse.ArgumentParser):
+    """Uses HelpFormatter; subcommand parsers inherit the class."""
+
+    def __init__(self, *args, formatter_class=HelpFormatter, **kwargs):
+        super().__init__(*args, formatter_class=formatter_class, **kwargs)
+
+
+COMMANDS = ('enqueue', 'worker', 'list', 'dlq', 'status', 'archive', 'schedule', 'logs', 'serve', 'config')
+
+
+def build_parser(command: str = None):
+    """
+    The argument parser. Given a subcommand name, only that subcommand's
+    parser is built: constructing all of them is a noticeable part of a
+    short command's startup.
+    """
+    parser = ArgumentParser(prog="queuectl", description="Background Job Queue System CLI")
 
     subparsers = parser.add_subparsers(dest="command")
 
     # enqueue
-    p_enqueue = subparsers.add_parser("enqueue", help="Add a new job to the queue")
-    p_enqueue.add_argument("job_json", help="Job data in JSON format")
-    p_enqueue.set_defaults(func=cmd_enqueue)
+    if command in (None, "enqueue"):
+        p_enqueue = subparsers.add_parser("enqueue", help="Add a new job to the queue")
+        p_enqueue.add_argument("job_json", nargs="?", help="Job data in JSON format")
+        source = p_enqueue.add_mutually_exclusive_group()
+        source.add_argument("--file", help="Enqueue every job in a JSONL file (one job object per line)")
+        source.add_argument("--stdin", action="store_true", help="Enqueue JSONL jobs read from standard input")
+        p_enqueue.add_argument("--chunk-size", type=int, default=10000,
+                               help="Jobs inserted per transaction in bulk mode")
+        p_enqueue.set_defaults(func=cmd_enqueue)
 
     # worker
-    p_worker = subparsers.add_parser("worker", help="Manage workers")
-    worker_sub = p_worker.add_subparsers(dest="subcommand")
-
-    p_start = worker_sub.add_parser("start", help="Start worker processes")
-    p_start.add_argument("--count", type=int, default=1, help="Number of workers to start")
-    p_start.set_defaults(func=cmd_worker_start)
-
-    p_stop = worker_sub.add_parser("stop", help="Stop all workers")
-    p_stop.set_defaults(func=cmd_worker_stop)
+    if command in (None, "worker"):
+        p_worker = subparsers.add_parser("worker", help="Manage workers")
+        worker_sub = p_worker.add_subparsers(dest="subcommand")
+
+        p_start = worker_sub.add_parser("start", help="Start worker processes")
+        p_start.add_argument("--count", type=int, help="Number of workers to start (default 1, or --min)")
+        p_start.add_argument("--min", type=int, help="Autoscale: fewest workers to keep running")
+        p_start.add_argument("--max", type=int, help="Autoscale: most workers to run when jobs back up")
+        p_start.add_argument("--batch-size", type=int, default=1,
+                             help="Jobs each worker claims per transaction (outcomes are committed in groups of this size)")
+        p_start.add_argument("--concurrency", type=int, default=1,
+                             help="Commands each worker process runs at once on a thread pool")
+        p_start.add_argument("--queues", help="Queues to serve with weights, e.g. 'critical:5,default:1' (default: all)")
+        p_start.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+        p_start.add_argument("--archive-interval", type=float, metavar="SECONDS",
+                             help="Archive old finished jobs in the background every SECONDS (default: archive.interval, 0 = off)")
+        p_start.set_defaults(func=cmd_worker_start)
+
+        p_stop = worker_sub.add_parser("stop", help="Stop all workers")
+        p_stop.set_defaults(func=cmd_worker_stop)
 
     # list
-    p_list = subparsers.add_parser("list", help="List jobs by state")
-    p_list.add_argument("--state", type=str, help="Filter by job state")
-    p_list.set_defaults(func=cmd_list)
+    if command in (None, "list"):
+        p_list = subparsers.add_parser("list", help="List jobs by state")
+        p_list.add_argument("--state", type=str, help="Filter by job state")
+        add_listing_arguments(p_list)
+        p_list.set_defaults(func=cmd_list)
 
     # dlq
-    p_dlq = subparsers.add_parser("dlq", help="Dead Letter Queue operations")
-    dlq_sub = p_dlq.add_subparsers(dest="subcommand")
+    if command in (None, "dlq"):
+        p_dlq = subparsers.add_parser("dlq", help="Dead Letter Queue operations")
+        dlq_sub = p_dlq.add_subparsers(dest="subcommand")
+
+        p_dlq_list = dlq_sub.add_parser("list", help="List DLQ jobs")
+        add_listing_arguments(p_dlq_list)
+        p_dlq_list.set_defaults(func=cmd_dlq_list)
 
-    p_dlq_list = dlq_sub.add_parser("list", help="List DLQ jobs")
-    p_dlq_list.set_defaults(func=cmd_dlq_list)
+        p_dlq_retry = dlq_sub.add_parser("retry", help="Retry a DLQ job, or every DLQ job matching a filter")
+        p_dlq_retry.add_argument("job_id", nargs="?", help="Job ID to retry")
+        add_dlq_filter_arguments(p_dlq_retry)
+        p_dlq_retry.add_argument("--spread", type=float, default=0, metavar="SECONDS",
+                                 help="Stagger the retried jobs evenly over this many seconds")
+        p_dlq_retry.set_defaults(func=cmd_dlq_retry)
 
-    p_dlq_retry = dlq_sub.add_parser("retry", help="Retry a DLQ job")
-    p_dlq_retry.add_argument("job_id", help="Job ID to retry")
-    p_dlq_retry.set_defaults(func=cmd_dlq_retry)
+        p_dlq_purge = dlq_sub.add_parser("purge", help="Delete DLQ jobs matching a filter")
+        add_dlq_filter_arguments(p_dlq_purge)
+        p_dlq_purge.set_defaults(func=cmd_dlq_purge)
 
     # status
-    p_status = subparsers.add_parser("status", help="Show system summary")
-    p_status.set_defaults(func=cmd_status)
+    if command in (None, "status"):
+        p_status = subparsers.add_parser("status", help="Show system summary")
+        p_status.add_argument("--by-queue", action="store_true", help="Break counts down per queue")
+        p_status.add_argument("--watch", type=float, nargs="?", const=2.0, metavar="SECONDS",
+                              help="Refresh every SECONDS (default 2) until interrupted")
+        p_status.add_argument("--rebuild", action="store_true",
+                              help="Recount the jobs table, report any counter drift and fix it")
+        p_status.set_defaults(func=cmd_status)
+
+    # archive
+    if command in (None, "archive"):
+        from queuectl.archive import TERMINAL_STATES
+
+        p_archive = subparsers.add_parser("archive", help="Move old finished jobs to the archive database, or query it")
+        archive_sub = p_archive.add_subparsers(dest="subcommand")
+
+        p_archive_run = archive_sub.add_parser("run", help="Archive completed/dead jobs past the retention window")
+        p_archive_run.add_argument("--older-than", type=float, metavar="DAYS",
+                                   help="Retention window in days (default: archive.retention_days, 7)")
+        p_archive_run.add_argument("--batch-size", type=int, help="Jobs moved per transaction (default 500)")
+        p_archive_run.add_argument("--vacuum", action="store_true", help="VACUUM the live database afterwards")
+        p_archive_run.set_defaults(func=cmd_archive_run)
+
+        p_archive_list = archive_sub.add_parser("list", help="List archived jobs")
+        p_archive_list.add_argument("--state", choices=TERMINAL_STATES, help="Filter by job state")
+        p_archive_list.add_argument("--limit", type=int, default=100, help="Maximum rows to show")
+        p_archive_list.set_defaults(func=cmd_archive_list)
+
+        p_archive_show = archive_sub.add_parser("show", help="Show an archived job with its output")
+        p_archive_show.add_argument("job_id", help="Job ID")
+        p_archive_show.set_defaults(func=cmd_archive_show)
+
+    # schedule
+    if command in (None, "schedule"):
+        p_schedule = subparsers.add_parser("schedule", help="Manage recurring (cron) jobs")
+        schedule_sub = p_schedule.add_subparsers(dest="subcommand")
+
+        p_schedule_add = schedule_sub.add_parser("add", help="Create or replace a schedule")
+        p_schedule_add.add_argument("name", help="Schedule name")
+        p_schedule_add.add_argument("cron", help='Cron expression in UTC, e.g. "*/5 * * * *" or @daily')
+        p_schedule_add.add_argument("job_json", help="Job data in JSON format, enqueued at every fire")
+        p_schedule_add.set_defaults(func=cmd_schedule_add)
+
+        p_schedule_list = schedule_sub.add_parser("list", help="List schedules")
+        p_schedule_list.set_defaults(func=cmd_schedule_list)
+
+        p_schedule_remove = schedule_sub.add_parser("remove", help="Delete a schedule")
+        p_schedule_remove.add_argument("name", help="Schedule name")
+        p_schedule_remove.set_defaults(func=cmd_schedule_remove)
+
+        for action in ("pause", "resume"):
+            p_schedule_toggle = schedule_sub.add_parser(action, help=f"{action.capitalize()} a schedule")
+            p_schedule_toggle.add_argument("name", help="Schedule name")
+            p_schedule_toggle.set_defaults(func=cmd_schedule_pause)
+
+    # logs
+    if command in (None, "logs"):
+        p_logs = subparsers.add_parser("logs", help="Show a job's full output log")
+        p_logs.add_argument("job_id", help="Job ID")
+        p_logs.add_argument("--follow", "-f", action="store_true", help="Keep printing output while the job runs")
+        p_logs.set_defaults(func=cmd_logs)
+
+    # serve
+    if command in (None, "serve"):
+        p_serve = subparsers.add_parser("serve", help="Accept enqueue, status and list calls over HTTP or a Unix socket")
+        p_serve.add_argument("--host", default="127.0.0.1", help="Address to listen on (default 127.0.0.1)")
+        p_serve.add_argument("--port", type=int, default=8765, help="TCP port (default 8765)")
+        p_serve.add_argument("--socket", help="Listen on this Unix socket path instead of TCP")
+        p_serve.add_argument("--group-wait-ms", type=float, default=0,
+                             help="Wait this long for more requests before committing a group (default 0)")
+        p_serve.set_defaults(func=cmd_serve)
+
+    # config
+    if command in (None, "config"):
+        p_config = subparsers.add_parser("config", help="Read or change settings stored in the database")
+        config_sub = p_config.add_subparsers(dest="subcommand")
+
+        p_config_get = config_sub.add_parser("get", help="Show a config value (or all values)")
+        p_config_get.add_argument("key", nargs="?", help="Config key, e.g. db.busy_timeout")
+        p_config_get.set_defaults(func=cmd_config_get)
+
+        p_config_set = config_sub.add_parser("set", help="Set a config value")
+        p_config_set.add_argument("key", help="Config key, e.g. db.busy_timeout")
+        p_config_set.add_argument("value", help="New value")
+        p_config_set.set_defaults(func=cmd_config_set)
 
     return parser
 
 
 def main():
-    parser = build_parser()
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    parser = build_parser(command if command in COMMANDS else None)
     args = parser.parse_args()
 
     if not hasattr(args, "func"):
-        parser.print_help()
+        build_parser().print_help()
         sys.exit(1)
 
-    args.func(args)
+    try:
+        args.func(args)
+    except BackendError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+# queuectl/client.py
+
+"""
+Enqueue Server Client
+---------------------
+A small client for `queuectl serve` (queuectl/server.py). It keeps one
+keep-alive connection open, so each call is a single round trip.
+
+    from queuectl.client import Client
+
+    client = Client()                      # QUEUECTL_SERVER, or http://127.0.0.1:8765
+    client.enqueue({"command": "echo hi"}) # -> job id
+    client.enqueue_many(jobs)              # -> (inserted, skipped)
+    client.status(by_queue=True)
+    client.list(state="pending", limit=10)
+    client.get("job1")
+
+The server is addressed as `http://host:port` or `unix:/path/to/socket`.
+A Client is not thread-safe; give each thread its own.
+"""
+
+import http.client
+import json
+import os
+import socket
+from urllib.parse import quote, urlencode, urlsplit
+
+from queuectl.utils import generate_id
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+class ClientError(Exception):
+    """The server rejected a request (an invalid job, an unknown id...)."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _with_id(job: dict) -> dict:
+    return job if "id" in job else {**job, "id": generate_id()}
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class Client:
+    def __init__(self, url: str = None, timeout: float = 30.0):
+        self.url = url or os.environ.get("QUEUECTL_SERVER", DEFAULT_URL)
+        if self.url.startswith("unix:"):
+            self._conn = _UnixConnection(self.url[len("unix:"):], timeout)
+        else:
+            parts = urlsplit(self.url)
+            if parts.scheme != "http" or not parts.hostname:
+                raise ValueError(f"server URL must be http://host:port or unix:/path, not {self.url!r}")
+            self._conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+
+    def _request(self, method: str, path: str, payload=None):
+        body = None if payload is None else json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in (1, 2):
+            try:
+                self._conn.request(method, path, body, headers)
+                response = self._conn.getresponse()
+                data = json.loads(response.read())
+                break
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.CannotSendRequest):
+                # The server closed an idle keep-alive connection; reconnect once.
+                # Resending a POST is safe: ids are set before sending, so a
+                # batch that did commit is skipped as duplicates.
+                self._conn.close()
+                if attempt == 2:
+                    raise
+        if response.status >= 400:
+            raise ClientError(response.status, data.get("error", response.reason))
+        return data
+
+    def enqueue(self, job: dict) -> str:
+        """Enqueue one job. Returns its id."""
+        return self._request("POST", "/jobs", _with_id(job))["ids"][0]
+
+    def enqueue_many(self, jobs) -> tuple:
+        """Enqueue a list of jobs in one request. Returns (inserted, skipped)."""
+        result = self._request("POST", "/jobs", [_with_id(job) for job in jobs])
+        return result["inserted"], result["skipped"]
+
+    def status(self, by_queue: bool = False) -> dict:
+        """Job counts, {state: n} or {(queue, state): n}."""
+        counts = self._request("GET", "/status?by_queue=1" if by_queue else "/status")["counts"]
+        if by_queue:
+            return {(queue, state): n for queue, state, n in counts}
+        return counts
+
+    def list(self, state: str = None, queue: str = None, since: str = None,
+             after: str = None, limit: int = 100) -> list:
+        """Jobs as dicts of LIST_COLUMNS, oldest first."""
+        params = {k: v for k, v in (("state", state), ("queue", queue), ("since", since),
+                                    ("after", after), ("limit", limit)) if v is not None}
+        return self._request("GET", "/jobs?" + urlencode(params))["jobs"]
+
+    def get(self, job_id: str):
+        """One job as a dict, or None."""
+        try:
+            return self._request("GET", "/jobs/" + quote(job_id, safe=""))
+        except ClientError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def health(self) -> dict:
+        return self._request("GET", "/health")
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
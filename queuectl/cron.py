@@ -0,0 +1,121 @@
+# queuectl/cron.py
+
+"""
+Cron expressions
+----------------
+A small parser for the standard five-field cron syntax, evaluated in UTC:
+
+    minute  hour  day-of-month  month  day-of-week
+    */15    9-17  *             *      mon-fri
+
+Fields accept `*`, numbers, names (jan-dec, sun-sat), ranges `a-b`, lists
+`a,b` and steps `*/n` or `a-b/n`. Day of week 0 and 7 are both Sunday. As
+in Vixie cron, when both day-of-month and day-of-week are restricted a day
+matching either one fires. The macros @yearly, @annually, @monthly,
+@weekly, @daily, @midnight and @hourly are supported too.
+"""
+
+import datetime
+from typing import Set
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+_MONTHS = {name: i for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+_DAYS = {name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+# (name, low, high, names)
+_FIELDS = (
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day of month", 1, 31, {}),
+    ("month", 1, 12, _MONTHS),
+    ("day of week", 0, 7, _DAYS),
+)
+
+# Give up looking for a next fire time this far ahead (covers Feb 29).
+_SEARCH_YEARS = 8
+
+
+def _value(text: str, names: dict, field: str) -> int:
+    text = text.lower()
+    if text in names:
+        return names[text]
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f"Bad {field} value '{text}'") from None
+
+
+def _parse_field(text: str, field: str, low: int, high: int, names: dict) -> Set[int]:
+    values = set()
+    for part in text.split(","):
+        body, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if step < 1:
+            raise ValueError(f"Bad step in {field}: '{part}'")
+        if body == "*":
+            start, end = low, high
+        elif "-" in body:
+            a, b = body.split("-", 1)
+            start, end = _value(a, names, field), _value(b, names, field)
+        else:
+            start = _value(body, names, field)
+            end = high if step > 1 else start
+        if not (low <= start <= high and low <= end <= high) or start > end:
+            raise ValueError(f"{field} '{part}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpr:
+    def __init__(self, expr: str):
+        self.expr = expr.strip()
+        fields = MACROS.get(self.expr.lower(), self.expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(fields)}: '{expr}'")
+        parsed = [_parse_field(text, *spec) for text, spec in zip(fields, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day: datetime.datetime) -> bool:
+        in_month = day.day in self.days
+        in_week = (day.isoweekday() % 7) in self.weekdays
+        if self.any_day:
+            return in_week
+        if self.any_weekday:
+            return in_month
+        return in_month or in_week
+
+    def next_after(self, after: datetime.datetime) -> datetime.datetime:
+        """The first fire time strictly after `after` (an aware UTC datetime)."""
+        t = after.astimezone(datetime.UTC).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = t.replace(year=t.year + _SEARCH_YEARS) if not (t.month == 2 and t.day == 29) \
+            else t + datetime.timedelta(days=365 * _SEARCH_YEARS)
+        # Jump a whole month/day/hour at a time; never more than a few
+        # hundred steps even for rare schedules.
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+                continue
+            if t.hour not in self.hours:
+                t = t.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            if t.minute not in self.minutes:
+                t += datetime.timedelta(minutes=1)
+                continue
+            return t
+        raise ValueError(f"Cron expression '{self.expr}' never fires")
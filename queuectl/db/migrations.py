@@ -1,7 +1,115 @@
 # queuectl/db/migrations.py
 import sqlite3
 
+# Version of the schema init_db creates, stored in the database header
+# (PRAGMA user_version). Bump it whenever init_db changes, so databases
+# created by older versions are migrated on their next connect.
+SCHEMA_VERSION = 3
+
+
+def add_column(cur, table: str, column: str, ddl: str):
+    """Add a column to a table created by an older version, if it is missing."""
+    cur.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cur.fetchall()}:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def create_count_triggers(cur):
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_count_insert AFTER INSERT ON jobs
+    BEGIN
+        INSERT INTO job_counts (queue, state, count) VALUES (NEW.queue, NEW.state, 1)
+        ON CONFLICT (queue, state) DO UPDATE SET count = count + 1;
+    END;
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_count_delete AFTER DELETE ON jobs
+    BEGIN
+        UPDATE job_counts SET count = count - 1 WHERE queue = OLD.queue AND state = OLD.state;
+    END;
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_count_update AFTER UPDATE OF state, queue ON jobs
+    WHEN OLD.state IS NOT NEW.state OR OLD.queue IS NOT NEW.queue
+    BEGIN
+        UPDATE job_counts SET count = count - 1 WHERE queue = OLD.queue AND state = OLD.state;
+        INSERT INTO job_counts (queue, state, count) VALUES (NEW.queue, NEW.state, 1)
+        ON CONFLICT (queue, state) DO UPDATE SET count = count + 1;
+    END;
+    """)
+
+
+def create_dependency_triggers(cur):
+    # `+state` keeps the planner on the primary key (the children's ids)
+    # instead of scanning every blocked job through idx_jobs_state_created.
+    # A parent completing releases its blocked children: each loses one
+    # outstanding dependency and becomes pending at zero. Runs inside the
+    # transaction that records the parent's success, whichever path that is.
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_deps_release AFTER UPDATE OF state ON jobs
+    WHEN NEW.state = 'completed' AND OLD.state IS NOT 'completed'
+    BEGIN
+        UPDATE jobs
+        SET deps_remaining = deps_remaining - 1,
+            state = CASE WHEN deps_remaining <= 1 THEN 'pending' ELSE state END,
+            updated_at = NEW.updated_at
+        WHERE id IN (SELECT child_id FROM job_deps WHERE parent_id = NEW.id)
+        AND +state = 'blocked';
+    END;
+    """)
+    # A parent going to the DLQ takes every blocked descendant with it.
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_deps_fail AFTER UPDATE OF state ON jobs
+    WHEN NEW.state = 'dead' AND OLD.state IS NOT 'dead'
+    BEGIN
+        UPDATE jobs
+        SET state = 'dead', last_error = 'dependency ' || NEW.id || ' failed', updated_at = NEW.updated_at
+        WHERE +state = 'blocked'
+        AND id IN (
+            WITH RECURSIVE descendants (id) AS (
+                SELECT child_id FROM job_deps WHERE parent_id = NEW.id
+                UNION
+                SELECT d.child_id FROM job_deps d JOIN descendants ON d.parent_id = descendants.id
+            )
+            SELECT id FROM descendants
+        );
+    END;
+    """)
+    # A job retried out of the DLQ waits again for parents that have not completed.
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_deps_requeue AFTER UPDATE OF state ON jobs
+    WHEN OLD.state = 'dead' AND NEW.state = 'pending'
+    AND EXISTS (SELECT 1 FROM job_deps WHERE child_id = NEW.id)
+    BEGIN
+        UPDATE jobs
+        SET deps_remaining = (
+            SELECT COUNT(*) FROM job_deps d JOIN jobs p ON p.id = d.parent_id
+            WHERE d.child_id = NEW.id AND p.state != 'completed'
+        )
+        WHERE id = NEW.id;
+        UPDATE jobs SET state = 'blocked' WHERE id = NEW.id AND deps_remaining > 0;
+    END;
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_jobs_deps_delete AFTER DELETE ON jobs
+    BEGIN
+        DELETE FROM job_deps WHERE child_id = OLD.id;
+    END;
+    """)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
 def init_db(conn: sqlite3.Connection):
+    """
+    Create or migrate the schema. A database already at SCHEMA_VERSION is
+    left alone after one header read, so connecting stays cheap.
+    """
+    version = schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return
     cur = conn.cursor()
 
     # Jobs table
@@ -16,9 +124,190 @@ def init_db(conn: sqlite3.Connection):
         updated_at TEXT NOT NULL,
         next_attempt_at TEXT,
         last_error TEXT,
-        output TEXT
+        output TEXT,
+        priority INTEGER NOT NULL DEFAULT 0,
+        queue TEXT NOT NULL DEFAULT 'default',
+        lease_owner TEXT,
+        lease_expires_at TEXT,
+        backoff TEXT,
+        callable TEXT,
+        args TEXT,
+        timeout REAL,
+        deps_remaining INTEGER NOT NULL DEFAULT 0,
+        idempotency_key TEXT,
+        cache_ttl REAL,
+        inputs TEXT
+    );
+    """)
+    add_column(cur, "jobs", "priority", "INTEGER NOT NULL DEFAULT 0")
+    add_column(cur, "jobs", "queue", "TEXT NOT NULL DEFAULT 'default'")
+    add_column(cur, "jobs", "lease_owner", "TEXT")
+    add_column(cur, "jobs", "lease_expires_at", "TEXT")
+    add_column(cur, "jobs", "backoff", "TEXT")
+    add_column(cur, "jobs", "callable", "TEXT")
+    add_column(cur, "jobs", "args", "TEXT")
+    add_column(cur, "jobs", "timeout", "REAL")
+    add_column(cur, "jobs", "deps_remaining", "INTEGER NOT NULL DEFAULT 0")
+    add_column(cur, "jobs", "idempotency_key", "TEXT")
+    add_column(cur, "jobs", "cache_ttl", "REAL")
+    add_column(cur, "jobs", "inputs", "TEXT")
+
+    # At most one job per idempotency key: inserts use INSERT OR IGNORE, so
+    # a re-submitted job is skipped exactly like a duplicate id.
+    cur.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_idempotency
+    ON jobs (idempotency_key)
+    WHERE idempotency_key IS NOT NULL;
+    """)
+
+    # Partial index over ready jobs, in the order of the per-queue claim
+    # query in repo.claim_jobs (highest priority, then oldest). Delayed jobs
+    # and retries stay out of it until they are due, when the claim promotes
+    # them (next_attempt_at = NULL, see repo.promote_due_jobs), so however
+    # many wait for later a claim only reads ready ones. Replaces
+    # idx_jobs_claim and idx_jobs_queue_claim, which held every waiting job.
+    cur.execute("DROP INDEX IF EXISTS idx_jobs_claim")
+    cur.execute("DROP INDEX IF EXISTS idx_jobs_queue_claim")
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_jobs_ready_claim
+    ON jobs (queue, priority DESC, created_at)
+    WHERE state IN ('pending', 'failed') AND next_attempt_at IS NULL;
+    """)
+
+    # Every queue that has ever received a job, so workers not subscribed to
+    # specific queues can round-robin over all of them.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS queues (
+        name TEXT PRIMARY KEY
+    );
+    """)
+    cur.execute("INSERT OR IGNORE INTO queues (name) VALUES ('default')")
+
+    # Earliest scheduled retry, so idle workers know how long they may sleep
+    # and claims find the ones that have come due. `queue` and `state` let
+    # the autoscaler count delayed jobs, or one pool's, from the index alone.
+    if version < 3:
+        cur.execute("DROP INDEX IF EXISTS idx_jobs_retry")
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_jobs_retry
+    ON jobs (next_attempt_at, queue, state)
+    WHERE state IN ('pending', 'failed') AND next_attempt_at IS NOT NULL;
+    """)
+
+    # Leases of running jobs, so the reaper finds expired ones without a scan.
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_jobs_lease
+    ON jobs (lease_expires_at)
+    WHERE state = 'processing';
+    """)
+
+    # Ready jobs of each queue by the time they became ready (updated_at,
+    # see repo.promote_due_jobs), so the manager finds the longest waiting
+    # job (for autoscaling) with one index probe per queue. Replaces
+    # idx_jobs_ready_age, which went by created_at over all queues.
+    cur.execute("DROP INDEX IF EXISTS idx_jobs_ready_age")
+    if version < 3:
+        cur.execute("DROP INDEX IF EXISTS idx_jobs_ready_since")
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_jobs_ready_since
+    ON jobs (queue, updated_at)
+    WHERE state IN ('pending', 'failed') AND next_attempt_at IS NULL;
+    """)
+
+    # Keyset pagination for `queuectl list` / `dlq list`: every listing walks
+    # (created_at, id) in order, optionally within one state or one queue.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state_created ON jobs (state, created_at, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue_created ON jobs (queue, created_at, id)")
+
+    # Terminal jobs by age, so the archiver finds what to move without a scan.
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_jobs_terminal
+    ON jobs (updated_at)
+    WHERE state IN ('completed', 'dead');
+    """)
+
+    # Per-queue, per-state job counts, kept current by triggers inside the
+    # same transaction as every job change, so `queuectl status` and the
+    # manager never have to count the jobs table.
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='job_counts'")
+    if cur.fetchone() is None:
+        conn.commit()
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute("""
+        CREATE TABLE job_counts (
+            queue TEXT NOT NULL,
+            state TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (queue, state)
+        ) WITHOUT ROWID;
+        """)
+        create_count_triggers(cur)
+        cur.execute("""
+        INSERT INTO job_counts (queue, state, count)
+        SELECT queue, state, COUNT(*) FROM jobs GROUP BY queue, state
+        """)
+        conn.commit()
+
+    # Token buckets for per-queue rate limits (limit.<queue>.rate). Only
+    # read and written inside claim transactions.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS rate_buckets (
+        queue TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        refilled_at REAL NOT NULL
+    );
+    """)
+
+    # Recurring jobs. `job` is the JSON template each firing enqueues; the
+    # manager's scheduler finds due schedules through idx_schedules_due, so
+    # a tick costs one index probe however many schedules exist.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS schedules (
+        name TEXT PRIMARY KEY,
+        cron TEXT NOT NULL,
+        job TEXT NOT NULL,
+        next_fire_at TEXT NOT NULL,
+        last_fire_at TEXT,
+        enabled INTEGER NOT NULL DEFAULT 1,
+        created_at TEXT NOT NULL
+    );
+    """)
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_schedules_due
+    ON schedules (next_fire_at)
+    WHERE enabled = 1;
+    """)
+
+    # Dependency edges (`depends_on`). A job with unfinished parents waits in
+    # state 'blocked' with deps_remaining counting them; the triggers in
+    # create_dependency_triggers release or fail it as its parents finish.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS job_deps (
+        parent_id TEXT NOT NULL,
+        child_id TEXT NOT NULL,
+        PRIMARY KEY (parent_id, child_id)
+    ) WITHOUT ROWID;
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_job_deps_child ON job_deps (child_id)")
+    create_dependency_triggers(cur)
+
+    # Outputs of cacheable jobs, keyed by a hash of the command and its
+    # declared inputs (see queuectl/cache.py). Times are epoch seconds;
+    # idx_result_cache_expiry and idx_result_cache_lru find the entries to
+    # evict without a scan.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS result_cache (
+        key TEXT PRIMARY KEY,
+        output TEXT,
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        last_used REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
     );
     """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_lru ON result_cache (last_used)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_expiry ON result_cache (expires_at)")
 
     # Config table
     cur.execute("""
@@ -28,5 +317,5 @@ def init_db(conn: sqlite3.Connection):
     );
     """)
 
+    cur.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
     conn.commit()
-    print("Database schema initialized successfully.")
@@ -1,33 +1,914 @@
 # queuectl/db/repo.py
+import functools
+import json
+import os
 import sqlite3
 import datetime
+import time
 from queuectl.db.migrations import init_db
+from queuectl.models import ClaimedJob, QueueLimit
+from queuectl.utils import utcnow_iso
 
 DB_PATH = "queuectl.db"
 
-def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+# Connection tuning, keyed by the name used in the `config` table
+# (as "db.<name>"). Each entry is (environment variable, default).
+# The environment wins over the config table, which wins over the default.
+DB_SETTINGS = {
+    "journal_mode": ("QUEUECTL_JOURNAL_MODE", "wal"),
+    "synchronous": ("QUEUECTL_SYNCHRONOUS", "normal"),
+    "busy_timeout": ("QUEUECTL_BUSY_TIMEOUT", "5000"),      # milliseconds
+    "mmap_size": ("QUEUECTL_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": ("QUEUECTL_CACHE_SIZE", "-16000"),        # negative = KiB
+}
+
+_JOURNAL_MODES = {"delete", "truncate", "persist", "memory", "wal", "off"}
+_SYNCHRONOUS = {"off", "normal", "full", "extra"}
+
+
+def resolve_db_path(db_path: str = None) -> str:
+    """Database path: explicit argument, then $QUEUECTL_DB, then DB_PATH."""
+    return db_path or os.environ.get("QUEUECTL_DB", DB_PATH)
+
+
+def get_config(conn, key: str, default=None):
+    cur = conn.cursor()
+    cur.execute("SELECT value FROM config WHERE key=?", (key,))
+    row = cur.fetchone()
+    return row[0] if row else default
+
+
+def set_config(conn, key: str, value: str):
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO config (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value=excluded.value
+    """, (key, str(value)))
+    conn.commit()
+
+
+def get_setting(conn, key: str, env_var: str, default=None):
+    """A setting from the environment, else the config table, else `default`."""
+    value = os.environ.get(env_var)
+    if value is not None:
+        return value
+    return get_config(conn, key, default)
+
+
+def db_settings(conn) -> dict:
+    """Resolve the connection settings from the environment and config table."""
+    cur = conn.cursor()
+    cur.execute("SELECT key, value FROM config WHERE key LIKE 'db.%'")
+    stored = {key[3:]: value for key, value in cur.fetchall()}
+
+    settings = {}
+    for name, (env_var, default) in DB_SETTINGS.items():
+        settings[name] = os.environ.get(env_var, stored.get(name, default))
+    return settings
+
+
+def apply_settings(conn, settings: dict):
+    """
+    Apply connection pragmas. Values are validated before being formatted
+    into the PRAGMA statements, since pragmas cannot take bound parameters.
     """
-    Opens a SQLite connection and ensures schema exists.
+    journal_mode = str(settings["journal_mode"]).lower()
+    synchronous = str(settings["synchronous"]).lower()
+    if journal_mode not in _JOURNAL_MODES:
+        raise ValueError(f"Invalid journal_mode: {journal_mode}")
+    if synchronous not in _SYNCHRONOUS:
+        raise ValueError(f"Invalid synchronous setting: {synchronous}")
+
+    cur = conn.cursor()
+    cur.execute(f"PRAGMA busy_timeout={int(settings['busy_timeout'])}")
+    cur.execute(f"PRAGMA journal_mode={journal_mode}")
+    cur.execute(f"PRAGMA synchronous={synchronous}")
+    cur.execute(f"PRAGMA mmap_size={int(settings['mmap_size'])}")
+    cur.execute(f"PRAGMA cache_size={int(settings['cache_size'])}")
+
+
+def connect(db_path: str = None) -> sqlite3.Connection:
+    """
+    Opens a tuned SQLite connection (WAL, busy timeout, cache and mmap
+    sizing) and brings the schema up to date; a current database costs
+    one PRAGMA user_version read.
     """
+    db_path = resolve_db_path(db_path)
     conn = sqlite3.connect(db_path, check_same_thread=False)
     init_db(conn)
+    apply_settings(conn, db_settings(conn))
     return conn
 
+_INSERT_JOB = """
+    INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at,
+                      priority, queue, backoff, callable, args, timeout, next_attempt_at,
+                      deps_remaining, idempotency_key, cache_ttl, inputs)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _job_row(job, now):
+    deps = job.get("depends_on") or ()
+    return (job["id"], job["command"], "blocked" if deps else "pending",
+            job.get("attempts", 0), job.get("max_retries", 3),
+            now, now, job.get("priority", 0), job.get("queue", "default"), job.get("backoff"),
+            job.get("callable"), json.dumps(job["args"]) if "args" in job else None, job.get("timeout"),
+            job.get("next_attempt_at"), len(deps), job.get("idempotency_key"), job.get("cache_ttl"),
+            json.dumps(job["inputs"]) if job.get("inputs") else None)
+
+
+def _register_queues(cur, names):
+    cur.executemany("INSERT OR IGNORE INTO queues (name) VALUES (?)", ((n,) for n in names))
+
+
+def _link_dependencies(cur, jobs, now):
+    """
+    Record the depends_on edges of just-inserted jobs and settle each one,
+    in order, inside the inserting transaction:
+    - every parent already completed -> pending;
+    - a parent missing or dead -> dead, like the fate of a failed parent;
+    - otherwise blocked, with deps_remaining = parents still to complete.
+    Parents must have been enqueued first (earlier, or earlier in the same
+    batch), which also rules out cycles.
+    """
+    children = [job for job in jobs if job.get("depends_on")]
+    if not children:
+        return
+    # Only for children that exist: one skipped for its idempotency key has no row.
+    cur.executemany("""
+        INSERT OR IGNORE INTO job_deps (parent_id, child_id)
+        SELECT ?, ? WHERE EXISTS (SELECT 1 FROM jobs WHERE id = ?)
+    """, ((parent, job["id"], job["id"]) for job in children for parent in job["depends_on"]))
+    for job in children:
+        cur.execute("""
+            SELECT d.parent_id, p.state FROM job_deps d LEFT JOIN jobs p ON p.id = d.parent_id
+            WHERE d.child_id = ?
+        """, (job["id"],))
+        remaining, error = 0, None
+        for parent, state in cur.fetchall():
+            if state is None:
+                error = f"unknown dependency {parent}"
+            elif state == "dead":
+                error = error or f"dependency {parent} failed"
+            elif state != "completed":
+                remaining += 1
+        # Only jobs still blocked: an id that already existed (and was
+        # skipped by INSERT OR IGNORE) may have moved on meanwhile.
+        if error:
+            cur.execute("""
+                UPDATE jobs SET state='dead', last_error=?, updated_at=?, deps_remaining=?
+                WHERE id=? AND state='blocked'
+            """, (error, now, remaining, job["id"]))
+        else:
+            cur.execute("""
+                UPDATE jobs SET state=?, deps_remaining=?
+                WHERE id=? AND state='blocked'
+            """, ("blocked" if remaining else "pending", remaining, job["id"]))
+
+
 def insert_job(conn, job):
     """
     Inserts a new job record.
     """
     now = datetime.datetime.utcnow().isoformat() + "Z"
     cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at)
-        VALUES (?, ?, 'pending', ?, ?, ?, ?)
-    """, (job["id"], job["command"], job.get("attempts", 0), job.get("max_retries", 3), now, now))
+    cur.execute(_INSERT_JOB, _job_row(job, now))
+    _link_dependencies(cur, [job], now)
+    _register_queues(cur, [job.get("queue", "default")])
     conn.commit()
     print(f"Job {job['id']} inserted.")
 
+def insert_jobs(conn, jobs, chunk_size: int = 10000):
+    """
+    Inserts jobs from any iterable in chunked executemany transactions,
+    so memory stays flat however many jobs there are. Jobs whose id or
+    idempotency_key already exists are skipped. Yields (inserted, skipped) after each committed chunk.
+    """
+    cur = conn.cursor()
+    sql = _INSERT_JOB.replace("INSERT INTO", "INSERT OR IGNORE INTO")
+    chunk = []
+
+    def flush():
+        now = datetime.datetime.utcnow().isoformat() + "Z"
+        cur.executemany(sql, (_job_row(job, now) for job in chunk))
+        # rowcount, not total_changes: the latter also counts the
+        # job_counts trigger's writes.
+        inserted = cur.rowcount
+        _link_dependencies(cur, chunk, now)
+        _register_queues(cur, {job.get("queue", "default") for job in chunk})
+        conn.commit()
+        return inserted, len(chunk) - inserted
+
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) >= chunk_size:
+            yield flush()
+            chunk = []
+    if chunk:
+        yield flush()
+
+def insert_job_groups(conn, groups):
+    """
+    Insert several batches of jobs (e.g. concurrent requests to the server)
+    in one transaction, so they share a single commit. Returns (inserted,
+    skipped) for each batch, in order.
+    """
+    now = datetime.datetime.utcnow().isoformat() + "Z"
+    cur = conn.cursor()
+    sql = _INSERT_JOB.replace("INSERT INTO", "INSERT OR IGNORE INTO")
+    results = []
+    try:
+        for jobs in groups:
+            if not jobs:
+                results.append((0, 0))
+                continue
+            cur.executemany(sql, (_job_row(job, now) for job in jobs))
+            results.append((cur.rowcount, len(jobs) - cur.rowcount))
+        every = [job for jobs in groups for job in jobs]
+        _link_dependencies(cur, every, now)
+        _register_queues(cur, {job.get("queue", "default") for job in every})
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return results
+
+def list_queues(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM queues ORDER BY name")
+    return [row[0] for row in cur.fetchall()]
+
+def lease_expiry(seconds: float) -> str:
+    return (datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=seconds)).isoformat()
+
+# Per-queue limits live in the config table as limit.<queue>.<field>.
+LIMIT_FIELDS = {"rate": float, "burst": float, "concurrency": int}
+
+def parse_limit_key(key: str, value: str):
+    """Split and validate a limit.<queue>.<field> setting into (queue, field, value)."""
+    queue, _, field = key[len("limit."):].rpartition(".")
+    if not key.startswith("limit.") or not queue or field not in LIMIT_FIELDS:
+        raise ValueError(f"Limit keys look like limit.<queue>.rate|burst|concurrency, not {key}")
+    try:
+        number = LIMIT_FIELDS[field](value)
+    except ValueError:
+        raise ValueError(f"{key} must be a number") from None
+    if number <= 0:
+        raise ValueError(f"{key} must be positive")
+    return queue, field, number
+
+def load_queue_limits(conn) -> dict:
+    """{queue: QueueLimit} for every queue with a limit configured."""
+    cur = conn.cursor()
+    cur.execute("SELECT key, value FROM config WHERE key >= 'limit.' AND key < 'limit/'")
+    fields = {}
+    for key, value in cur.fetchall():
+        try:
+            queue, field, number = parse_limit_key(key, value)
+        except ValueError:
+            continue
+        fields.setdefault(queue, {})[field] = number
+    return {queue: QueueLimit(**f) for queue, f in fields.items()}
+
+def _refill(cur, queue: str, limit: QueueLimit, now: float) -> float:
+    """Tokens in `queue`'s bucket at `now`."""
+    burst = limit.burst or max(1.0, limit.rate)
+    cur.execute("SELECT tokens, refilled_at FROM rate_buckets WHERE queue=?", (queue,))
+    row = cur.fetchone()
+    if row is None:
+        return burst
+    tokens, refilled_at = row
+    return min(burst, tokens + max(0.0, now - refilled_at) * limit.rate)
+
+def _running(conn, queue: str) -> int:
+    cur = conn.cursor()
+    cur.execute("SELECT count FROM job_counts WHERE queue=? AND state='processing'", (queue,))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+def _allowance(cur, queue: str, limit: QueueLimit, now: float, want: int, others=()) -> int:
+    """
+    How many of `want` jobs `queue`'s limits let us start right now. Jobs
+    running in `others` (the other shards) count against the cap too.
+    """
+    if limit.concurrency is not None:
+        running = _running(cur.connection, queue) + sum(_running(conn, queue) for conn in others)
+        want = min(want, limit.concurrency - running)
+    if limit.rate is not None:
+        want = min(want, int(_refill(cur, queue, limit, now)))
+    return max(0, want)
+
+def _spend(cur, queue: str, limit: QueueLimit, now: float, count: int):
+    cur.execute("""
+        INSERT INTO rate_buckets (queue, tokens, refilled_at) VALUES (?, ?, ?)
+        ON CONFLICT(queue) DO UPDATE SET tokens=excluded.tokens, refilled_at=excluded.refilled_at
+    """, (queue, _refill(cur, queue, limit, now) - count, now))
+
+def throttle_wait(conn, limits: dict, others=()):
+    """
+    Seconds until a rate-limited queue with waiting jobs earns its next
+    token, or None if no such queue is being held back. The buckets are in
+    `conn`; jobs waiting in `others` (the other shards) count too.
+    """
+    if not limits:
+        return None
+    cur = conn.cursor()
+    now = time.time()
+    waits = []
+    for queue, limit in limits.items():
+        if limit.rate is None:
+            continue
+        tokens = _refill(cur, queue, limit, now)
+        if tokens >= 1:
+            continue
+        if any(has_waiting_jobs(c, [queue]) for c in (conn, *others)):
+            waits.append((1 - tokens) / limit.rate)
+    return min(waits, default=None)
+
+def promote_due_jobs(cur, now: str) -> int:
+    """
+    Make delayed jobs and retries whose time has come ready, inside the
+    caller's transaction: next_attempt_at moves to updated_at (when the job
+    became ready) and is cleared, which puts the job in idx_jobs_ready_claim.
+    Jobs not yet due are never read: this is one range probe of
+    idx_jobs_retry, empty in the common case.
+    """
+    cur.execute("""
+        UPDATE jobs
+        SET updated_at = next_attempt_at, next_attempt_at = NULL
+        WHERE rowid IN (
+            SELECT rowid FROM jobs INDEXED BY idx_jobs_retry
+            WHERE state IN ('pending', 'failed') AND next_attempt_at IS NOT NULL
+            AND next_attempt_at <= ?
+        )
+    """, (now,))
+    return cur.rowcount
+
+def _claim_queue(cur, queue: str, want: int, now: str, owner: str, expires: str):
+    """
+    Move up to `want` of `queue`'s ready jobs to processing, inside the
+    caller's transaction (after promote_due_jobs). Their ready time is read
+    before the UPDATE, since RETURNING only sees the new updated_at.
+    """
+    cur.execute("""
+        SELECT rowid, updated_at
+        FROM jobs INDEXED BY idx_jobs_ready_claim
+        WHERE queue = ?
+        AND state IN ('pending', 'failed')
+        AND next_attempt_at IS NULL
+        ORDER BY priority DESC, created_at ASC
+        LIMIT ?
+    """, (queue, want))
+    ready_at = dict(cur.fetchall())
+    if not ready_at:
+        return []
+    cur.execute("""
+        UPDATE jobs
+        SET state='processing', updated_at=?, lease_owner=?, lease_expires_at=?
+        WHERE rowid IN (SELECT value FROM json_each(?))
+        RETURNING rowid, id, command, attempts, max_retries, backoff,
+                  callable, args, timeout, cache_ttl, inputs
+    """, (now, owner, expires, json.dumps(list(ready_at))))
+    order = {rowid: i for i, rowid in enumerate(ready_at)}
+    rows = sorted(cur.fetchall(), key=lambda row: order[row[0]])
+    return [ClaimedJob(job_id, command, attempts, max_retries, ready_at[rowid], *rest)
+            for rowid, job_id, command, attempts, max_retries, *rest in rows]
+
+def claim_jobs(conn, limit: int, queues, owner: str = None, lease_seconds: float = 30,
+               limits: dict = None):
+    """
+    Atomically claim up to `limit` eligible jobs, trying `queues` in order.
+    Claimed jobs are leased to `owner` for `lease_seconds`; the owner must
+    renew the lease (renew_leases) or the reaper hands the job back.
+
+    `limits` ({queue: QueueLimit}, see load_queue_limits) caps how many
+    jobs a queue may start per second and have running at once. They are
+    checked and charged inside the same transaction as the claim, against
+    the shared rate_buckets and job_counts tables, so every worker process
+    sees the same budget and no extra lock is involved.
+
+    Within a queue, jobs are taken highest priority first, then oldest first.
+    Due delayed jobs are promoted first; each pick is then a read of
+    idx_jobs_ready_claim and one UPDATE ... RETURNING, and all queues are
+    tried under one BEGIN IMMEDIATE, so concurrent workers never race for
+    the same row and a claim costs one commit however many queues it had to
+    look at.
+    """
+    now = utcnow_iso()
+    expires = lease_expiry(lease_seconds)
+    cur = conn.cursor()
+    rows = []
+
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        promote_due_jobs(cur, now)
+        for queue in queues:
+            want = limit - len(rows)
+            throttle = limits.get(queue) if limits else None
+            if throttle is not None:
+                clock = time.time()
+                want = _allowance(cur, queue, throttle, clock, want)
+                if want == 0:
+                    continue
+            claimed = _claim_queue(cur, queue, want, now, owner, expires)
+            if claimed and throttle is not None and throttle.rate is not None:
+                _spend(cur, queue, throttle, clock, len(claimed))
+            rows.extend(claimed)
+            if len(rows) >= limit:
+                break
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return rows
+
+def claim_jobs_sharded(conns, order, limit: int, queues, owner: str = None,
+                       lease_seconds: float = 30, limits: dict = None):
+    """
+    claim_jobs over several database files (backends/sharded.py) under one
+    budget. The limits are checked and charged in conns[0], whose write
+    lock is held for the whole claim, so limited claims from every worker
+    take turns there and a queue gets its limit once rather than once per
+    file. Files are tried in `order`. Returns [(file index, ClaimedJob)].
+    """
+    now = utcnow_iso()
+    expires = lease_expiry(lease_seconds)
+    main = conns[0].cursor()
+    rows = []
+
+    main.execute("BEGIN IMMEDIATE")
+    try:
+        promote_due_jobs(main, now)
+        for queue in queues:
+            want = limit - len(rows)
+            throttle = limits.get(queue) if limits else None
+            if throttle is not None:
+                clock = time.time()
+                want = _allowance(main, queue, throttle, clock, want, conns[1:])
+            taken = 0
+            for index in order:
+                if taken >= want:
+                    break
+                if not has_waiting_jobs(conns[index], [queue]):
+                    continue
+                if index == 0:
+                    claimed = _claim_queue(main, queue, want - taken, now, owner, expires)
+                else:
+                    cur = conns[index].cursor()
+                    cur.execute("BEGIN IMMEDIATE")
+                    try:
+                        promote_due_jobs(cur, now)
+                        claimed = _claim_queue(cur, queue, want - taken, now, owner, expires)
+                        conns[index].commit()
+                    except Exception:
+                        conns[index].rollback()
+                        raise
+                rows.extend((index, job) for job in claimed)
+                taken += len(claimed)
+            if taken and throttle is not None and throttle.rate is not None:
+                _spend(main, queue, throttle, clock, taken)
+            if len(rows) >= limit:
+                break
+        conns[0].commit()
+    except Exception:
+        conns[0].rollback()
+        raise
+
+    return rows
+
 def list_jobs(conn):
     cur = conn.cursor()
     cur.execute("SELECT id, command, state, attempts, max_retries FROM jobs")
     for row in cur.fetchall():
         print(row)
+
+LIST_COLUMNS = ("id", "command", "state", "attempts", "max_retries", "queue",
+                "priority", "created_at", "updated_at", "last_error")
+
+def iter_jobs(conn, state: str = None, queue: str = None, since: str = None,
+              after: str = None, limit: int = None, page_size: int = 500, after_key: tuple = None):
+    """
+    Stream jobs in (created_at, id) order as LIST_COLUMNS tuples.
+
+    Pages are fetched with keyset queries (`(created_at, id) > last seen`)
+    served by the idx_jobs_*created indexes, so memory stays constant, the
+    first page arrives immediately and no read transaction is held open
+    between pages. `after` resumes behind the given job id (or `after_key`,
+    its (created_at, id), when the job lives in another file); `since`
+    skips jobs created before that ISO timestamp.
+    """
+    cur = conn.cursor()
+    where, params = [], []
+    if state:
+        where.append("state=?")
+        params.append(state)
+    if queue:
+        where.append("queue=?")
+        params.append(queue)
+    if since:
+        where.append("created_at >= ?")
+        params.append(since)
+
+    key = after_key
+    if after and key is None:
+        cur.execute("SELECT created_at, id FROM jobs WHERE id=?", (after,))
+        key = cur.fetchone()
+        if key is None:
+            raise ValueError(f"Unknown job id for --after: {after}")
+
+    sql = f"SELECT {', '.join(LIST_COLUMNS)} FROM jobs WHERE " + " AND ".join(where + ["(created_at, id) > (?, ?)"])
+    first_sql = f"SELECT {', '.join(LIST_COLUMNS)} FROM jobs" + (" WHERE " + " AND ".join(where) if where else "")
+    order = " ORDER BY created_at, id LIMIT ?"
+
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        if key is None:
+            cur.execute(first_sql + order, params + [size])
+        else:
+            cur.execute(sql + order, params + [key[0], key[1], size])
+        rows = cur.fetchall()
+        yield from rows
+        if len(rows) < size:
+            return
+        key = (rows[-1][7], rows[-1][0])
+        if remaining is not None:
+            remaining -= len(rows)
+
+def _dlq_filter(error_like: str = None, since: str = None, queue: str = None):
+    where, params = ["state='dead'"], []
+    if error_like:
+        where.append("last_error LIKE ?")
+        params.append(error_like)
+    if since:
+        where.append("updated_at >= ?")
+        params.append(since)
+    if queue:
+        where.append("queue=?")
+        params.append(queue)
+    return " AND ".join(where), params
+
+def count_dead_jobs(conn, error_like: str = None, since: str = None, queue: str = None) -> int:
+    where, params = _dlq_filter(error_like, since, queue)
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(*) FROM jobs WHERE {where}", params)
+    return cur.fetchone()[0]
+
+def _chunked_dlq(conn, statement: str, params, chunk_size: int, pause: float):
+    """
+    Run `statement` (whose last placeholder is the chunk LIMIT) one commit
+    per chunk until a chunk comes up short. `params(done)` gives the other
+    parameters, given how many rows earlier chunks changed.
+    """
+    cur = conn.cursor()
+    done = 0
+    while True:
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            cur.execute(statement, params(done) + [chunk_size])
+            changed = cur.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        done += changed
+        if changed:
+            yield changed
+        if changed < chunk_size:
+            return
+        # Let workers waiting for the write lock in between chunks.
+        time.sleep(pause)
+
+def retry_dead_jobs(conn, error_like: str = None, since: str = None, queue: str = None,
+                    spread: float = 0, chunk_size: int = 1000, pause: float = 0.05):
+    """
+    Move matching DLQ jobs back to pending, `chunk_size` per transaction.
+    With `spread` (seconds) their next_attempt_at is staggered evenly over
+    that window, so a big retry does not hit every worker at once.
+    Yields the number of jobs requeued by each chunk.
+    """
+    where, params = _dlq_filter(error_like, since, queue)
+    now = utcnow_iso()
+    total = count_dead_jobs(conn, error_like, since, queue) if spread else 0
+    step = spread / total if total else 0
+    yield from _chunked_dlq(conn, f"""
+        UPDATE jobs
+        SET state='pending', attempts=0, last_error=NULL, updated_at=?,
+            next_attempt_at = CASE WHEN ? > 0
+                THEN strftime('%Y-%m-%dT%H:%M:%f', ?, '+' || ((? + pick.n - 1) * ?) || ' seconds') || '+00:00'
+                ELSE NULL END
+        FROM (
+            SELECT id, row_number() OVER (ORDER BY created_at, id) AS n
+            FROM jobs WHERE {where}
+            ORDER BY created_at, id
+            LIMIT ?
+        ) AS pick
+        WHERE jobs.id = pick.id
+    """, lambda done: [now, step, now, done, step] + params, chunk_size, pause)
+
+def purge_dead_jobs(conn, error_like: str = None, since: str = None, queue: str = None,
+                    chunk_size: int = 1000, pause: float = 0.05):
+    """Delete matching DLQ jobs, `chunk_size` per transaction. Yields each chunk's count."""
+    where, params = _dlq_filter(error_like, since, queue)
+    yield from _chunked_dlq(conn, f"""
+        DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE {where} LIMIT ?)
+    """, lambda done: params, chunk_size, pause)
+
+def renew_leases(conn, owner: str, lease_seconds: float, job_ids=None) -> int:
+    """
+    Extend the leases held by `owner`: all of them in one statement, or
+    only those of `job_ids`.
+    """
+    cur = conn.cursor()
+    sql = """
+        UPDATE jobs
+        SET lease_expires_at=?
+        WHERE lease_owner=? AND state='processing'
+    """
+    expiry = lease_expiry(lease_seconds)
+    if job_ids is None:
+        cur.execute(sql, (expiry, owner))
+        renewed = cur.rowcount
+    else:
+        job_ids, renewed = list(job_ids), 0
+        for i in range(0, len(job_ids), 500):
+            part = job_ids[i:i + 500]
+            cur.execute(sql + f" AND id IN ({', '.join('?' * len(part))})", [expiry, owner] + part)
+            renewed += cur.rowcount
+    conn.commit()
+    return renewed
+
+def reap_expired_leases(conn):
+    """
+    Hand back jobs whose lease expired (their worker died or hung) or that
+    never had one. Each counts as a failed attempt, so a job that keeps
+    killing its worker ends up in the DLQ instead of looping forever.
+    Returns the number of jobs requeued and moved to the DLQ.
+    """
+    now = utcnow_iso()
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute("""
+            UPDATE jobs
+            SET state = CASE WHEN attempts + 1 > max_retries THEN 'dead' ELSE 'failed' END,
+                attempts = attempts + 1,
+                last_error = 'Lease expired: worker stopped responding',
+                next_attempt_at = NULL,
+                lease_owner = NULL,
+                lease_expires_at = NULL,
+                updated_at = ?
+            WHERE state = 'processing'
+            AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+            RETURNING state
+        """, (now, now))
+        states = [row[0] for row in cur.fetchall()]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    dead = states.count("dead")
+    return len(states) - dead, dead
+
+def has_waiting_jobs(conn, queues=None) -> bool:
+    """Whether any pending or failed job waits (in `queues`), from job_counts alone, without a write lock."""
+    sql = "SELECT 1 FROM job_counts WHERE state IN ('pending', 'failed') AND count > 0"
+    params = ()
+    if queues is not None:
+        sql += f" AND queue IN ({', '.join('?' * len(queues))})"
+        params = tuple(queues)
+    cur = conn.cursor()
+    cur.execute(sql + " LIMIT 1", params)
+    return cur.fetchone() is not None
+
+def job_counts(conn, by_queue: bool = False) -> dict:
+    """
+    Job counts from the trigger-maintained job_counts table: {state: n},
+    or {(queue, state): n} with `by_queue`. Never scans the jobs table.
+    """
+    cur = conn.cursor()
+    if by_queue:
+        cur.execute("SELECT queue, state, count FROM job_counts WHERE count != 0")
+        return {(queue, state): count for queue, state, count in cur.fetchall()}
+    cur.execute("SELECT state, SUM(count) FROM job_counts GROUP BY state HAVING SUM(count) != 0")
+    return dict(cur.fetchall())
+
+def ready_stats(conn, queues=None):
+    """
+    (ready jobs, seconds the oldest ready job has waited) in `queues` (all
+    by default), from the job_counts counters and index probes only:
+    - waiting = pending + failed from job_counts;
+    - minus jobs whose next attempt is still in the future (idx_jobs_retry);
+    - oldest = the older of the longest ready job of each queue with
+      waiting jobs (idx_jobs_ready_since) and the earliest retry that is
+      already due but not yet promoted (idx_jobs_retry).
+    """
+    now = utcnow_iso()
+    cur = conn.cursor()
+    in_queues, params = "", ()
+    if queues is not None:
+        in_queues = f" AND queue IN ({', '.join('?' * len(queues))})"
+        params = tuple(queues)
+    cur.execute(f"""
+        SELECT queue, SUM(count) FROM job_counts
+        WHERE state IN ('pending', 'failed') AND count > 0{in_queues}
+        GROUP BY queue
+    """, params)
+    waiting = dict(cur.fetchall())
+    if not waiting:
+        return 0, 0.0
+    cur.execute(f"""
+        SELECT COUNT(*) FROM jobs INDEXED BY idx_jobs_retry
+        WHERE state IN ('pending', 'failed') AND next_attempt_at IS NOT NULL AND next_attempt_at > ?{in_queues}
+    """, (now,) + params)
+    ready = max(0, sum(waiting.values()) - cur.fetchone()[0])
+
+    oldest = []
+    for queue in waiting:
+        cur.execute("""
+            SELECT MIN(updated_at) FROM jobs INDEXED BY idx_jobs_ready_since
+            WHERE queue = ? AND state IN ('pending', 'failed') AND next_attempt_at IS NULL
+        """, (queue,))
+        oldest.append(cur.fetchone()[0])
+    cur.execute(f"""
+        SELECT MIN(next_attempt_at) FROM jobs INDEXED BY idx_jobs_retry
+        WHERE state IN ('pending', 'failed') AND next_attempt_at IS NOT NULL AND next_attempt_at <= ?{in_queues}
+    """, (now,) + params)
+    oldest.append(cur.fetchone()[0])
+    oldest = [t for t in oldest if t]
+    if not oldest:
+        return ready, 0.0
+    since = datetime.datetime.fromisoformat(min(oldest).replace("Z", "+00:00"))
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.UTC)
+    return ready, max(0.0, (datetime.datetime.now(datetime.UTC) - since).total_seconds())
+
+def rebuild_job_counts(conn) -> dict:
+    """
+    Recount the jobs table and rewrite job_counts, in one transaction.
+    Returns the drift that was corrected: {(queue, state): (stored, actual)}.
+    """
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute("SELECT queue, state, count FROM job_counts")
+        stored = {(q, st): n for q, st, n in cur.fetchall()}
+        cur.execute("SELECT queue, state, COUNT(*) FROM jobs GROUP BY queue, state")
+        actual = {(q, st): n for q, st, n in cur.fetchall()}
+        cur.execute("DELETE FROM job_counts")
+        cur.executemany("INSERT INTO job_counts (queue, state, count) VALUES (?, ?, ?)",
+                        [(q, st, n) for (q, st), n in actual.items()])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    drift = {}
+    for key in stored.keys() | actual.keys():
+        if stored.get(key, 0) != actual.get(key, 0):
+            drift[key] = (stored.get(key, 0), actual.get(key, 0))
+    return drift
+
+@functools.lru_cache(maxsize=4096)
+def _cron(expr: str):
+    # Imported here: only schedule commands and the manager's scheduler need it.
+    from queuectl.cron import CronExpr
+    return CronExpr(expr)
+
+def save_schedule(conn, name: str, cron: str, job: dict):
+    """Create or replace a schedule; its first fire is the next cron match from now."""
+    first = _cron(cron).next_after(datetime.datetime.now(datetime.UTC)).isoformat()
+    conn.execute("""
+        INSERT INTO schedules (name, cron, job, next_fire_at, enabled, created_at)
+        VALUES (?, ?, ?, ?, 1, ?)
+        ON CONFLICT (name) DO UPDATE SET
+            cron=excluded.cron, job=excluded.job, next_fire_at=excluded.next_fire_at, enabled=1
+    """, (name, cron, json.dumps(job), first, utcnow_iso()))
+    conn.commit()
+    return first
+
+def list_schedules(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT name, cron, enabled, next_fire_at, last_fire_at, job
+        FROM schedules ORDER BY name
+    """)
+    return cur.fetchall()
+
+def delete_schedule(conn, name: str) -> bool:
+    cur = conn.execute("DELETE FROM schedules WHERE name=?", (name,))
+    conn.commit()
+    return cur.rowcount > 0
+
+def set_schedule_enabled(conn, name: str, enabled: bool) -> bool:
+    """Pause or resume a schedule. Resuming skips the fires missed while paused."""
+    cur = conn.cursor()
+    cur.execute("SELECT cron FROM schedules WHERE name=?", (name,))
+    row = cur.fetchone()
+    if row is None:
+        return False
+    next_fire = _cron(row[0]).next_after(datetime.datetime.now(datetime.UTC)).isoformat()
+    cur.execute("UPDATE schedules SET enabled=?, next_fire_at=? WHERE name=?",
+                (1 if enabled else 0, next_fire, name))
+    conn.commit()
+    return True
+
+def fire_due_schedules(conn, limit: int = 500) -> int:
+    """
+    Enqueue a job for up to `limit` schedules whose fire time has passed and
+    advance each to its next fire time, all in one transaction. Returns how
+    many schedules fired.
+
+    Exactly once: the job id is derived from the schedule and the fire time
+    (sched:<name>:<fire time>) and inserted with INSERT OR IGNORE, and the
+    schedule only moves on in the transaction that inserts it, so a crash or
+    a second manager can neither lose nor repeat a fire. Fires missed while
+    no manager was running are coalesced into one job. A schedule whose
+    stored job cannot be enqueued is paused, so it does not hold back the
+    rest of the batch on every tick.
+    """
+    now = utcnow_iso()
+    now_dt = datetime.datetime.fromisoformat(now)
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute("""
+            SELECT name, cron, job, next_fire_at FROM schedules INDEXED BY idx_schedules_due
+            WHERE enabled = 1 AND next_fire_at <= ?
+            ORDER BY next_fire_at
+            LIMIT ?
+        """, (now, limit))
+        due = cur.fetchall()
+        if not due:
+            conn.rollback()
+            return 0
+        jobs, advances, queues, broken = [], [], set(), []
+        for name, cron, template, fire in due:
+            try:
+                job = json.loads(template)
+                job["id"] = f"sched:{name}:{fire}"
+                jobs.append(_job_row(job, now))
+            except (ValueError, KeyError, TypeError):
+                broken.append((name,))
+                continue
+            queues.add(job.get("queue", "default"))
+            try:
+                after = max(datetime.datetime.fromisoformat(fire), now_dt)
+                advances.append((_cron(cron).next_after(after).isoformat(), fire, 1, name))
+            except ValueError:
+                # No future match left; keep the schedule but stop firing it.
+                advances.append((fire, fire, 0, name))
+        cur.executemany(_INSERT_JOB.replace("INSERT INTO", "INSERT OR IGNORE INTO"), jobs)
+        cur.executemany("UPDATE schedules SET next_fire_at=?, last_fire_at=?, enabled=? WHERE name=?",
+                        advances)
+        cur.executemany("UPDATE schedules SET enabled=0 WHERE name=?", broken)
+        _register_queues(cur, queues)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(due) - len(broken)
+
+def cache_get(conn, key: str):
+    """
+    The cached output for `key`, or None if there is none or it expired.
+    A plain read: hits reach the LRU order later, in batches (cache_touch).
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT output FROM result_cache WHERE key=? AND expires_at > ?", (key, time.time()))
+    row = cur.fetchone()
+    return None if row is None else (row[0] or "")
+
+def cache_touch(conn, keys):
+    """Count a hit on each of `keys` and move them to the front of the LRU order, in one transaction."""
+    now = time.time()
+    conn.executemany("UPDATE result_cache SET last_used=?, hits=hits + 1 WHERE key=?",
+                     ((now, key) for key in keys))
+    conn.commit()
+
+def cache_put(conn, key: str, output: str, ttl: float, max_entries: int):
+    """
+    Store an output for `ttl` seconds, then trim the cache: expired entries
+    first, then the least recently used ones beyond `max_entries`.
+    """
+    now = time.time()
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute("""
+            INSERT INTO result_cache (key, output, created_at, expires_at, last_used)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET output=excluded.output, created_at=excluded.created_at,
+                expires_at=excluded.expires_at, last_used=excluded.last_used
+        """, (key, output, now, now + ttl, now))
+        cur.execute("DELETE FROM result_cache WHERE expires_at <= ?", (now,))
+        cur.execute("""
+            DELETE FROM result_cache WHERE key IN (
+                SELECT key FROM result_cache ORDER BY last_used
+                LIMIT MAX(0, (SELECT COUNT(*) FROM result_cache) - ?)
+            )
+        """, (max_entries,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
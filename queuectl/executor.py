@@ -7,15 +7,151 @@ Handles the execution of shell commands for background jobs.
 
 Responsibilities:
 - Execute the command in a subprocess
-- Capture stdout, stderr, and exit code
+- Stream stdout and stderr, keeping only a bounded head and tail in memory
+- Optionally spill the full output to a compressed per-job log file
 - Handle timeouts and unexpected errors
 """
 
+import gzip
+import os
+import select
+import signal
 import subprocess
+import threading
+import time
+import zlib
 from typing import Tuple, Optional
 
+# Bytes kept in memory (and stored in the jobs table) per stream: half from
+# the start of the output, half from the end.
+DEFAULT_MAX_OUTPUT = 64 * 1024
 
-def execute_command(command: str, timeout: int = 3600) -> Tuple[int, str, str]:
+# How often (seconds) a spilled log is flushed so `queuectl logs --follow`
+# sees new output.
+LOG_FLUSH_INTERVAL = 0.5
+
+_CHUNK = 64 * 1024
+
+
+class BoundedCapture:
+    """Keeps the first and last `limit // 2` bytes written to it."""
+
+    def __init__(self, limit: int = DEFAULT_MAX_OUTPUT):
+        self.half = max(1, limit // 2)
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.dropped = 0
+
+    def write(self, data: bytes):
+        room = self.half - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if not data:
+            return
+        self.tail += data
+        excess = len(self.tail) - self.half
+        if excess > 0:
+            del self.tail[:excess]
+            self.dropped += excess
+
+    def getvalue(self) -> str:
+        text = self.head.decode("utf-8", errors="replace")
+        if self.dropped:
+            text += f"\n... [{self.dropped} bytes truncated] ...\n"
+        return text + self.tail.decode("utf-8", errors="replace")
+
+
+class LogSpill:
+    """Thread-safe gzip writer for a job's full output."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.gz = gzip.open(path, "wb", compresslevel=6)
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+
+    def write(self, data: bytes):
+        with self.lock:
+            self.gz.write(data)
+            now = time.monotonic()
+            if now - self.last_flush >= LOG_FLUSH_INTERVAL:
+                # Z_SYNC_FLUSH: everything written so far becomes readable.
+                self.gz.flush()
+                self.last_flush = now
+
+    def close(self):
+        with self.lock:
+            self.gz.close()
+
+
+def log_path(log_dir: str, job_id: str) -> str:
+    """Location of a job's spilled output."""
+    return os.path.join(log_dir, f"{job_id}.log.gz")
+
+
+def read_log(path: str, follow: bool = False, still_running=None, poll: float = 0.5):
+    """
+    Yield decompressed chunks of a (possibly still growing) job log.
+
+    The file is decoded incrementally, so it never has to fit in memory and
+    can be read while the job is still writing it. With `follow`, keeps
+    waiting for new output until `still_running()` returns False.
+    """
+    with open(path, "rb") as f:
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        while True:
+            raw = f.read(_CHUNK)
+            if raw:
+                data = decoder.decompress(raw)
+                if data:
+                    yield data
+                continue
+            if os.path.getsize(path) < f.tell():
+                # The job was retried and its log rewritten: start over.
+                f.seek(0)
+                decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                continue
+            if not follow or decoder.eof or (still_running and not still_running()):
+                # One last read in case output landed after the check.
+                data = decoder.decompress(f.read())
+                if data:
+                    yield data
+                return
+            time.sleep(poll)
+
+
+def _pump(stream, capture: BoundedCapture, spill: Optional[LogSpill], stop: threading.Event):
+    """Copy `stream` until EOF, or until `stop` is set and nothing is waiting."""
+    fd = stream.fileno()
+    while True:
+        if os.name == "posix" and not select.select([fd], [], [], 0.2)[0]:
+            if stop.is_set():
+                break
+            continue
+        chunk = os.read(fd, _CHUNK)
+        if not chunk:
+            break
+        capture.write(chunk)
+        if spill:
+            spill.write(chunk)
+    stream.close()
+
+
+def _kill(proc: subprocess.Popen):
+    """Kill the command and anything it started."""
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def execute_command(command: str, timeout: int = 3600,
+                    max_output: int = DEFAULT_MAX_OUTPUT,
+                    log_file: Optional[str] = None) -> Tuple[int, str, str]:
     """
     Run a shell command and capture its output.
 
@@ -25,6 +161,11 @@ def execute_command(command: str, timeout: int = 3600) -> Tuple[int, str, str]:
         The shell command to execute (e.g., "echo 'Hello World'")
     timeout : int
         Maximum time allowed for execution, in seconds (default: 1 hour)
+    max_output : int
+        Bytes of each stream kept in memory (first and last halves)
+    log_file : str, optional
+        If given, the complete interleaved stdout/stderr is written here,
+        gzip-compressed, as it is produced
 
     Returns
     -------
@@ -33,23 +174,52 @@ def execute_command(command: str, timeout: int = 3600) -> Tuple[int, str, str]:
         exit_code : int
             0 if success, non-zero if failure or error
         stdout : str
-            Captured standard output text
+            Captured standard output text (head and tail if truncated)
         stderr : str
-            Captured standard error text
+            Captured standard error text (head and tail if truncated)
     """
+    spill = None
     try:
-        result = subprocess.run(
+        spill = LogSpill(log_file) if log_file else None
+        proc = subprocess.Popen(
             command,
             shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # Own process group, so a timeout can kill the whole command tree.
+            start_new_session=(os.name == "posix"),
         )
-        return result.returncode, result.stdout.strip(), result.stderr.strip()
+        deadline = time.monotonic() + timeout
+        out, err = BoundedCapture(max_output), BoundedCapture(max_output)
+        stop = threading.Event()
+        readers = [
+            threading.Thread(target=_pump, args=(proc.stdout, out, spill, stop), daemon=True),
+            threading.Thread(target=_pump, args=(proc.stderr, err, spill, stop), daemon=True),
+        ]
+        for t in readers:
+            t.start()
 
-    except subprocess.TimeoutExpired as e:
-        # If command exceeds timeout limit
-        return 1, "", f"Command timed out after {timeout} seconds"
+        def timed_out():
+            _kill(proc)
+            proc.wait()
+            stop.set()
+            for t in readers:
+                t.join(timeout=1)
+            return 1, "", f"Command timed out after {timeout} seconds"
+
+        try:
+            returncode = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            # If command exceeds timeout limit
+            return timed_out()
+
+        # A background child (`sleep 60 &`) can hold the pipes open after
+        # the shell exits; it gets what is left of the timeout.
+        for t in readers:
+            t.join(timeout=max(0, deadline - time.monotonic()))
+        if any(t.is_alive() for t in readers):
+            return timed_out()
+        return returncode, out.getvalue().strip(), err.getvalue().strip()
 
     except FileNotFoundError:
         # Command binary not found
@@ -58,3 +228,7 @@ def execute_command(command: str, timeout: int = 3600) -> Tuple[int, str, str]:
     except Exception as e:
         # Catch-all for any other runtime issue
         return 1, "", f"Execution error: {str(e)}"
+
+    finally:
+        if spill:
+            spill.close()
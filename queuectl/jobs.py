@@ -0,0 +1,76 @@
+# queuectl/jobs.py
+
+"""
+Job Validation
+--------------
+`prepare_job` checks a decoded job submission and normalises it into the
+dict the backends insert: defaults filled in, `run_at`/`delay` turned
+into next_attempt_at, `cache` into cache_ttl. Shared by every producer:
+`queuectl enqueue`, schedules and the enqueue server.
+"""
+
+from queuectl.utils import delay_until, generate_id, parse_backoff, parse_run_at
+
+
+def prepare_job(job_data):
+    """Validate a decoded job and fill in defaults. Raises ValueError."""
+    if not isinstance(job_data, dict):
+        raise ValueError("job must be a JSON object.")
+    if "callable" in job_data:
+        if not isinstance(job_data["callable"], str):
+            raise ValueError("'callable' must be a string like 'pkg.module:function'.")
+        from queuectl.pyexec import parse_target
+        parse_target(job_data["callable"])
+        # Shown by `list` in place of a shell command.
+        job_data.setdefault("command", job_data["callable"])
+    elif "command" not in job_data:
+        raise ValueError("job must contain a 'command' field.")
+    if "timeout" in job_data and (not isinstance(job_data["timeout"], (int, float)) or job_data["timeout"] <= 0):
+        raise ValueError("'timeout' must be a positive number of seconds.")
+    if not isinstance(job_data.get("priority", 0), int):
+        raise ValueError("'priority' must be an integer.")
+    if not isinstance(job_data.get("queue", "default"), str) or not job_data.get("queue", "default"):
+        raise ValueError("'queue' must be a non-empty string.")
+    if job_data.get("backoff") is not None:
+        if not isinstance(job_data["backoff"], str):
+            raise ValueError("'backoff' must be a policy string, e.g. \"exponential:cap=600,jitter=full\".")
+        parse_backoff(job_data["backoff"])
+    if "run_at" in job_data and "delay" in job_data:
+        raise ValueError("pass either 'run_at' or 'delay', not both.")
+    if "run_at" in job_data:
+        job_data["next_attempt_at"] = parse_run_at(job_data.pop("run_at"))
+    elif "delay" in job_data:
+        delay = job_data.pop("delay")
+        if not isinstance(delay, (int, float)) or delay < 0:
+            raise ValueError("'delay' must be a non-negative number of seconds.")
+        job_data["next_attempt_at"] = delay_until(delay)
+    if "id" not in job_data:
+        job_data["id"] = generate_id()
+    if "depends_on" in job_data:
+        deps = job_data["depends_on"]
+        if isinstance(deps, str):
+            deps = [deps]
+        if not isinstance(deps, list) or not all(isinstance(d, str) and d for d in deps):
+            raise ValueError("'depends_on' must be a list of job ids.")
+        if job_data["id"] in deps:
+            raise ValueError("a job cannot depend on itself.")
+        job_data["depends_on"] = list(dict.fromkeys(deps))
+    if "idempotency_key" in job_data and (not isinstance(job_data["idempotency_key"], str)
+                                          or not job_data["idempotency_key"]):
+        raise ValueError("'idempotency_key' must be a non-empty string.")
+    if "dag" in job_data and (not isinstance(job_data["dag"], str) or not job_data["dag"]):
+        raise ValueError("'dag' must be a non-empty string.")
+    cache = job_data.pop("cache", None)
+    if cache is True:
+        job_data["cache_ttl"] = 0   # the cache.ttl setting
+    elif isinstance(cache, (int, float)) and not isinstance(cache, bool) and cache > 0:
+        job_data["cache_ttl"] = cache
+    elif cache not in (None, False):
+        raise ValueError("'cache' must be true or a TTL in seconds.")
+    if "inputs" in job_data:
+        inputs = job_data["inputs"]
+        if not isinstance(inputs, list) or not all(isinstance(p, str) and p for p in inputs):
+            raise ValueError("'inputs' must be a list of file paths.")
+        if "cache_ttl" not in job_data:
+            raise ValueError("'inputs' only applies to cached jobs (\"cache\": true).")
+    return job_data
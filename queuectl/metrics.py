@@ -0,0 +1,184 @@
+# queuectl/metrics.py
+
+"""
+Metrics
+-------
+Cheap, Prometheus-compatible instrumentation.
+
+- Workers record counters and histogram observations into a local
+  `MetricsRecorder` (a dict update under a lock) and periodically send the
+  accumulated deltas to the manager as one small JSON datagram over their
+  wakeup channel.
+- The manager merges the deltas into a `MetricsRegistry` and serves it in
+  the Prometheus text format from a local HTTP endpoint. Scrapes only read
+  memory; nothing touches the database per scrape.
+"""
+
+import json
+import threading
+import time
+
+# Histogram bucket upper bounds, in seconds.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+COUNTERS = {
+    "queuectl_jobs_claimed_total": "Jobs claimed by workers",
+    "queuectl_jobs_completed_total": "Jobs that completed successfully",
+    "queuectl_jobs_failed_total": "Job attempts that failed and will be retried",
+    "queuectl_jobs_dead_total": "Jobs moved to the dead letter queue",
+    "queuectl_cache_hits_total": "Cacheable jobs completed from the result cache",
+    "queuectl_cache_misses_total": "Cacheable jobs that had to run",
+}
+
+HISTOGRAMS = {
+    "queuectl_claim_seconds": "Time to claim a batch of jobs (including the commit)",
+    "queuectl_queue_wait_seconds": "Time jobs waited between becoming ready and being claimed",
+    "queuectl_execution_seconds": "Command execution time",
+    "queuectl_commit_seconds": "Time to commit a group of job outcomes",
+}
+
+# How often (seconds) a worker ships its deltas to the manager.
+FLUSH_INTERVAL = 1.0
+
+
+def _empty_histogram():
+    return [0] * (len(BUCKETS) + 1) + [0.0]   # per-bucket counts, +Inf count, sum
+
+
+def _bucket(value: float) -> int:
+    for i, bound in enumerate(BUCKETS):
+        if value <= bound:
+            return i
+    return len(BUCKETS)
+
+
+class MetricsRecorder:
+    """Worker side: accumulates deltas and ships them through `send`."""
+
+    def __init__(self, send=None):
+        self.send = send
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = time.monotonic()
+
+    def inc(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float):
+        with self.lock:
+            h = self.histograms.get(name)
+            if h is None:
+                h = self.histograms[name] = _empty_histogram()
+            h[_bucket(value)] += 1
+            h[-1] += value
+
+    def flush(self, force: bool = False):
+        if self.send is None:
+            return
+        with self.lock:
+            if not force and time.monotonic() - self.last_flush < FLUSH_INTERVAL:
+                return
+            self.last_flush = time.monotonic()
+            if not self.counters and not self.histograms:
+                return
+            payload = json.dumps({"c": self.counters, "h": self.histograms}).encode()
+            self.counters, self.histograms = {}, {}
+        try:
+            self.send(payload)
+        except OSError:
+            # Manager gone or its buffer is full; these deltas are dropped.
+            pass
+
+
+class MetricsRegistry:
+    """Manager side: merged totals plus gauges, rendered for Prometheus."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {name: 0 for name in COUNTERS}
+        self.histograms = {name: _empty_histogram() for name in HISTOGRAMS}
+        self.gauges = {}
+
+    def merge(self, payload: bytes):
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return
+        with self.lock:
+            for name, value in data.get("c", {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, values in data.get("h", {}).items():
+                h = self.histograms.setdefault(name, _empty_histogram())
+                for i, v in enumerate(values):
+                    h[i] += v
+
+    def set_gauge(self, name: str, labels: dict, value: float):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.gauges.setdefault(name, {})[key] = value
+
+    def set_gauges(self, name: str, values: dict):
+        """
+        Sets a labelled gauge from {labels tuple: value}. Series seen before
+        but missing from `values` drop to 0 rather than keep their last value.
+        """
+        with self.lock:
+            series = self.gauges.setdefault(name, {})
+            for key in series:
+                series[key] = 0
+            for labels, value in values.items():
+                series[tuple(sorted(labels))] = value
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for name, value in self.counters.items():
+                lines.append(f"# HELP {name} {COUNTERS.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name} {value}")
+            for name, h in self.histograms.items():
+                lines.append(f"# HELP {name} {HISTOGRAMS.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+                cumulative += h[len(BUCKETS)]
+                lines.append(f'{name}_bucket{{le="+Inf"}} {cumulative}')
+                lines.append(f"{name}_sum {h[-1]}")
+                lines.append(f"{name}_count {cumulative}")
+            for name, series in self.gauges.items():
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in sorted(series.items()):
+                    labels = ",".join(f'{k}="{v}"' for k, v in key)
+                    lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+    """Serve `registry` at http://host:port/metrics from a daemon thread."""
+    # Imported here so workers, which only record, do not load http.server.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
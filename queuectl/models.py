@@ -1,10 +1,8 @@
 # queuectl/models.py
-from dataclasses import dataclass, asdict
-from typing import Optional
+from typing import NamedTuple, Optional
 import datetime
 
-@dataclass
-class Job:
+class Job(NamedTuple):
     """
     Represents a background job record.
     Mirrors the structure of the 'jobs' table.
@@ -19,15 +17,59 @@ class Job:
     next_attempt_at: Optional[str] = None
     last_error: Optional[str] = None
     output: Optional[str] = None
+    priority: int = 0
+    queue: str = "default"
+    backoff: Optional[str] = None
+    callable: Optional[str] = None
+    args: Optional[str] = None
+    timeout: Optional[float] = None
+    deps_remaining: int = 0
+    idempotency_key: Optional[str] = None
+    cache_ttl: Optional[float] = None
+    inputs: Optional[str] = None
 
     def to_dict(self):
-        return asdict(self)
+        return self._asdict()
 
     @staticmethod
     def from_row(row):
         """Convert a DB row (tuple) into a Job instance."""
         keys = [
             "id", "command", "state", "attempts", "max_retries",
-            "created_at", "updated_at", "next_attempt_at", "last_error", "output"
+            "created_at", "updated_at", "next_attempt_at", "last_error", "output",
+            "priority", "queue", "backoff", "callable", "args", "timeout", "deps_remaining",
+            "idempotency_key", "cache_ttl", "inputs"
         ]
         return Job(**dict(zip(keys, row)))
+
+
+class ClaimedJob(NamedTuple):
+    """A job as handed to a worker by a claim."""
+    id: str
+    command: str
+    attempts: int
+    max_retries: int
+    ready_at: str   # when the job became claimable (created, or retry due)
+    backoff: Optional[str] = None   # per-job retry policy spec, if any
+    callable: Optional[str] = None  # "pkg.module:func" for Python callable jobs
+    args: Optional[str] = None      # the callable's arguments, JSON-encoded
+    timeout: Optional[float] = None # per-job timeout in seconds
+    cache_ttl: Optional[float] = None  # result cache TTL; 0 = default, None = not cached
+    inputs: Optional[str] = None    # files in the cache key, JSON-encoded list
+
+
+class QueueLimit(NamedTuple):
+    """Throttles for one queue; None means unlimited."""
+    rate: Optional[float] = None          # jobs started per second (token bucket)
+    burst: Optional[float] = None         # bucket size; defaults to max(1, rate)
+    concurrency: Optional[int] = None     # max jobs 'processing' at once
+
+
+class JobOutcome(NamedTuple):
+    """The result of one attempt, as a worker reports it to a backend."""
+    id: str
+    state: str                            # 'completed', 'failed' (will retry) or 'dead'
+    attempts: int                         # attempts including this one
+    output: Optional[str] = None
+    error: Optional[str] = None
+    next_attempt_at: Optional[str] = None # when a failed job may run again
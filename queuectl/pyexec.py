@@ -0,0 +1,224 @@
+# queuectl/pyexec.py
+
+"""
+Python callable executor
+------------------------
+Runs `{"callable": "pkg.module:func", "args": ...}` jobs in warm, long-lived
+child processes instead of a shell and a fresh interpreter per job.
+
+- Children are started from a forkserver (spawn on platforms without one)
+  that has already imported the modules listed in `pyexec.preload`, so a
+  new child starts warm and forking it is safe in a threaded worker.
+- Each child runs one job at a time; the pool holds one child per slot of
+  worker concurrency.
+- A job that exceeds its timeout gets its child killed and replaced.
+- A child is recycled after `max_jobs` jobs, or as soon as its resident
+  memory passes `max_memory_mb`, so leaks in job code cannot pile up.
+
+A callable's return value, if not None, is written to stdout as JSON.
+Output printed from Python is captured (bounded, like shell output);
+output written straight to file descriptor 1/2 by C code is not.
+"""
+
+import importlib
+import json
+import os
+import queue
+import sys
+import threading
+from typing import Optional, Tuple
+
+from queuectl.executor import BoundedCapture, DEFAULT_MAX_OUTPUT
+
+DEFAULT_MAX_JOBS = 1000
+DEFAULT_MAX_MEMORY_MB = 512
+
+
+def parse_target(target: str):
+    """Split "pkg.module:func" into ("pkg.module", "func"). Raises ValueError."""
+    module, sep, attr = target.partition(":")
+    if not sep or not module.strip() or not attr.strip():
+        raise ValueError(f"callable must look like 'pkg.module:function', not {target!r}")
+    return module.strip(), attr.strip()
+
+
+def _resolve(target: str):
+    module, attr = parse_target(target)
+    obj = importlib.import_module(module)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _call(func, args):
+    if args is None:
+        return func()
+    if isinstance(args, list):
+        return func(*args)
+    if isinstance(args, dict):
+        return func(**args)
+    return func(args)
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak rather than current, but good enough to catch runaway growth.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return 0
+
+
+class _TextCapture:
+    """File-like stdout/stderr replacement feeding a BoundedCapture."""
+
+    def __init__(self, limit: int):
+        self.capture = BoundedCapture(limit)
+
+    def write(self, text: str):
+        self.capture.write(text.encode("utf-8", errors="replace"))
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _child_main(conn, preload, max_output):
+    for module in preload:
+        importlib.import_module(module)
+    funcs = {}
+    real_out, real_err = sys.stdout, sys.stderr
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if message is None:
+            return
+        target, args_json = message
+        out, err = _TextCapture(max_output), _TextCapture(max_output)
+        sys.stdout, sys.stderr = out, err
+        code = 0
+        try:
+            func = funcs.get(target)
+            if func is None:
+                func = funcs[target] = _resolve(target)
+            result = _call(func, json.loads(args_json) if args_json else None)
+            if result is not None:
+                print(json.dumps(result, default=repr))
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout, sys.stderr = real_out, real_err
+        conn.send((code, out.capture.getvalue().strip(), err.capture.getvalue().strip(), _rss_bytes()))
+
+
+class _Child:
+    def __init__(self, ctx, preload, max_output):
+        self.conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(target=_child_main, args=(child_conn, preload, max_output), daemon=True)
+        self.proc.start()
+        child_conn.close()
+        self.jobs = 0
+        self.rss = 0
+
+    def run(self, target: str, args_json: Optional[str], timeout: float):
+        """(code, stdout, stderr), or "timeout" / "died"."""
+        try:
+            self.conn.send((target, args_json))
+            if not self.conn.poll(timeout):
+                return "timeout"
+            code, out, err, self.rss = self.conn.recv()
+        except (EOFError, OSError):
+            return "died"
+        self.jobs += 1
+        return code, out, err
+
+    def stop(self, kill: bool = False):
+        if not kill:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.proc.join(timeout=1)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        self.conn.close()
+
+
+class PythonPool:
+    """A fixed number of warm child processes running Python callables."""
+
+    def __init__(self, size: int = 1, preload=(), max_jobs: int = DEFAULT_MAX_JOBS,
+                 max_memory_mb: float = DEFAULT_MAX_MEMORY_MB,
+                 max_output: int = DEFAULT_MAX_OUTPUT):
+        # Imported here: `enqueue` and the worker load this module without
+        # ever starting a pool, and multiprocessing is slow to import.
+        import multiprocessing
+
+        methods = multiprocessing.get_all_start_methods()
+        self.ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self.preload = [m for m in preload if m]
+        if "forkserver" in methods:
+            # Import this module in the server too, so children start with
+            # nothing left to import but the jobs' own modules.
+            self.ctx.set_forkserver_preload(["queuectl.pyexec"] + self.preload)
+        self.max_jobs = max_jobs
+        self.max_memory = max_memory_mb * 1024 * 1024
+        self.max_output = max_output
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.children = []
+        self.recycled = 0
+        for _ in range(max(1, size)):
+            self.idle.put(self._spawn())
+
+    def _spawn(self) -> _Child:
+        child = _Child(self.ctx, self.preload, self.max_output)
+        with self.lock:
+            self.children.append(child)
+        return child
+
+    def _retire(self, child: _Child, kill: bool = False):
+        child.stop(kill=kill)
+        with self.lock:
+            self.children.remove(child)
+            self.recycled += 1
+
+    def run(self, target: str, args_json: Optional[str] = None,
+            timeout: float = 3600) -> Tuple[int, str, str]:
+        """Run `target` with JSON-encoded `args` in a warm child; same result shape as execute_command."""
+        child = self.idle.get()
+        try:
+            result = child.run(target, args_json, timeout)
+            if isinstance(result, str):
+                self._retire(child, kill=True)
+                exitcode = child.proc.exitcode
+                child = self._spawn()
+                if result == "died":
+                    return 1, "", f"Callable worker process died (exit code {exitcode})"
+                return 1, "", f"Command timed out after {timeout} seconds"
+            if child.jobs >= self.max_jobs or (self.max_memory and child.rss > self.max_memory):
+                self._retire(child)
+                child = self._spawn()
+            return result
+        finally:
+            self.idle.put(child)
+
+    def close(self):
+        with self.lock:
+            children = list(self.children)
+        for child in children:
+            child.stop()
+        with self.lock:
+            self.children.clear()
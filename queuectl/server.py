@@ -0,0 +1,303 @@
+# queuectl/server.py
+
+"""
+Enqueue Server
+--------------
+`queuectl serve` keeps one backend open and accepts jobs over localhost
+HTTP or a Unix socket, so producers skip the interpreter start, argument
+parsing and database connect that every `queuectl enqueue` pays.
+
+Endpoints (JSON in, JSON out):
+- POST /jobs            a job object or a list of jobs
+                        -> {"ids": [...], "inserted": n, "skipped": n}
+- GET  /jobs            ?state=&queue=&since=&after=&limit= (default 100)
+                        -> {"jobs": [...]}
+- GET  /jobs/<id>       -> the job, or 404
+- GET  /status          ?by_queue=1 -> {"counts": {...}} or {"counts": [[queue, state, n], ...]}
+- GET  /health          -> {"ok": true, "commits": n, "enqueued": n}
+
+Jobs are validated like the CLI's (jobs.prepare_job). Enqueues from
+concurrent requests are group-committed: one writer thread takes every
+request waiting when it becomes free (plus any arriving within
+`group_wait` seconds) and inserts them in one transaction, so N
+concurrent producers cost one commit instead of N. Reads use a second
+handle and never wait for a commit.
+
+On the log backend, whose store belongs to a worker, the server is a
+producer like `queuectl enqueue`: each group commit becomes one inbox
+file for the owner, and every read replays the log from disk.
+
+queuectl/client.py is the matching client library.
+"""
+
+import contextlib
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from queuectl.backends import BackendError, QueueBackend, open_backend
+from queuectl.db.repo import LIST_COLUMNS
+from queuectl.jobs import prepare_job
+from queuectl.wakeup import notify
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Jobs per group commit, at most, and jobs returned by one GET /jobs.
+MAX_GROUP_JOBS = 10000
+MAX_LIST_LIMIT = 10000
+DEFAULT_LIST_LIMIT = 100
+
+
+class _Pending:
+    """One request's jobs, waiting for the writer."""
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class GroupCommitter:
+    """A writer thread that inserts the jobs of queued requests together."""
+
+    def __init__(self, backend: QueueBackend, group_wait: float = 0.0, max_jobs: int = MAX_GROUP_JOBS):
+        self.backend = backend
+        self.group_wait = group_wait
+        self.max_jobs = max_jobs
+        self.commits = 0
+        self.enqueued = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, jobs):
+        """Enqueue `jobs` with whatever else is waiting. Returns (inserted, skipped)."""
+        pending = _Pending(jobs)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error:
+            raise pending.error
+        return pending.result
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _gather(self, first):
+        group, size = [first], len(first.jobs)
+        deadline = time.monotonic() + self.group_wait
+        while size < self.max_jobs:
+            try:
+                wait = deadline - time.monotonic()
+                item = self._queue.get(timeout=wait) if wait > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            group.append(item)
+            size += len(item.jobs)
+        return group
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            group = self._gather(first)
+            try:
+                results = self.backend.enqueue_groups([p.jobs for p in group])
+                self.commits += 1
+            except Exception:
+                # Do not let one bad request fail the others: retry each alone.
+                results = []
+                for pending in group:
+                    try:
+                        results.append(self.backend.enqueue_groups([pending.jobs])[0])
+                        self.commits += 1
+                    except Exception as e:
+                        pending.error = e
+                        results.append(None)
+            for pending, result in zip(group, results):
+                pending.result = result
+                if result:
+                    self.enqueued += result[0]
+            if any(result and result[0] for result in results):
+                notify()
+            for pending in group:
+                pending.done.set()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, so clients reuse one connection
+    server_version = "queuectl"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, code: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, code: int, message: str):
+        self._send(code, {"error": message})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/jobs":
+            self._error(404, "not found")
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            data = json.loads(body)
+            jobs = [prepare_job(job) for job in (data if isinstance(data, list) else [data])]
+        except json.JSONDecodeError:
+            self._error(400, "invalid JSON")
+            return
+        except ValueError as e:
+            self._error(400, str(e))
+            return
+        try:
+            inserted, skipped = self.server.committer.submit(jobs)
+        except ValueError as e:
+            self._error(400, str(e))
+            return
+        except Exception as e:
+            self._error(500, str(e))
+            return
+        self._send(200, {"ids": [job["id"] for job in jobs], "inserted": inserted, "skipped": skipped})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == "/health":
+                committer = self.server.committer
+                self._send(200, {"ok": True, "commits": committer.commits, "enqueued": committer.enqueued})
+            elif url.path == "/status":
+                self._send(200, {"counts": self.server.status(params.get("by_queue") in ("1", "true"))})
+            elif url.path == "/jobs":
+                limit = min(int(params.get("limit", DEFAULT_LIST_LIMIT)), MAX_LIST_LIMIT)
+                self._send(200, {"jobs": self.server.list_jobs(params.get("state"), params.get("queue"),
+                                                               params.get("since"), params.get("after"), limit)})
+            elif url.path.startswith("/jobs/"):
+                job = self.server.get_job(unquote(url.path[len("/jobs/"):]))
+                if job is None:
+                    self._error(404, "no such job")
+                else:
+                    self._send(200, job)
+            else:
+                self._error(404, "not found")
+        except ValueError as e:
+            self._error(400, str(e))
+
+
+class _ServerMixin:
+    """Shared state of the TCP and Unix servers: the writer and a read handle."""
+    daemon_threads = True
+
+    def setup_backend(self, backend: QueueBackend, group_wait: float):
+        self.backend = backend
+        self.committer = GroupCommitter(backend, group_wait)
+        self.reader = backend.for_thread() if backend.shared else None
+        self._read_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _reading(self):
+        if self.reader is not None:
+            with self._read_lock:
+                yield self.reader
+            return
+        # A store another process owns: read a fresh snapshot of it.
+        reader = self.backend.for_thread()
+        try:
+            yield reader
+        finally:
+            reader.close()
+
+    def status(self, by_queue: bool):
+        with self._reading() as reader:
+            counts = reader.stats(by_queue=by_queue)
+        if by_queue:
+            return [[q, state, n] for (q, state), n in sorted(counts.items())]
+        return counts
+
+    def list_jobs(self, state, queue_name, since, after, limit):
+        with self._reading() as reader:
+            rows = list(reader.list(state=state, queue=queue_name, since=since, after=after, limit=limit))
+        return [dict(zip(LIST_COLUMNS, row)) for row in rows]
+
+    def get_job(self, job_id: str):
+        with self._reading() as reader:
+            return reader.get(job_id)
+
+    def close_backend(self):
+        self.committer.stop()
+        if self.reader not in (None, self.backend):
+            self.reader.close()
+        self.backend.close()
+
+
+class EnqueueServer(_ServerMixin, ThreadingHTTPServer):
+    pass
+
+
+class UnixEnqueueServer(_ServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None,
+                group_wait: float = 0.0, backend: QueueBackend = None):
+    """Bind a server (TCP, or a Unix socket if `socket_path` is given) on `backend`."""
+    backend = backend or open_backend(intake=True)
+    if not backend.shared and not getattr(backend, "readonly", False):
+        backend.close()
+        raise BackendError(f"this {backend.name} store is owned by this process; "
+                           f"serve needs a shared or read-only (intake) handle")
+    if socket_path:
+        if os.path.exists(socket_path):
+            # A socket left behind by a server that died; refuse a live one.
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+                raise OSError(f"{socket_path} is in use by another server")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(socket_path)
+            finally:
+                probe.close()
+        server = UnixEnqueueServer(socket_path, _Handler)
+    else:
+        server = EnqueueServer((host, port), _Handler)
+    server.setup_backend(backend, group_wait)
+    return server
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None,
+          group_wait: float = 0.0):
+    """Run the server until SIGINT/SIGTERM."""
+    server = make_server(host, port, socket_path, group_wait)
+    where = f"unix:{socket_path}" if socket_path else f"http://{host}:{port}"
+    print(f"Server: listening on {where} (pid {os.getpid()})")
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.close_backend()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print("Server: stopped")
@@ -1,15 +1,41 @@
 # queuectl/utils.py
-from datetime import datetime, UTC
-import uuid
+from datetime import datetime, timedelta, UTC
+from typing import NamedTuple, Optional
+import os
 import math
+import random
 
 def utcnow_iso() -> str:
     """Return current UTC time in ISO8601 with 'Z' suffix."""
     return datetime.now(UTC).isoformat()
 
+def parse_run_at(value) -> str:
+    """
+    Normalise an ISO8601 timestamp to the UTC form used for next_attempt_at.
+    Timestamps without an offset are taken as UTC. Raises ValueError.
+    """
+    if not isinstance(value, str):
+        raise ValueError("'run_at' must be an ISO8601 timestamp string.")
+    try:
+        when = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"'run_at' is not an ISO8601 timestamp: {value!r}") from None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return when.astimezone(UTC).isoformat()
+
+def delay_until(seconds: float) -> str:
+    """The next_attempt_at timestamp `seconds` from now."""
+    return (datetime.now(UTC) + timedelta(seconds=seconds)).isoformat()
+
 def generate_id() -> str:
-    """Generate a unique job ID."""
-    return str(uuid.uuid4())
+    """
+    Generate a unique job ID (a random version 4 UUID string).
+    Formatted by hand: several times faster than str(uuid.uuid4()),
+    which matters when bulk-enqueueing.
+    """
+    h = os.urandom(16).hex()
+    return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}"
 
 def compute_backoff(base: int, attempts: int) -> int:
     """
@@ -18,6 +44,96 @@ def compute_backoff(base: int, attempts: int) -> int:
     """
     return int(math.pow(base, attempts))
 
+BACKOFF_KINDS = ("exponential", "linear", "fixed")
+BACKOFF_JITTERS = ("none", "full", "equal", "decorrelated")
+
+# Longest delay any policy returns (a year), so uncapped growth stays representable.
+MAX_BACKOFF = 365 * 86400.0
+
+
+class BackoffPolicy(NamedTuple):
+    """
+    Retry delay policy.
+
+    - exponential: base ** attempts (the default; base=2 gives 2s, 4s, 8s, ...)
+    - linear:      base + step * (attempts - 1)
+    - fixed:       base every time
+    - cap:         upper bound on any delay, in seconds
+    - jitter:      "full" picks uniformly in [0, delay], "equal" in
+                   [delay/2, delay], "decorrelated" in [base, 3 * previous
+                   delay]. Jobs that failed together then retry spread out
+                   instead of in lockstep.
+
+    Decorrelated jitter normally feeds back the previous *random* delay; the
+    previous delay is not stored with the job, so it uses the un-jittered
+    delay of the previous attempt instead.
+    """
+    kind: str = "exponential"
+    base: float = 2.0
+    step: Optional[float] = None
+    cap: Optional[float] = None
+    jitter: str = "none"
+
+    def raw_delay(self, attempts: int) -> float:
+        attempts = max(1, attempts)
+        if self.kind == "fixed":
+            delay = self.base
+        elif self.kind == "linear":
+            delay = self.base + (self.base if self.step is None else self.step) * (attempts - 1)
+        else:
+            try:
+                delay = math.pow(self.base, attempts)
+            except OverflowError:
+                delay = MAX_BACKOFF
+        return min(delay, MAX_BACKOFF if self.cap is None else self.cap)
+
+    def delay(self, attempts: int, rng=random) -> float:
+        """Seconds to wait before retry number `attempts` (1 = first retry)."""
+        delay = self.raw_delay(attempts)
+        if self.jitter == "full":
+            delay = rng.uniform(0, delay)
+        elif self.jitter == "equal":
+            delay = delay / 2 + rng.uniform(0, delay / 2)
+        elif self.jitter == "decorrelated":
+            previous = self.raw_delay(attempts - 1) if attempts > 1 else self.base
+            delay = rng.uniform(min(self.base, previous * 3), previous * 3)
+            if self.cap is not None:
+                delay = min(delay, self.cap)
+        return delay
+
+
+def parse_backoff(spec: str, base: float = 2.0) -> BackoffPolicy:
+    """
+    Parse a policy spec such as "exponential:base=2,cap=600,jitter=full",
+    "linear:base=5,step=10" or "fixed:base=30". `base` is used when the
+    spec does not give one. Raises ValueError.
+    """
+    kind, _, params = spec.strip().partition(":")
+    kind = kind.strip() or "exponential"
+    if kind not in BACKOFF_KINDS:
+        raise ValueError(f"Unknown backoff policy '{kind}' (choose from {', '.join(BACKOFF_KINDS)})")
+    fields = {"kind": kind, "base": float(base)}
+    for part in params.split(","):
+        if not part.strip():
+            continue
+        key, _, value = part.partition("=")
+        key = key.strip()
+        if key == "jitter":
+            if value.strip() not in BACKOFF_JITTERS:
+                raise ValueError(f"Unknown jitter '{value.strip()}' (choose from {', '.join(BACKOFF_JITTERS)})")
+            fields["jitter"] = value.strip()
+        elif key in ("base", "step", "cap"):
+            try:
+                fields[key] = float(value)
+            except ValueError:
+                raise ValueError(f"Backoff {key} must be a number: {part}") from None
+            if fields[key] < 0:
+                raise ValueError(f"Backoff {key} must not be negative: {part}")
+        else:
+            raise ValueError(f"Unknown backoff parameter '{key}'")
+    return BackoffPolicy(**fields)
+
+
 def pretty_time() -> str:
     """Return local readable timestamp for logs."""
     return datetime.now().strftime("[%H:%M:%S]")
@@ -0,0 +1,198 @@
+# queuectl/wakeup.py
+
+"""
+Wakeup Channel
+--------------
+Lets idle workers sleep until there is something to do instead of polling
+the database once per second.
+
+- The worker manager binds a Unix datagram socket next to the backend's
+  database file or log directory (`<db>-wakeup`) and hands each worker
+  one end of a socketpair.
+- Anything that makes a job claimable (enqueue, DLQ retry, ...) calls
+  `notify()`, which sends a one-byte datagram to the manager socket.
+- The manager forwards the wakeup to every worker, which then re-checks
+  the database.
+- Workers also send metrics deltas back to the manager over their end of
+  the socketpair (see queuectl.metrics).
+
+Notifications are best-effort: if no manager is listening, or the platform
+has no Unix sockets, workers fall back to a bounded sleep and still pick the
+job up, just later. Set QUEUECTL_WAKEUP=off to disable the channel.
+"""
+
+import os
+import select
+import socket
+import time
+
+# Longest a worker sleeps without a wakeup channel (the original poll interval).
+POLL_INTERVAL = 1.0
+
+# Longest a worker sleeps with a wakeup channel, as a safety net for jobs
+# added by something that does not notify (e.g. direct SQL).
+MAX_IDLE = 30.0
+
+
+def enabled() -> bool:
+    return hasattr(socket, "AF_UNIX") and \
+        os.environ.get("QUEUECTL_WAKEUP", "on").lower() not in ("0", "off", "false", "no")
+
+
+def wakeup_path(db_path: str = None) -> str:
+    """`<db>-wakeup`, for `db_path` or else the configured backend's store."""
+    if db_path is None:
+        from queuectl.backends import store_path
+        db_path = store_path()
+    return db_path + "-wakeup"
+
+
+def notify(db_path: str = None):
+    """Tell the manager (if any) that jobs became claimable."""
+    if not enabled():
+        return
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.setblocking(False)
+        sock.sendto(b"w", wakeup_path(db_path))
+    except OSError:
+        # Nobody listening, or the manager's buffer already holds a wakeup.
+        pass
+    finally:
+        sock.close()
+
+
+def _drain(sock: socket.socket):
+    try:
+        while sock.recv(64):
+            pass
+    except (BlockingIOError, InterruptedError):
+        pass
+
+
+class WakeupListener:
+    """Manager side: receives notifications and fans them out to workers."""
+
+    def __init__(self, db_path: str = None, on_message=None):
+        self.path = wakeup_path(db_path)
+        self.on_message = on_message
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+        self.workers = []
+
+    def add_worker(self) -> socket.socket:
+        """Create a channel for a new worker; returns the end to pass to it."""
+        ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        ours.setblocking(False)
+        self.workers.append(ours)
+        return theirs
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Wait up to `timeout` for a notification and forward it to every
+        worker. Messages arriving from workers are passed to `on_message`.
+        """
+        try:
+            ready, _, _ = select.select([self.sock] + self.workers, [], [], timeout)
+        except (InterruptedError, ValueError):
+            return False
+        for ch in ready:
+            if ch is not self.sock:
+                self._receive(ch)
+        if self.sock not in ready:
+            return False
+        _drain(self.sock)
+        for ch in self.workers:
+            try:
+                ch.send(b"w")
+            except OSError:
+                # Worker gone, or a wakeup is already queued for it.
+                pass
+        return True
+
+    def _receive(self, ch: socket.socket):
+        try:
+            while True:
+                msg = ch.recv(65536)
+                if not msg:
+                    # Worker exited; stop watching its channel.
+                    self.workers.remove(ch)
+                    ch.close()
+                    return
+                if self.on_message:
+                    self.on_message(msg)
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self.workers.remove(ch)
+            ch.close()
+
+    def close(self):
+        for ch in self.workers:
+            ch.close()
+        self.sock.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class WakeupWaiter:
+    """
+    Worker side: sleeps until woken by the manager, interrupted (by a signal
+    handler or a finished job), or until the timeout elapses.
+    """
+
+    def __init__(self, fd: int = None):
+        self.sock = None
+        self._r = self._w = None
+        if fd is not None:
+            self.sock = socket.socket(fileno=fd)
+            self.sock.setblocking(False)
+        if os.name == "posix":
+            # Self-pipe so a signal handler or another thread can cut a wait short.
+            self._r, self._w = os.pipe()
+            os.set_blocking(self._r, False)
+            os.set_blocking(self._w, False)
+
+    def wait(self, timeout: float):
+        timeout = min(max(0.0, timeout), MAX_IDLE if self.sock is not None else POLL_INTERVAL)
+        if self._r is None:
+            time.sleep(timeout)
+            return
+        watched = [self._r] if self.sock is None else [self.sock, self._r]
+        ready, _, _ = select.select(watched, [], [], timeout)
+        if self.sock in ready:
+            _drain(self.sock)
+        if self._r in ready:
+            try:
+                while os.read(self._r, 64):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def send(self, data: bytes):
+        """Send a message to the manager, if there is a channel to it."""
+        if self.sock is not None:
+            self.sock.send(data)
+
+    @property
+    def connected(self) -> bool:
+        return self.sock is not None
+
+    def interrupt(self):
+        """Wake a pending (or the next) wait(); safe from signal handlers and threads."""
+        if self._w is None:
+            return
+        try:
+            os.write(self._w, b"x")
+        except OSError:
+            pass
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+        if self._r is not None:
+            os.close(self._r)
+            os.close(self._w)
@@ -5,68 +5,345 @@ Worker Manager (subprocess-based)
 --------------------------------
 Spawns independent python processes for workers using subprocess.Popen.
 This avoids Windows multiprocessing pickling issues and is cross-platform.
+
+With `min_workers` < `max_workers` the manager autoscales: every
+SCALE_INTERVAL it reads the ready-queue depth and the age of the oldest
+ready job (counters and index probes, see repo.ready_stats), counting only
+the queues its workers serve that may start a job now (not throttled by a
+rate limit or at their concurrency cap; see backlog()), adds workers
+while there is a backlog or jobs wait longer than the target latency, and
+drains one worker at a time once the queue has been empty for a while.
+Workers that die unexpectedly are respawned, with exponential backoff if
+they keep crashing.
+
+Every SCHEDULE_INTERVAL the manager also turns due cron schedules into jobs
+(see repo.fire_due_schedules).
+
+The manager talks to storage through the configured QueueBackend. A
+backend that a single process owns (the log engine) gets exactly one
+worker and no manager-side housekeeping: that worker holds the store.
 """
 
+import math
 import os
 import signal
 import subprocess
 import sys
 import time
-from typing import List
+from typing import Dict, List
+
+# Seconds between sweeps for expired job leases.
+REAP_INTERVAL = 5
+
+# Seconds between refreshes of the queue depth gauge.
+DEPTH_INTERVAL = 5
+
+# Seconds between checks for due cron schedules, and schedules fired per transaction.
+SCHEDULE_INTERVAL = 1
+SCHEDULE_BATCH = 500
+
+# Autoscaling: seconds between scaling decisions, default seconds the oldest
+# ready job may wait before more workers are added, and seconds the queue
+# must stay empty before a worker is drained.
+SCALE_INTERVAL = 2
+DEFAULT_TARGET_LATENCY = 5.0
+DEFAULT_IDLE_SECONDS = 30.0
+
+# Crash-loop backoff for respawns: first delay, cap, and how long a worker
+# must have lived for its exit not to count as part of a crash loop.
+RESPAWN_DELAY = 1.0
+MAX_RESPAWN_DELAY = 60.0
+HEALTHY_UPTIME = 30.0
 
 from queuectl.pidfile import write_pidfile, remove_pidfile
-from queuectl.db.repo import connect
+from queuectl.backends import backend_spec, open_backend
+from queuectl.archive import Archiver
+from queuectl import wakeup
+from queuectl.metrics import MetricsRegistry, serve_metrics
+from queuectl.worker.scheduling import parse_queue_weights
 
 
 
 class WorkerManager:
-    def __init__(self, worker_count: int = 1, pidfile: str = "queuectl_worker.pid"):
+    def __init__(self, worker_count: int = 1, pidfile: str = "queuectl_worker.pid",
+                 batch_size: int = 1, concurrency: int = 1, queues: str = None,
+                 metrics_port: int = None, archive_interval: float = None,
+                 min_workers: int = None, max_workers: int = None):
         self.worker_count = worker_count
+        self.min_workers = worker_count if min_workers is None else min_workers
+        self.max_workers = max(self.min_workers, worker_count if max_workers is None else max_workers)
+        self.worker_count = min(max(worker_count, self.min_workers), self.max_workers)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.queues = queues
+        self.metrics_port = metrics_port
+        self.archive_interval = archive_interval
+        self._archiver = None
+        self.metrics = MetricsRegistry()
+        self._metrics_server = None
+        self._last_depth = 0.0
         self.pidfile = pidfile
         self.children: List[subprocess.Popen] = []
+        self._next_id = 1
+        self._started: Dict[subprocess.Popen, float] = {}
+        self._draining = set()
+        self._crashes = 0
+        self._respawn_at = 0.0
+        self._last_scale = 0.0
+        self._idle_since = None
         self._stopping = False
+        self.wakeup = None
+        self.backend = None
+        self._last_reap = 0.0
+        self._last_schedule = 0.0
 
     def _signal_handler(self, signum, frame):
         print("Manager: termination signal received")
         self._stopping = True
 
+    def reap(self):
+        """Requeue jobs whose worker stopped renewing their lease."""
+        self._last_reap = time.monotonic()
+        try:
+            requeued, dead = self.backend.reap_expired()
+        except Exception as e:
+            print(f"Manager: lease reaper failed: {e}")
+            return
+        if requeued or dead:
+            print(f"Manager: recovered {requeued} job(s) with expired leases ({dead} moved to DLQ)")
+            if requeued:
+                wakeup.notify()
+
+    def fire_schedules(self):
+        """Enqueue the jobs of every cron schedule that is due."""
+        self._last_schedule = time.monotonic()
+        fired = 0
+        try:
+            while True:
+                batch = self.backend.fire_schedules(SCHEDULE_BATCH)
+                fired += batch
+                if batch < SCHEDULE_BATCH:
+                    break
+        except Exception as e:
+            print(f"Manager: scheduler failed: {e}")
+        if fired:
+            print(f"Manager: fired {fired} schedule(s)")
+            wakeup.notify()
+
+    def refresh_depth(self):
+        """Update the per-state queue depth gauge (on a timer, never per scrape)."""
+        self._last_depth = time.monotonic()
+        # stats() leaves out zero counts, so emptied (queue, state) series are
+        # zeroed here instead of sticking at their last non-zero value.
+        self.metrics.set_gauges("queuectl_jobs", {
+            (("queue", queue), ("state", state)): count
+            for (queue, state), count in self.backend.stats(by_queue=True).items()
+        })
+        self.metrics.set_gauge("queuectl_workers", {}, len(self.active_workers()))
+
     def start(self):
-        # Safety cleanup: reset any jobs stuck in 'processing' to 'failed'
-        conn = connect()
-        cur = conn.cursor()
-        cur.execute("UPDATE jobs SET state='failed' WHERE state='processing'")
-        conn.commit()
-        conn.close()
-        print(f"Manager: starting {self.worker_count} workers (pid {os.getpid()})")
+        backend_cls, _ = backend_spec()
+        if backend_cls.shared:
+            # Recover jobs left 'processing' by workers that are gone. Only expired
+            # leases are touched, so jobs held by another live manager are safe.
+            self.backend = open_backend()
+            self.reap()
+        else:
+            if self.max_workers > 1:
+                print(f"Manager: the {backend_cls.name} backend is owned by one process; starting 1 worker")
+            self.worker_count = self.min_workers = self.max_workers = 1
+        bounds = f", autoscaling {self.min_workers}-{self.max_workers}" if self.autoscaling else ""
+        print(f"Manager: starting {self.worker_count} workers (pid {os.getpid()}{bounds})")
         write_pidfile(self.pidfile, os.getpid())
 
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
 
-        python = sys.executable
-        module = "queuectl.worker.worker_proc"
+        if wakeup.enabled():
+            try:
+                self.wakeup = wakeup.WakeupListener(on_message=self.metrics.merge)
+            except OSError as e:
+                print(f"Manager: wakeup channel unavailable ({e}); workers will poll")
+
+        if self.metrics_port:
+            if not self.wakeup:
+                print("Manager: metrics need the wakeup channel; worker metrics will be missing")
+            self._metrics_server = serve_metrics(self.metrics, self.metrics_port)
+            print(f"Manager: metrics at http://127.0.0.1:{self.metrics_port}/metrics")
 
-        # Spawn worker processes
-        for i in range(self.worker_count):
-            args = [python, "-m", module, "--worker-id", str(i + 1)]
-            # subprocess.Popen will start independent processes
-            p = subprocess.Popen(args, stdout=sys.stdout, stderr=sys.stderr)
-            self.children.append(p)
-            print(f"Manager: spawned worker pid={p.pid}")
+        interval = self.archive_interval
+        if interval is None and self.backend:
+            interval = float(self.backend.get_setting("archive.interval", "QUEUECTL_ARCHIVE_INTERVAL", 0))
+        if interval and self.backend and hasattr(self.backend, "connections"):
+            self._archiver = Archiver(interval, self.backend)
+            self._archiver.start()
+
+        for _ in range(self.worker_count):
+            self.spawn_worker()
 
         try:
             while not self._stopping:
-                # If all children exited, break
-                if not any(p.poll() is None for p in self.children):
-                    break
-                time.sleep(1)
+                if self.wakeup:
+                    self.wakeup.wait(1)
+                else:
+                    time.sleep(1)
+                self.check_children()
+                if not self.backend:
+                    continue
+                if time.monotonic() - self._last_reap >= REAP_INTERVAL:
+                    self.reap()
+                if time.monotonic() - self._last_schedule >= SCHEDULE_INTERVAL:
+                    self.fire_schedules()
+                if self.autoscaling and time.monotonic() - self._last_scale >= SCALE_INTERVAL:
+                    self.autoscale()
+                if self._metrics_server and time.monotonic() - self._last_depth >= DEPTH_INTERVAL:
+                    self.refresh_depth()
         except KeyboardInterrupt:
             self._stopping = True
         finally:
             self.stop_children()
+            if self._archiver:
+                self._archiver.stop()
+            if self.wakeup:
+                self.wakeup.close()
+            if self._metrics_server:
+                self._metrics_server.shutdown()
+            if self.backend:
+                self.backend.close()
             remove_pidfile(self.pidfile)
             print("Manager: stopped")
 
+    @property
+    def autoscaling(self) -> bool:
+        return self.max_workers > self.min_workers
+
+    def active_workers(self) -> List[subprocess.Popen]:
+        """Running workers that are not being drained."""
+        return [p for p in self.children if p.poll() is None and p not in self._draining]
+
+    def spawn_worker(self):
+        worker_id = self._next_id
+        self._next_id += 1
+        args = [sys.executable, "-m", "queuectl.worker.worker_proc", "--worker-id", str(worker_id),
+                "--batch-size", str(self.batch_size),
+                "--concurrency", str(self.concurrency)]
+        if self.queues:
+            args += ["--queues", self.queues]
+        pass_fds = ()
+        channel = None
+        if self.wakeup:
+            channel = self.wakeup.add_worker()
+            args += ["--wakeup-fd", str(channel.fileno())]
+            pass_fds = (channel.fileno(),)
+        # subprocess.Popen will start independent processes
+        p = subprocess.Popen(args, stdout=sys.stdout, stderr=sys.stderr, pass_fds=pass_fds)
+        if channel:
+            channel.close()
+        self.children.append(p)
+        self._started[p] = time.monotonic()
+        print(f"Manager: spawned worker pid={p.pid}")
+
+    def drain_worker(self):
+        """Ask the newest active worker to finish its current jobs and exit."""
+        active = self.active_workers()
+        if not active:
+            return
+        p = active[-1]
+        self._draining.add(p)
+        print(f"Manager: draining idle worker pid={p.pid}")
+        try:
+            p.terminate()
+        except Exception:
+            pass
+
+    def check_children(self):
+        """Forget exited workers; respawn crashed ones, backing off on crash loops."""
+        if self._stopping:
+            return
+        now = time.monotonic()
+        for p in [p for p in self.children if p.poll() is not None]:
+            self.children.remove(p)
+            started = self._started.pop(p, now)
+            if p in self._draining:
+                self._draining.discard(p)
+                continue
+            if now - started >= HEALTHY_UPTIME:
+                self._crashes = 0
+            self._crashes += 1
+            delay = min(MAX_RESPAWN_DELAY, RESPAWN_DELAY * 2 ** (self._crashes - 1))
+            self._respawn_at = max(self._respawn_at, now + delay)
+            print(f"Manager: worker pid={p.pid} exited unexpectedly (code {p.returncode}); "
+                  f"next spawn no sooner than {delay:g}s from now")
+
+        missing = self.min_workers - len(self.active_workers())
+        if missing > 0 and now >= self._respawn_at:
+            print(f"Manager: respawning {missing} worker(s)")
+            for _ in range(missing):
+                self.spawn_worker()
+
+    def backlog(self):
+        """
+        (ready jobs, seconds the oldest has waited) that more workers could
+        start now: only in the queues the workers subscribe to, leaving out
+        queues held back by a rate limit or at their concurrency cap, and
+        counting a capped queue only up to its free slots.
+        """
+        queues = list(parse_queue_weights(self.queues)) if self.queues else None
+        limits = self.backend.queue_limits()
+        if not limits:
+            return self.backend.ready_stats(queues)
+
+        if queues is None:
+            queues = self.backend.queues()
+        running = self.backend.stats(by_queue=True)
+        free = [q for q in queues if q not in limits]
+        ready, oldest = self.backend.ready_stats(free) if free else (0, 0.0)
+        for queue in queues:
+            limit = limits.get(queue)
+            if limit is None or self.backend.throttle_wait({queue: limit}) is not None:
+                continue
+            n, age = self.backend.ready_stats([queue])
+            if limit.concurrency is not None:
+                n = min(n, max(0, limit.concurrency - running.get((queue, "processing"), 0)))
+            if n:
+                ready += n
+                oldest = max(oldest, age)
+        return ready, oldest
+
+    def autoscale(self):
+        """Add workers while jobs back up; drain one when the queue stays empty."""
+        self._last_scale = time.monotonic()
+        try:
+            ready, oldest = self.backlog()
+        except Exception as e:
+            print(f"Manager: autoscaler could not read queue depth: {e}")
+            return
+        target = float(self.backend.get_setting("autoscale.target_latency",
+                                                "QUEUECTL_AUTOSCALE_TARGET_LATENCY", DEFAULT_TARGET_LATENCY))
+        idle_after = float(self.backend.get_setting("autoscale.idle_seconds",
+                                                    "QUEUECTL_AUTOSCALE_IDLE_SECONDS", DEFAULT_IDLE_SECONDS))
+        active = len(self.active_workers())
+
+        if ready:
+            self._idle_since = None
+            wanted = math.ceil(ready / self.concurrency)
+            if oldest > target:
+                wanted = max(wanted, active + 1)
+            wanted = min(self.max_workers, wanted)
+            if wanted > active and time.monotonic() >= self._respawn_at:
+                print(f"Manager: {ready} ready job(s), oldest waiting {oldest:.1f}s; "
+                      f"scaling up to {wanted} workers")
+                for _ in range(wanted - active):
+                    self.spawn_worker()
+            return
+
+        if self._idle_since is None:
+            self._idle_since = time.monotonic()
+        elif active > self.min_workers and time.monotonic() - self._idle_since >= idle_after:
+            self.drain_worker()
+            # Drain one at a time, each after another idle period.
+            self._idle_since = time.monotonic()
+
     def stop_children(self):
         print("Manager: stopping workers...")
         for p in self.children:
@@ -0,0 +1,87 @@
+# queuectl/worker/scheduling.py
+
+"""
+Queue Scheduling
+----------------
+Decides which queue a worker claims from next, using stride scheduling
+(a deterministic weighted round-robin): every queue carries a "pass" value
+that advances by 1/weight each time it is picked, and the queue with the
+lowest pass goes next. Over any window a queue with weight 3 is picked
+three times as often as one with weight 1, picks are interleaved rather
+than bursty, and each pick is O(log Q) however many queues exist, so no
+queue starves however many jobs another one holds.
+"""
+
+import heapq
+import itertools
+from typing import Dict, Iterator
+
+
+def parse_queue_weights(spec: str) -> Dict[str, int]:
+    """
+    Parse a subscription like "critical:5,default:2,bulk" into
+    {"critical": 5, "default": 2, "bulk": 1}.
+    """
+    weights = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, weight = part.partition(":")
+        weight = int(weight) if weight else 1
+        if weight < 1:
+            raise ValueError(f"Queue weight must be at least 1: {part}")
+        weights[name.strip()] = weight
+    if not weights:
+        raise ValueError("No queues given")
+    return weights
+
+
+class WeightedRoundRobin:
+    def __init__(self, weights: Dict[str, int]):
+        self.weights = {}
+        self.heap = []
+        self.ring = []
+        self._seq = itertools.count()
+        self._fallback = 0
+        self.set_weights(weights)
+
+    def set_weights(self, weights: Dict[str, int]):
+        """Replace the queue set, keeping the progress of queues that remain."""
+        passes = {name: p for p, _, name in self.heap}
+        floor = min(passes.values(), default=0.0)
+        self.weights = dict(weights)
+        self.heap = [(passes.get(name, floor), next(self._seq), name) for name in self.weights]
+        heapq.heapify(self.heap)
+        # Fallback order when the pick has nothing ready: walk the ring from
+        # a cursor that advances on every fallback, so the turns of empty queues
+        # are shared evenly instead of all going to their ring neighbour.
+        self.ring = list(self.weights)
+
+    def next(self) -> str:
+        pass_, _, name = self.heap[0]
+        heapq.heapreplace(self.heap, (pass_ + 1.0 / self.weights[name], next(self._seq), name))
+        return name
+
+    def order(self) -> Iterator[str]:
+        """
+        Lazily yield every queue, starting with the next weighted pick and
+        then falling back round the ring, so other queues cost nothing unless
+        the caller actually needs to fall back to them.
+        """
+        if not self.weights:
+            return iter(())
+        picked = self.next()
+
+        def queues():
+            yield picked
+            # Only reached when the pick came up empty. The cursor skips the
+            # pick itself, or its neighbour would get that turn twice.
+            others = [name for name in self.ring if name != picked]
+            if not others:
+                return
+            start = self._fallback = (self._fallback + 1) % len(others)
+            yield from others[start:]
+            yield from others[:start]
+
+        return queues()
@@ -4,7 +4,17 @@
 Worker Process
 ---------------
 Each worker process polls the database for pending jobs, claims one,
-executes it using the executor module, and updates its status.
+executes it using the executor module, and updates its status. All job
+storage goes through a QueueBackend (see queuectl/backends), SQLite unless
+QUEUECTL_BACKEND says otherwise.
+
+With --concurrency K, one process supervises up to K commands at once on
+a thread pool, sharing a single backend handle that only the main thread
+touches.
+
+Claimed jobs are leased to the worker. A heartbeat thread renews all of the
+worker's leases with one UPDATE per interval; if the worker dies, its leases
+expire and the manager's reaper hands the jobs back to the queue.
 
 This module can be imported or executed directly as:
 python -m queuectl.worker.worker_proc --worker-id 1
@@ -12,22 +22,114 @@ python -m queuectl.worker.worker_proc --worker-id 1
 
 import argparse
 # import datetime
+import os
 import signal
+import socket
 import time
-from threading import Event
+from threading import Event, Lock, Thread
 from datetime import datetime , UTC , timedelta
 
-from queuectl.db.repo import connect
-from queuectl.executor import execute_command
-from queuectl.utils import utcnow_iso, compute_backoff, log
+from queuectl.backends import QueueBackend, open_backend
+from queuectl.cache import cache_key, DEFAULT_CACHE_TTL, DEFAULT_CACHE_MAX_ENTRIES
+from queuectl.executor import execute_command, log_path, DEFAULT_MAX_OUTPUT
+from queuectl.pyexec import PythonPool, DEFAULT_MAX_JOBS, DEFAULT_MAX_MEMORY_MB
+from queuectl.metrics import MetricsRecorder
+from queuectl.models import JobOutcome
+from queuectl.utils import log, parse_backoff, BackoffPolicy
+from queuectl.wakeup import WakeupWaiter, notify
+from queuectl.worker.scheduling import WeightedRoundRobin, parse_queue_weights
+
+# Shortest idle wait, in seconds.
+IDLE_FLOOR = 0.05
+
+# Default lease length, in seconds; heartbeats renew it three times per lease.
+DEFAULT_LEASE_SECONDS = 30
+
+# Seconds between re-reads of the per-queue limits in the config table.
+LIMITS_REFRESH = 5.0
+
+# Timeout for jobs that do not set their own, in seconds.
+DEFAULT_TIMEOUT = 3600
 
 
 class Worker:
-    def __init__(self, worker_id: int, base_backoff: int = 2):
+    def __init__(self, worker_id: int, base_backoff: int = 2,
+                 batch_size: int = 1, flush_interval: float = 1.0,
+                 wakeup_fd: int = None, concurrency: int = 1,
+                 queues: dict = None, backend: QueueBackend = None):
         self.worker_id = worker_id
-        self.conn = connect()
+        # Sharded storage: spread workers' home shards by worker id.
+        self.backend = backend or open_backend(home=worker_id - 1)
         self.stop_event = Event()
+        self.waiter = WakeupWaiter(wakeup_fd)
+        self.metrics = MetricsRecorder(self.waiter.send if self.waiter.connected else None)
         self.base_backoff = base_backoff
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.concurrency = max(1, concurrency)
+
+        # Queues to serve, {name: weight}. None means every known queue with
+        # equal weight, re-read whenever a claim comes back empty.
+        self.subscribed = queues
+        self.scheduler = WeightedRoundRobin(queues or self._all_queues())
+
+        # Leases: this worker's identity, how long a claim stays valid without
+        # a heartbeat, and the ids of jobs it currently holds.
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{worker_id}"
+        self.lease_seconds = float(self.backend.get_setting("lease.seconds", "QUEUECTL_LEASE_SECONDS",
+                                                            DEFAULT_LEASE_SECONDS))
+        self.held = set()
+        # Running jobs by monotonic deadline (their timeout plus one lease of
+        # grace). A job past it has hung: its lease is left to expire so the
+        # manager's reaper recovers it.
+        self.deadlines = {}
+        self._overdue_logged = set()
+        self._heartbeat_stop = Event()
+        self._heartbeat = None
+
+        # Retry delays: the global policy (backoff.policy, or plain
+        # exponential on --base-backoff), plus parsed per-job policies.
+        self.backoff = self._default_backoff()
+        self._policies = {}
+
+        # Per-queue rate and concurrency limits, {queue: QueueLimit}.
+        self.limits = self.backend.queue_limits()
+        self._limits_loaded = time.monotonic()
+
+        # Output capture: bytes kept per stream, and where (if anywhere)
+        # full logs are spilled.
+        self.max_output = int(self.backend.get_setting("logs.max_output", "QUEUECTL_MAX_OUTPUT",
+                                                       DEFAULT_MAX_OUTPUT))
+        self.log_dir = self.backend.get_setting("logs.dir", "QUEUECTL_LOG_DIR")
+
+        # Warm child processes for {"callable": ...} jobs. Started up front
+        # when modules to preload are configured, otherwise on first use.
+        self.preload = [m.strip() for m in
+                        self.backend.get_setting("pyexec.preload", "QUEUECTL_PYEXEC_PRELOAD", "").split(",")]
+        self.pyexec_max_jobs = int(self.backend.get_setting("pyexec.max_jobs", "QUEUECTL_PYEXEC_MAX_JOBS",
+                                                            DEFAULT_MAX_JOBS))
+        self.pyexec_max_memory_mb = float(self.backend.get_setting("pyexec.max_memory_mb",
+                                                                   "QUEUECTL_PYEXEC_MAX_MEMORY_MB",
+                                                                   DEFAULT_MAX_MEMORY_MB))
+        self._python_pool = None
+        self._python_pool_lock = Lock()
+        if any(self.preload):
+            self.python_pool()
+
+        # Result cache for jobs enqueued with "cache": default TTL, and
+        # entries kept before the least recently used are evicted.
+        self.cache_ttl = float(self.backend.get_setting("cache.ttl", "QUEUECTL_CACHE_TTL", DEFAULT_CACHE_TTL))
+        self.cache_max_entries = int(self.backend.get_setting("cache.max_entries", "QUEUECTL_CACHE_MAX_ENTRIES",
+                                                              DEFAULT_CACHE_MAX_ENTRIES))
+
+        # Job outcomes waiting to be written (JobOutcome), plus the time the
+        # oldest one was buffered. Jobs stay 'processing' in the database
+        # until their outcome is flushed, so a crash leaves them recoverable
+        # by the manager.
+        self._results = []
+        self._results_since = None
+        # Result cache keys hit since the last flush, recorded with it.
+        self._cache_hits = []
 
         # Register signal handlers for graceful shutdown
         signal.signal(signal.SIGTERM, self.handle_stop_signal)
@@ -36,105 +138,367 @@ class Worker:
     def handle_stop_signal(self, signum, frame):
         log(f"Worker-{self.worker_id}: received termination signal")
         self.stop_event.set()
+        self.waiter.interrupt()
+
+    def _default_backoff(self) -> BackoffPolicy:
+        spec = self.backend.get_setting("backoff.policy", "QUEUECTL_BACKOFF")
+        if spec:
+            try:
+                return parse_backoff(spec, base=self.base_backoff)
+            except ValueError as e:
+                log(f"Worker-{self.worker_id}: ignoring backoff.policy: {e}")
+        return BackoffPolicy(base=self.base_backoff)
+
+    def backoff_policy(self, spec: str = None) -> BackoffPolicy:
+        """The policy for a job's `backoff` spec, or the global one."""
+        if not spec:
+            return self.backoff
+        policy = self._policies.get(spec)
+        if policy is None:
+            try:
+                policy = parse_backoff(spec, base=self.base_backoff)
+            except ValueError as e:
+                log(f"Worker-{self.worker_id}: bad job backoff '{spec}' ({e}); using the default")
+                policy = self.backoff
+            self._policies[spec] = policy
+        return policy
+
+    def _all_queues(self):
+        return {name: 1 for name in self.backend.queues()}
+
+    def claim_jobs(self, limit: int):
+        """
+        Atomically claim up to `limit` eligible jobs, visiting queues in
+        weighted round-robin order (see QueueBackend.claim).
+        """
+        start = time.perf_counter()
+        rows = self._claim(limit)
+        if not rows and self.subscribed is None:
+            queues = self._all_queues()
+            if queues != self.scheduler.weights:
+                # A queue appeared since we last looked; try it right away.
+                self.scheduler.set_weights(queues)
+                rows = self._claim(limit)
+        self.metrics.observe("queuectl_claim_seconds", time.perf_counter() - start)
+
+        if rows:
+            self.held.update(job.id for job in rows)
+            self.metrics.inc("queuectl_jobs_claimed_total", len(rows))
+            now = datetime.now(UTC)
+            for job in rows:
+                waited = (now - datetime.fromisoformat(job.ready_at)).total_seconds()
+                self.metrics.observe("queuectl_queue_wait_seconds", max(0.0, waited))
+        return rows
+
+    def _claim(self, limit: int):
+        if time.monotonic() - self._limits_loaded >= LIMITS_REFRESH:
+            self.limits = self.backend.queue_limits()
+            self._limits_loaded = time.monotonic()
+        return self.backend.claim(limit, self.scheduler.order(), owner=self.owner,
+                                  lease_seconds=self.lease_seconds, limits=self.limits)
+
+    def live_leases(self):
+        """
+        Held job ids whose leases the heartbeat should renew: None for all
+        of them. Jobs running past their deadline are left out; with one
+        command at a time, the main thread is stuck in that job, so the jobs
+        it has claimed but not started are left out too.
+        """
+        now = time.monotonic()
+        overdue = {job_id for job_id, deadline in list(self.deadlines.items()) if deadline < now}
+        for job_id in overdue - self._overdue_logged:
+            log(f"Worker-{self.worker_id}: job {job_id} is past its timeout; no longer renewing its lease")
+        self._overdue_logged = overdue
+        if not overdue:
+            return None
+        if self.concurrency == 1:
+            return []
+        return [job_id for job_id in list(self.held) if job_id not in overdue]
+
+    def heartbeat_loop(self):
+        """Renew this worker's live leases, one UPDATE per interval, on its own connection."""
+        backend = self.backend.for_thread()
+        interval = self.lease_seconds / 3
+        try:
+            while not self._heartbeat_stop.wait(interval):
+                self.metrics.flush()
+                if not self.held:
+                    continue
+                live = self.live_leases()
+                if live == []:
+                    continue
+                try:
+                    backend.renew_leases(self.owner, self.lease_seconds, live)
+                except Exception as e:
+                    log(f"Worker-{self.worker_id}: heartbeat failed: {e}")
+        finally:
+            if backend is not self.backend:
+                backend.close()
+
+    def start_heartbeat(self):
+        self._heartbeat = Thread(target=self.heartbeat_loop, name=f"heartbeat-{self.worker_id}", daemon=True)
+        self._heartbeat.start()
+
+    def stop_heartbeat(self):
+        self._heartbeat_stop.set()
+        if self._heartbeat:
+            self._heartbeat.join()
 
     def claim_next_job(self):
-        now = utcnow_iso()
-        cur = self.conn.cursor()
-
-        cur.execute("""
-            SELECT id, command, attempts, max_retries
-            FROM jobs
-            WHERE state IN ('pending', 'failed')
-            AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
-            ORDER BY created_at ASC
-            LIMIT 1
-        """, (now,))
-        job = cur.fetchone()
-        if not job:
+        rows = self.claim_jobs(1)
+        if not rows:
             return None
+        return rows[0]
+
+    def release_jobs(self, jobs):
+        """Hand claimed-but-unstarted jobs back to the queue."""
+        if not jobs:
+            return
+        self.backend.release(self.owner, [job.id for job in jobs])
+        self.held.difference_update(job.id for job in jobs)
+        notify()
+        log(f"Worker-{self.worker_id}: released {len(jobs)} unstarted job(s)")
+
+    def seconds_until_next_retry(self):
+        """Seconds until the earliest scheduled retry becomes due, or None."""
+        return self.backend.next_retry(self.subscribed)
+
+    def idle_wait(self):
+        """
+        Sleep until woken by an enqueue, until the next retry is due, or
+        until a rate-limited queue earns its next token.
+        """
+        self.metrics.flush(force=True)
+        waits = [w for w in (self.seconds_until_next_retry(),
+                             self.backend.throttle_wait(self.limits)) if w is not None]
+        timeout = min(waits, default=float("inf"))
+        # Floor: a due job we could not claim (another worker won it, or it
+        # is in a queue we do not serve) must not turn this into a busy loop.
+        self.waiter.wait(max(timeout, IDLE_FLOOR))
 
-        job_id, command, attempts, max_retries = job
+    def _buffer_result(self, outcome: JobOutcome):
+        """Queue an outcome; it is dropped at flush time if the job's lease was lost meanwhile."""
+        if not self._results:
+            self._results_since = time.monotonic()
+        self._results.append(outcome)
 
-        cur.execute("""
-            UPDATE jobs
-            SET state='processing', updated_at=?
-            WHERE id=? AND state IN ('pending', 'failed')
-        """, (utcnow_iso(), job_id))
-        self.conn.commit()
+    def flush_results(self, force: bool = False):
+        """
+        Write buffered job outcomes in one transaction.
 
-        if cur.rowcount == 1:
-            return job_id, command, attempts, max_retries
-        return None
+        Without `force`, only flushes once the buffer holds `batch_size`
+        outcomes or the oldest one has waited `flush_interval` seconds.
+        """
+        if not self._results:
+            return
+        if not force and len(self._results) < self.batch_size and \
+                time.monotonic() - self._results_since < self.flush_interval:
+            return
 
+        start = time.perf_counter()
+        lost, released = self.backend.record(self.owner, self._results)
+        for job_id in lost:
+            log(f"Worker-{self.worker_id}: lease on job {job_id} was lost; outcome discarded")
+        self.metrics.observe("queuectl_commit_seconds", time.perf_counter() - start)
+        self.held.difference_update(outcome.id for outcome in self._results)
+        self._results = []
+        self._results_since = None
+        if self._cache_hits:
+            self.backend.cache_touch(self._cache_hits)
+            self._cache_hits = []
+        if released or any(limit.concurrency for limit in self.limits.values()):
+            # Released children are ready now, and finished jobs free slots
+            # in concurrency-capped queues; wake workers that are idling.
+            notify()
 
     def update_job_success(self, job_id: str, attempts: int, output: str):
-        cur = self.conn.cursor()
-        cur.execute("""
-            UPDATE jobs
-            SET state='completed', attempts=?, updated_at=?, output=?
-            WHERE id=?
-        """, (attempts + 1, utcnow_iso(), output, job_id))
-        self.conn.commit()
+        self._buffer_result(JobOutcome(job_id, "completed", attempts + 1, output))
+        self.metrics.inc("queuectl_jobs_completed_total")
         log(f"Worker-{self.worker_id}: job {job_id} completed successfully")
 
     def update_job_failure(self, job_id: str, attempts: int, max_retries: int,
-                           stderr: str, stdout: str):
+                           stderr: str, stdout: str, backoff: str = None):
         attempts += 1
-        delay = compute_backoff(self.base_backoff, attempts)
+        delay = self.backoff_policy(backoff).delay(attempts)
         next_attempt = (datetime.now(UTC) +
                         timedelta(seconds=delay)).isoformat()
-        cur = self.conn.cursor()
 
         if attempts > max_retries:
-            cur.execute("""
-                UPDATE jobs
-                SET state='dead', attempts=?, updated_at=?, last_error=?, output=?
-                WHERE id=?
-            """, (attempts, utcnow_iso(), stderr, stdout, job_id))
+            self._buffer_result(JobOutcome(job_id, "dead", attempts, stdout, stderr))
+            self.metrics.inc("queuectl_jobs_dead_total")
             log(f"Worker-{self.worker_id}: job {job_id} moved to DLQ")
         else:
-            cur.execute("""
-                UPDATE jobs
-                SET state='failed', attempts=?, updated_at=?, last_error=?, next_attempt_at=?, output=?
-                WHERE id=?
-            """, (attempts, utcnow_iso(), stderr, next_attempt, stdout, job_id))
-            log(f"Worker-{self.worker_id}: job {job_id} failed, retry in {delay}s")
+            self._buffer_result(JobOutcome(job_id, "failed", attempts, stdout, stderr, next_attempt))
+            self.metrics.inc("queuectl_jobs_failed_total")
+            log(f"Worker-{self.worker_id}: job {job_id} failed, retry in {round(delay, 2):g}s")
 
-        self.conn.commit()
+    def record_outcome(self, job, exit_code: int, stdout: str, stderr: str, key: str = None):
+        if exit_code == 0:
+            self.update_job_success(job.id, job.attempts, stdout)
+            if key:
+                self.backend.cache_put(key, stdout, job.cache_ttl or self.cache_ttl,
+                                       self.cache_max_entries)
+        else:
+            self.update_job_failure(job.id, job.attempts, job.max_retries, stderr, stdout, job.backoff)
 
-    def run(self):
-        log(f"Worker-{self.worker_id}: started")
+    def python_pool(self) -> PythonPool:
+        with self._python_pool_lock:
+            if self._python_pool is None:
+                self._python_pool = PythonPool(
+                    size=self.concurrency, preload=self.preload, max_jobs=self.pyexec_max_jobs,
+                    max_memory_mb=self.pyexec_max_memory_mb, max_output=self.max_output)
+            return self._python_pool
+
+    def execute(self, job):
+        timeout = job.timeout or DEFAULT_TIMEOUT
+        start = time.perf_counter()
+        self.deadlines[job.id] = time.monotonic() + timeout + self.lease_seconds
+        try:
+            if job.callable:
+                result = self.python_pool().run(job.callable, job.args, timeout=timeout)
+            else:
+                log_file = log_path(self.log_dir, job.id) if self.log_dir else None
+                result = execute_command(job.command, timeout=timeout, max_output=self.max_output,
+                                         log_file=log_file)
+        finally:
+            self.deadlines.pop(job.id, None)
+        self.metrics.observe("queuectl_execution_seconds", time.perf_counter() - start)
+        return result
 
+    def cached_result(self, job):
+        """(cache key, cached output) for a cacheable job; the output is None on a miss."""
+        if job.cache_ttl is None:
+            return None, None
+        key = cache_key(job)
+        output = self.backend.cache_get(key)
+        if output is not None:
+            self._cache_hits.append(key)
+        self.metrics.inc("queuectl_cache_hits_total" if output is not None else "queuectl_cache_misses_total")
+        return key, output
+
+    def complete_from_cache(self, job, output: str):
+        log(f"Worker-{self.worker_id}: job {job.id} served from the result cache")
+        self.update_job_success(job.id, job.attempts, output)
+
+    def run_job(self, job):
+        log(f"Worker-{self.worker_id}: picked job {job.id} (attempt {job.attempts + 1})")
+
+        key, cached = self.cached_result(job)
+        if cached is not None:
+            self.complete_from_cache(job, cached)
+            return
+        exit_code, stdout, stderr = self.execute(job)
+        self.record_outcome(job, exit_code, stdout, stderr, key)
+
+    def run_concurrent(self):
+        """
+        Keep up to `concurrency` commands running on a thread pool.
+
+        Only this (main) thread touches the database: it claims jobs for free
+        slots and records outcomes as commands finish. Finished commands
+        interrupt the idle wait, so a freed slot is refilled immediately. On
+        stop, no new jobs are claimed and running ones are allowed to finish.
+        """
+        # Imported here: concurrent.futures pulls in logging, a cost workers
+        # running one command at a time do not need to pay at startup.
+        from concurrent.futures import ThreadPoolExecutor
+
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency,
+                                thread_name_prefix=f"worker-{self.worker_id}") as pool:
+            while in_flight or not self.stop_event.is_set():
+                claimed = []
+                free = self.concurrency - len(in_flight)
+                if free > 0 and not self.stop_event.is_set():
+                    claimed = self.claim_jobs(free)
+                    for job in claimed:
+                        log(f"Worker-{self.worker_id}: picked job {job.id} (attempt {job.attempts + 1})")
+                        key, cached = self.cached_result(job)
+                        if cached is not None:
+                            self.complete_from_cache(job, cached)
+                            continue
+                        future = pool.submit(self.execute, job)
+                        future.add_done_callback(lambda f: self.waiter.interrupt())
+                        in_flight[future] = (job, key)
+
+                finished = [f for f in in_flight if f.done()]
+                for future in finished:
+                    job, key = in_flight.pop(future)
+                    self.record_outcome(job, *future.result(), key=key)
+                self.flush_results()
+                self.metrics.flush()
+
+                if claimed or finished:
+                    continue
+                if not in_flight:
+                    self.flush_results(force=True)
+                    self.idle_wait()
+                elif len(in_flight) >= self.concurrency or self.stop_event.is_set():
+                    self.waiter.wait(float("inf"))
+                else:
+                    self.idle_wait()
+
+    def run_serial(self):
+        """Claim up to `batch_size` jobs at a time and run them one by one."""
         while not self.stop_event.is_set():
-            job = self.claim_next_job()
-            if not job:
-                time.sleep(1)
+            jobs = self.claim_jobs(self.batch_size)
+            if not jobs:
+                self.flush_results(force=True)
+                self.idle_wait()
                 continue
 
-            job_id, command, attempts, max_retries = job
-            log(f"Worker-{self.worker_id}: picked job {job_id} (attempt {attempts + 1})")
+            for i, job in enumerate(jobs):
+                if self.stop_event.is_set():
+                    self.release_jobs(jobs[i:])
+                    break
+                self.run_job(job)
+                self.flush_results()
+                self.metrics.flush()
 
-            exit_code, stdout, stderr = execute_command(command)
+    def run(self):
+        log(f"Worker-{self.worker_id}: started")
+        self.start_heartbeat()
 
-            if exit_code == 0:
-                self.update_job_success(job_id, attempts, stdout)
+        try:
+            if self.concurrency > 1:
+                self.run_concurrent()
             else:
-                self.update_job_failure(job_id, attempts, max_retries, stderr, stdout)
+                self.run_serial()
+            self.flush_results(force=True)
+        finally:
+            self.stop_heartbeat()
+            self.metrics.flush(force=True)
 
         log(f"Worker-{self.worker_id}: stopping gracefully")
-        self.conn.close()
+        if self._python_pool:
+            self._python_pool.close()
+        self.waiter.close()
+        self.backend.close()
 
 
 def parse_args():
     parser = argparse.ArgumentParser(prog="queuectl.worker")
     parser.add_argument("--worker-id", type=int, required=True, help="Worker id")
     parser.add_argument("--base-backoff", type=int, default=2, help="Backoff base")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Jobs claimed per transaction and outcomes written per commit")
+    parser.add_argument("--flush-interval", type=float, default=1.0,
+                        help="Max seconds an outcome waits in the buffer before being committed")
+    parser.add_argument("--wakeup-fd", type=int, default=None,
+                        help="Inherited socket the manager uses to wake this worker")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Commands this worker runs at once (thread pool)")
+    parser.add_argument("--queues", type=parse_queue_weights, default=None,
+                        help="Queues to serve with weights, e.g. 'critical:5,default:1' (default: all)")
     return parser.parse_args()
 
 
 def main():
     args = parse_args()
-    worker = Worker(worker_id=args.worker_id, base_backoff=args.base_backoff)
+    worker = Worker(worker_id=args.worker_id, base_backoff=args.base_backoff,
+                    batch_size=args.batch_size, flush_interval=args.flush_interval,
+                    wakeup_fd=args.wakeup_fd, concurrency=args.concurrency,
+                    queues=args.queues)
     worker.run()
 
 
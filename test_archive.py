@@ -0,0 +1,61 @@
+# test_archive.py
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from queuectl.db.repo import connect, insert_jobs
+
+
+def queuectl(*args):
+    result = subprocess.run([sys.executable, "-m", "queuectl", *args], env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    db = os.path.join(tmp, "queue.db")
+    env = dict(os.environ, QUEUECTL_DB=db, QUEUECTL_BACKEND="sqlite")
+    env.pop("QUEUECTL_ARCHIVE_PATH", None)
+    env.pop("QUEUECTL_ARCHIVE_RETENTION_DAYS", None)
+
+    conn = connect(db)
+    for _ in insert_jobs(conn, [{"id": name, "command": f"echo {name}"}
+                                for name in ("old-done", "old-dead", "new-done", "old-pending")]):
+        pass
+    old = (datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=10)).isoformat()
+    conn.execute("UPDATE jobs SET state='completed', output=?, updated_at=? WHERE id='old-done'",
+                 ("hello\n" * 1000, old))
+    conn.execute("UPDATE jobs SET state='dead', last_error='exit code 1', updated_at=? WHERE id='old-dead'",
+                 (old,))
+    conn.execute("UPDATE jobs SET state='completed' WHERE id='new-done'")
+    conn.execute("UPDATE jobs SET updated_at=? WHERE id='old-pending'", (old,))
+    conn.commit()
+
+    # Only finished jobs past the retention window move
+    out = queuectl("archive", "run", "--older-than", "7")
+    assert out.startswith("Archived 2 jobs older than 7 days"), out
+    assert os.path.exists(db + "-archive.db")
+    left = sorted(row[0] for row in conn.execute("SELECT id FROM jobs"))
+    assert left == ["new-done", "old-pending"], left
+    # Running again finds nothing new
+    assert queuectl("archive", "run", "--older-than", "7").startswith("Archived 0 jobs")
+    print("archive: run ok")
+
+    # list shows both, filtered by state on request
+    out = queuectl("archive", "list")
+    assert "old-done" in out and "old-dead" in out and "new-done" not in out, out
+    out = queuectl("archive", "list", "--state", "dead")
+    assert "old-dead" in out and "old-done" not in out, out
+
+    # show decompresses output and last error
+    job = json.loads(queuectl("archive", "show", "old-done"))
+    assert job["state"] == "completed" and job["output"] == "hello\n" * 1000, job
+    job = json.loads(queuectl("archive", "show", "old-dead"))
+    assert job["state"] == "dead" and job["last_error"] == "exit code 1", job
+    assert "not in the archive" in queuectl("archive", "show", "new-done")
+    conn.close()
+    print("archive: list/show ok")
@@ -0,0 +1,239 @@
+# test_backends.py
+"""
+Conformance checks every QueueBackend must pass, run against each backend
+in a temporary directory. Run with: python test_backends.py
+"""
+import json
+import os
+import tempfile
+import time
+import zlib
+
+from queuectl.backends import BackendError, LogBackend, ShardedBackend, SQLiteBackend
+from queuectl.cache import cache_key
+from queuectl.models import ClaimedJob, JobOutcome, QueueLimit
+from queuectl.utils import delay_until
+
+
+def job(job_id, **extra):
+    return dict({"id": job_id, "command": f"echo {job_id}"}, **extra)
+
+
+def check_backend(name, make):
+    backend = make()
+
+    # Enqueue, duplicates, stats
+    assert backend.enqueue(job("a"))
+    assert not backend.enqueue(job("a")), "duplicate id accepted"
+    totals = list(backend.enqueue_many([job("b", priority=5), job("c", queue="mail"), job("b")]))
+    assert sum(i for i, _ in totals) == 2 and sum(s for _, s in totals) == 1, totals
+    assert backend.stats() == {"pending": 3}, backend.stats()
+    assert backend.stats(by_queue=True) == {("default", "pending"): 2, ("mail", "pending"): 1}
+    assert set(backend.queues()) >= {"default", "mail"}
+    assert backend.ready_stats()[0] == 3
+
+    # Claim: priority first, then age; only the queues asked for
+    assert [j.id for j in backend.claim(1, ["default"], owner="w1")] == ["b"]
+    assert [j.id for j in backend.claim(10, ["default"], owner="w1")] == ["a"]
+    assert backend.claim(10, ["default"], owner="w2") == []
+    assert backend.stats(by_queue=True)[("default", "processing")] == 2
+
+    # Outcomes only count for the lease holder
+    lost, _ = backend.record("w2", [JobOutcome("a", "completed", 1, "x")])
+    assert lost == ["a"]
+    assert backend.complete("w1", "a", 1, "hello")
+    assert backend.fail("w1", "b", 1, error="boom", retry_at=delay_until(3600))
+    assert backend.get("a")["state"] == "completed"
+    assert backend.get("a")["output"] == "hello"
+    assert backend.get("b")["state"] == "failed" and backend.get("b")["last_error"] == "boom"
+    assert backend.get("missing") is None
+
+    # Delayed jobs are not claimable until due
+    assert backend.claim(10, ["default"], owner="w1") == []
+    wait = backend.next_retry()
+    assert wait is not None and 3500 < wait <= 3600, wait
+    due = delay_until(0.2)
+    backend.enqueue(job("soon", next_attempt_at=due))
+    time.sleep(0.3)
+    soon = backend.claim(10, ["default"], owner="w1")
+    assert [j.id for j in soon] == ["soon"] and soon[0].ready_at == due, soon
+
+    # Release hands jobs back untouched
+    assert backend.release("w1", ["soon"]) == 1
+    again = backend.claim(1, ["default"], owner="w1")
+    assert [j.id for j in again] == ["soon"] and again[0].attempts == 0
+
+    # Dead jobs and DLQ retry
+    assert backend.fail("w1", "soon", 4, error="gave up")
+    assert [row[0] for row in backend.list(state="dead")] == ["soon"]
+    assert backend.retry("soon") and not backend.retry("soon")
+    assert backend.get("soon")["state"] == "pending" and backend.get("soon")["attempts"] == 0
+
+    # Expired leases are reaped
+    claimed = backend.claim(10, ["mail"], owner="w3", lease_seconds=0.05)
+    assert [j.id for j in claimed] == ["c"]
+    assert backend.renew_leases("w3", 0.05) == 1
+    assert backend.renew_leases("w3", 0.05, ["other"]) == 0
+    assert backend.renew_leases("w3", 0.05, ["c"]) == 1
+    time.sleep(0.1)
+    assert backend.reap_expired() == (1, 0)
+    assert backend.get("c")["state"] == "failed" and backend.get("c")["attempts"] == 1
+
+    # Listing: filters and keyset pagination
+    ids = [row[0] for row in backend.list()]
+    assert sorted(ids) == ["a", "b", "c", "soon"], ids
+    page = [row[0] for row in backend.list(limit=2)]
+    rest = [row[0] for row in backend.list(after=page[-1])]
+    assert page + rest == ids
+    assert [row[0] for row in backend.list(queue="mail")] == ["c"]
+
+    # Idempotency keys: a re-submission under a new id is skipped
+    assert backend.enqueue(job("k1", idempotency_key="nightly-2026-10-17"))
+    assert not backend.enqueue(job("k2", idempotency_key="nightly-2026-10-17"))
+    assert backend.get("k2") is None
+    # ...and a known id is skipped whatever key it comes with
+    assert not backend.enqueue(job("a", idempotency_key="same-id-new-key"))
+    assert not backend.enqueue(job("k1", idempotency_key="k1-new-key"))
+    assert not backend.enqueue(job("k1"))
+    assert sum(i for i, _ in backend.enqueue_many([job("k3", idempotency_key="k3-key"), job("k3")])) == 1
+
+    # Grouped enqueue (the server's group commit): counts per group
+    counts = backend.enqueue_groups([[job("g1"), job("g2")], [job("g1"), job("g3")], []])
+    assert counts == [(2, 0), (1, 1), (0, 0)], counts
+    backend.close()
+    print(f"{name}: conformance ok")
+
+
+def check_sharding(path):
+    backend = ShardedBackend(4, path, home=0)
+    list(backend.enqueue_many(job(f"j{i}") for i in range(400)))
+    per_shard = [shard.stats().get("pending", 0) for shard in backend.shards]
+    assert sum(per_shard) == 400 and min(per_shard) > 50, per_shard
+
+    # Children follow their parent's shard, so the release trigger sees them.
+    backend.enqueue(job("root"))
+    backend.enqueue(job("kid", depends_on=["root"]))
+    backend.enqueue(job("grandkid", depends_on=["kid"]))
+    assert backend.get("grandkid")["state"] == "blocked"
+
+    # Home first, then steal until every shard is empty.
+    first = backend.claim(500, ["default"], owner="w")
+    assert len(first) == 401 and len(backend.claim(10, ["default"], owner="w")) == 0
+    assert backend._where[first[0].id] == 0
+    backend.record("w", [JobOutcome(j.id, "completed", 1) for j in first])
+    kid = backend.claim(10, ["default"], owner="w")
+    assert [j.id for j in kid] == ["kid"]
+    _, released = backend.record("w", [JobOutcome("kid", "completed", 1)])
+    assert released and backend.stats() == {"completed": 402, "pending": 1}
+    assert [row[0] for row in backend.list(state="pending")] == ["grandkid"]
+
+    # Limits hold across shards, not once per shard.
+    list(backend.enqueue_many(job(f"m{i}", queue="mail") for i in range(40)))
+    capped = {"mail": QueueLimit(concurrency=3)}
+    assert len(backend.claim(50, ["mail"], owner="w", limits=capped)) == 3
+    assert backend.claim(50, ["mail"], owner="w", limits=capped) == []
+    metered = {"mail": QueueLimit(rate=0.01, burst=5)}
+    assert len(backend.claim(50, ["mail"], owner="w", limits=metered)) == 5
+    assert backend.claim(50, ["mail"], owner="w", limits=metered) == []
+    assert backend.throttle_wait(metered) > 60
+
+    # A fan-in over parents on two shards is refused; a shared "dag" keeps them together.
+    a, b = next((f"p{i}", f"p{i + 1}") for i in range(100)
+                if backend._shard_of(f"p{i}") != backend._shard_of(f"p{i + 1}"))
+    list(backend.enqueue_many([job(a), job(b)]))
+    try:
+        backend.enqueue(job("fan", depends_on=[a, b]))
+        raise AssertionError("fan-in across shards was accepted")
+    except ValueError as e:
+        assert a in str(e) and b in str(e)
+    assert backend.get("fan") is None
+    list(backend.enqueue_many([job(a + "d", dag="d"), job(b + "d", dag="d"),
+                               job("fand", depends_on=[a + "d", b + "d"])]))
+    assert backend.get("fand")["state"] == "blocked"
+    assert len({backend._locate(i) for i in (a + "d", b + "d", "fand")}) == 1
+    backend.close()
+    print("sharded: placement, stealing and limits ok")
+
+
+def check_result_cache(path):
+    backend = SQLiteBackend(path)
+    assert backend.cache_get("k") is None
+    backend.cache_put("k", "out", ttl=3600, max_entries=2)
+    assert backend.cache_get("k") == "out"
+    backend.cache_put("gone", "x", ttl=0.01, max_entries=2)
+    time.sleep(0.02)
+    assert backend.cache_get("gone") is None
+    # Lookups write nothing; hits are recorded in batches.
+    writes = backend.conn.total_changes
+    assert backend.cache_get("k") == "out" and backend.conn.total_changes == writes
+    # LRU: "k" was just hit, so "old" is the one evicted.
+    backend.cache_put("old", "1", ttl=3600, max_entries=2)
+    backend.cache_touch(["k"])
+    backend.cache_put("new", "2", ttl=3600, max_entries=2)
+    assert backend.cache_get("old") is None and backend.cache_get("k") == "out"
+
+    # The key covers the command and the contents of declared inputs.
+    inputs = os.path.join(os.path.dirname(path), "input.txt")
+    with open(inputs, "w") as f:
+        f.write("v1")
+    claimed = ClaimedJob("j", "wc -c input.txt", 0, 3, "", cache_ttl=0, inputs=json.dumps([inputs]))
+    first = cache_key(claimed)
+    assert cache_key(claimed) == first
+    assert cache_key(claimed._replace(id="other")) == first
+    assert cache_key(claimed._replace(command="wc -l input.txt")) != first
+    with open(inputs, "w") as f:
+        f.write("v2")
+    assert cache_key(claimed) != first
+    backend.close()
+    print("sqlite: result cache ok")
+
+
+def check_log_replay(directory):
+    backend = LogBackend(directory, segment_bytes=2048, max_segments=2)
+    try:
+        LogBackend(directory)
+        raise AssertionError("second writer was allowed")
+    except BackendError:
+        pass
+    list(backend.enqueue_many(job(f"j{i}") for i in range(200)))
+    assert sum(s for _, s in backend.enqueue_many(job(f"j{i}") for i in range(200))) == 200
+    claimed = backend.claim(150, ["default"], owner="w")
+    backend.record("w", [JobOutcome(j.id, "completed", 1) for j in claimed[:100]])
+    backend.record("w", [JobOutcome(j.id, "dead", 1, error="x") for j in claimed[100:120]])
+    expected = backend.stats()
+    backend.close()
+
+    # Unfinished claims come back as pending; everything logged survives.
+    reopened = LogBackend(directory)
+    assert len(os.listdir(directory)) <= 4, os.listdir(directory)
+    expected["pending"] += expected.pop("processing")
+    assert reopened.stats() == expected, (reopened.stats(), expected)
+    assert len(reopened.claim(1000, ["default"], owner="w")) == expected["pending"]
+    reader = LogBackend(directory, readonly=True)
+    assert reader.stats()["dead"] == 20
+    dead = next(reader.list(state="dead"))[0]
+    reader.close()
+
+    # Another process enqueues through the inbox; the owner picks it up on claim.
+    producer = LogBackend(directory, readonly=True)
+    assert sum(i for i, _ in producer.enqueue_many([job("in1"), job("in2"), job(dead)])) == 2
+    producer.close()
+    reader = LogBackend(directory, readonly=True)
+    assert reader.get("in1")["state"] == "pending"
+    reader.close()
+    assert {j.id for j in reopened.claim(10, ["default"], owner="w")} == {"in1", "in2"}
+    assert not os.listdir(os.path.join(directory, "inbox"))
+    reopened.close()
+    print("log: replay ok")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        check_backend("sqlite", lambda: SQLiteBackend(os.path.join(tmp, "queue.db")))
+        check_backend("log", lambda: LogBackend(os.path.join(tmp, "log")))
+        # Priority holds within a shard; make "b"'s shard the home one.
+        check_backend("sharded", lambda: ShardedBackend(3, os.path.join(tmp, "sharded.db"),
+                                                        home=zlib.crc32(b"b") % 3))
+        check_sharding(os.path.join(tmp, "spread.db"))
+        check_result_cache(os.path.join(tmp, "cache.db"))
+        check_log_replay(os.path.join(tmp, "replay"))
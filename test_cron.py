@@ -0,0 +1,56 @@
+# test_cron.py
+from datetime import datetime, UTC
+
+from queuectl.cron import CronExpr
+
+
+def at(*args):
+    return datetime(*args, tzinfo=UTC)
+
+
+def rejects(expr):
+    try:
+        CronExpr(expr)
+    except ValueError as e:
+        return str(e)
+    raise AssertionError(f"{expr!r} was accepted")
+
+
+# Field parsing: ranges, steps, lists, names
+cron = CronExpr("*/15 9-17 1,15 jan-mar mon-fri")
+assert cron.minutes == {0, 15, 30, 45}
+assert cron.hours == set(range(9, 18))
+assert cron.days == {1, 15}
+assert cron.months == {1, 2, 3}
+assert cron.weekdays == {1, 2, 3, 4, 5}
+assert CronExpr("10-50/20 * * * *").minutes == {10, 30, 50}
+assert CronExpr("5/20 * * * *").minutes == {5, 25, 45}
+assert CronExpr("0 0 * * 7").weekdays == {0}        # 7 is Sunday too
+assert CronExpr("@hourly").minutes == {0} and CronExpr("@hourly").hours == set(range(24))
+
+# Invalid expressions
+assert "5 fields" in rejects("* * * *")
+assert "outside" in rejects("60 * * * *")
+assert "outside" in rejects("* 5-2 * * *")
+assert "outside" in rejects("* * 0 * *")
+assert "step" in rejects("*/0 * * * *")
+assert "Bad month" in rejects("* * * foo *")
+rejects("*/x * * * *")
+print("cron: parsing ok")
+
+# next_after: strictly after, across hour, month and year boundaries
+assert CronExpr("*/15 * * * *").next_after(at(2026, 3, 1, 10, 15)) == at(2026, 3, 1, 10, 30)
+assert CronExpr("*/15 * * * *").next_after(at(2026, 3, 1, 10, 59, 30)) == at(2026, 3, 1, 11, 0)
+assert CronExpr("0 0 1 * *").next_after(at(2026, 1, 31, 12, 0)) == at(2026, 2, 1, 0, 0)
+assert CronExpr("30 6 31 * *").next_after(at(2026, 4, 1)) == at(2026, 5, 31, 6, 30)  # April has no 31st
+assert CronExpr("59 23 31 12 *").next_after(at(2026, 12, 31, 23, 59)) == at(2027, 12, 31, 23, 59)
+assert CronExpr("@yearly").next_after(at(2026, 12, 31, 23, 59)) == at(2027, 1, 1, 0, 0)
+assert CronExpr("0 12 29 2 *").next_after(at(2026, 3, 1)) == at(2028, 2, 29, 12, 0)
+# Day of month or day of week, as in Vixie cron: the 13th or any Friday
+assert CronExpr("0 0 13 * fri").next_after(at(2026, 10, 14)) == at(2026, 10, 16, 0, 0)
+try:
+    CronExpr("0 0 30 2 *").next_after(at(2026, 1, 1))
+    raise AssertionError("Feb 30 fired")
+except ValueError as e:
+    assert "never fires" in str(e)
+print("cron: next_after ok")
@@ -0,0 +1,58 @@
+# test_dlq.py
+import collections
+import os
+import subprocess
+import sys
+import tempfile
+
+from queuectl.db.repo import connect, insert_jobs
+
+
+def queuectl(*args):
+    result = subprocess.run([sys.executable, "-m", "queuectl", *args], env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def states():
+    return dict(collections.Counter((queue, state) for queue, state in
+                                    conn.execute("SELECT queue, state FROM jobs")))
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    db = os.path.join(tmp, "queue.db")
+    env = dict(os.environ, QUEUECTL_DB=db, QUEUECTL_BACKEND="sqlite")
+
+    # Dead jobs in two queues, half of them dying on day 1 and half on day 3
+    conn = connect(db)
+    for _ in insert_jobs(conn, [{"id": f"{queue}-{day}-{i}", "command": "false", "queue": queue}
+                                for queue in ("mail", "img") for day in (1, 3) for i in range(5)]):
+        pass
+    for queue in ("mail", "img"):
+        for day in (1, 3):
+            conn.execute("UPDATE jobs SET state='dead', last_error='exit code 1', updated_at=? "
+                         "WHERE id LIKE ?", (f"2026-01-0{day}T12:00:00+00:00", f"{queue}-{day}-%"))
+    conn.commit()
+
+    # --dry-run only counts
+    assert queuectl("dlq", "retry", "--queue", "mail", "--dry-run").strip() == "Would retry 10 DLQ jobs."
+    assert queuectl("dlq", "purge", "--all", "--dry-run").strip() == "Would purge 20 DLQ jobs."
+    assert states() == {("mail", "dead"): 10, ("img", "dead"): 10}
+    print("dlq: dry run ok")
+
+    # --queue and --since narrow the retry; chunks don't change the total
+    out = queuectl("dlq", "retry", "--queue", "mail", "--since", "2026-01-02", "--chunk-size", "2")
+    assert out.strip() == "Moved 5 DLQ jobs back to pending.", out
+    assert states() == {("mail", "pending"): 5, ("mail", "dead"): 5, ("img", "dead"): 10}
+    retried = {row[0] for row in conn.execute("SELECT id FROM jobs WHERE state='pending'")}
+    assert retried == {f"mail-3-{i}" for i in range(5)}, retried
+    print("dlq: filtered retry ok")
+
+    # purge leaves other queues and non-dead jobs alone
+    assert queuectl("dlq", "purge", "--queue", "img").strip() == "Purged 10 DLQ jobs."
+    assert states() == {("mail", "pending"): 5, ("mail", "dead"): 5}
+    assert queuectl("dlq", "purge", "--all").strip() == "Purged 5 DLQ jobs."
+    assert states() == {("mail", "pending"): 5}
+    conn.close()
+    print("dlq: purge ok")
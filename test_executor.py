@@ -1,5 +1,8 @@
 # test_executor.py
-from queuectl.executor import execute_command
+import gzip
+import tempfile
+
+from queuectl.executor import BoundedCapture, execute_command, log_path, read_log
 
 # Successful command
 code, out, err = execute_command("echo Hello Executor")
@@ -18,3 +21,29 @@ code, out, err = execute_command("ping 127.0.0.1 -n 10 >nul", timeout=2)
 print("\nExit Code:", code)
 print("STDOUT:", out)
 print("STDERR:", err)
+
+# A background child holding the pipes is cut off at the timeout too
+code, out, err = execute_command("sleep 10 & echo started", timeout=1)
+print("\nExit Code:", code)
+print("STDOUT:", out)
+print("STDERR:", err)
+
+# Output beyond max_output keeps its head and tail; the log file gets all of it
+capture = BoundedCapture(10)
+for part in (b"0123", b"456789", b"abcdefghij"):
+    capture.write(part)
+assert capture.getvalue() == "01234\n... [10 bytes truncated] ...\nfghij", capture.getvalue()
+capture = BoundedCapture(10)
+capture.write(b"short")
+assert capture.getvalue() == "short"
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = log_path(tmp, "big")
+    code, out, err = execute_command("seq 1 20000; echo oops >&2", max_output=100, log_file=path)
+    assert code == 0 and err == "oops"
+    assert out.startswith("1\n2\n3\n") and out.endswith("19999\n20000") and "bytes truncated" in out
+    with gzip.open(path, "rb") as f:
+        full = f.read().decode()
+    assert full.count("\n") == 20001 and "oops" in full
+    assert b"".join(read_log(path)).decode() == full
+print("\nBounded capture and log spill ok")
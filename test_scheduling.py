@@ -0,0 +1,38 @@
+# test_scheduling.py
+import collections
+import os
+import tempfile
+
+from queuectl.backends import SQLiteBackend
+from queuectl.worker.scheduling import WeightedRoundRobin, parse_queue_weights
+
+weights = parse_queue_weights("critical:3,default,bulk:2")
+assert weights == {"critical": 3, "default": 1, "bulk": 2}
+
+# Shares follow the weights, interleaved rather than in bursts
+wrr = WeightedRoundRobin(weights)
+picks = [wrr.next() for _ in range(600)]
+assert collections.Counter(picks) == {"critical": 300, "bulk": 200, "default": 100}
+for i in range(0, 600, 6):
+    assert collections.Counter(picks[i:i + 6]) == {"critical": 3, "bulk": 2, "default": 1}, picks[i:i + 6]
+
+# Changing the weights keeps the progress of the queues that remain
+wrr.set_weights({"critical": 1, "default": 1})
+assert collections.Counter(wrr.next() for _ in range(10)) == {"critical": 5, "default": 5}
+print("scheduling: weighted shares ok")
+
+# An empty queue gives its turn away: claims fall back to the others, and
+# the fallback turns are shared evenly instead of going to one neighbour
+with tempfile.TemporaryDirectory() as tmp:
+    backend = SQLiteBackend(os.path.join(tmp, "queue.db"))
+    list(backend.enqueue_many({"id": f"{q}{i}", "command": "true", "queue": q}
+                              for q in ("a", "c", "d") for i in range(100)))
+    wrr = WeightedRoundRobin({"empty": 5, "a": 1, "c": 1, "d": 1})
+    claimed = collections.Counter()
+    for _ in range(120):
+        jobs = backend.claim(1, wrr.order(), owner="w")
+        assert len(jobs) == 1
+        claimed[jobs[0].id[0]] += 1
+    assert set(claimed) == {"a", "c", "d"} and max(claimed.values()) - min(claimed.values()) <= 10, claimed
+    backend.close()
+print("scheduling: empty queues skipped ok")
@@ -8,3 +8,36 @@ print("Backoff (base=2, attempts=3):", compute_backoff(2, 3))
 
 job = Job(id="job123", command="echo Hello Step2")
 print("Job dict:", job.to_dict())
+
+# Backoff policies: growth, caps and jitter bounds
+import random
+from queuectl.utils import parse_backoff, BackoffPolicy, MAX_BACKOFF
+
+assert [parse_backoff("exponential").delay(n) for n in (1, 2, 3)] == [2, 4, 8]
+assert parse_backoff("exponential:base=3,cap=20").delay(5) == 20
+assert parse_backoff("exponential").delay(5000) == MAX_BACKOFF
+assert [parse_backoff("linear:base=5,step=10").delay(n) for n in (1, 2, 3)] == [5, 15, 25]
+assert parse_backoff("linear:base=5").delay(3) == 15
+assert parse_backoff("linear:base=5,step=10,cap=12").delay(3) == 12
+assert parse_backoff("fixed:base=30").delay(7) == 30
+assert parse_backoff("", base=5).delay(2) == 25
+
+rng = random.Random(7)
+for n in range(1, 12):
+    full = min(2 ** n, 300)
+    assert 0 <= parse_backoff("exponential:cap=300,jitter=full").delay(n, rng) <= full
+    assert full / 2 <= parse_backoff("exponential:cap=300,jitter=equal").delay(n, rng) <= full
+    previous = min(2 ** (n - 1), 300) if n > 1 else 2
+    assert 2 <= parse_backoff("exponential:cap=300,jitter=decorrelated").delay(n, rng) <= min(previous * 3, 300)
+
+# parse_backoff errors
+for spec, message in [("random", "Unknown backoff policy"), ("fixed:jitter=some", "Unknown jitter"),
+                      ("linear:step=x", "must be a number"), ("fixed:base=-1", "must not be negative"),
+                      ("fixed:delay=3", "Unknown backoff parameter")]:
+    try:
+        parse_backoff(spec)
+        raise AssertionError(f"{spec!r} was accepted")
+    except ValueError as e:
+        assert message in str(e), (spec, e)
+assert parse_backoff(" exponential : cap = 60 ") == BackoffPolicy(cap=60.0)
+print("Backoff policies ok")